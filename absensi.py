@@ -1,20 +1,38 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import date
-import requests 
+import os
 import json
-import time 
+import functools
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-# --- KONFIGURASI DAN INIITALISASI ---
+from absensi_inti import (
+    BATCH_ABSENSI_AKTIF, FORMAT_EKSPOR, KOLOM_EKSPOR_HARIAN, KOLOM_EKSPOR_REKAP_BULANAN,
+    KOLOM_EKSPOR_REKAP_RENTANG, KOLOM_REKAP_RENTANG, OUTBOX_AKTIF, PERIODE_REKAP,
+    SHEET_ABSENSI, SHEET_ARSIP, SHEET_KARYAWAN, STATUS_ABSENSI, TEMPLATE_IMPOR,
+    antrekan_absensi, AppsScriptError, baris_absensi, batas_kompaksi, format_ekspor_tersedia,
+    get_absensi_cache, get_absensi_data, get_kinerja, get_master_karyawan, get_mirror,
+    get_outbox, hitung_rekap_bulanan, hitung_rekap_rentang, input_absensi_konkuren,
+    kirim_absensi_batch, kirim_post, kompaksi_absensi, mulai_pengirim_outbox,
+    mulai_sinkron_latar, potongan_harian, potongan_rekap, siapkan_impor, terukur, tulis_ekspor,
+    ukur_kinerja, unggah_impor
+)
 
-# GANTI INI dengan URL Web App lengkap yang Anda dapatkan setelah Deploy Apps Script!
-APPS_SCRIPT_URL = 'https://script.google.com/macros/s/AKfycbwaOxQ2ElWZlcmvdl3FgIATCJIvz4RqpXgd_FXl1clTCUpa_ToBHwByXrFdQKZjGXfD/exec' 
+# --- KONFIGURASI TAMPILAN ---
+# Konfigurasi data (URL Apps Script, mirror, outbox, batch, kompaksi, impor/ekspor, ...) ada di absensi_inti.py.
 
-SHEET_KARYAWAN = 'Karyawan'
-SHEET_ABSENSI = 'Absensi Harian'
+# Jumlah tanggal input cepat yang state edit-nya disimpan per sesi; tanggal yang paling
+# lama tidak dibuka dibuang lebih dulu.
+GRID_TANGGAL_MAKS = 3
 
-# DAFTAR STATUS LENGKAP
-STATUS_ABSENSI = ['masuk', 'sakit', 'izin', 'alpha', '1/2 hari', 'resign', 'libur', 'kosong']
+# Jumlah hasil perhitungan tab (rekap, tinjauan) per kombinasi parameter yang disimpan per
+# sesi; hasil yang paling lama tidak dipakai dibuang lebih dulu.
+HASIL_TAB_MAKS = 8
+
+# Panel debug kinerja per rerun (juga bisa dibuka dengan ?debug=1 di URL). Log terstruktur
+# diatur di absensi_inti.py (KINERJA_LOG_AKTIF).
+KINERJA_PANEL_AKTIF = os.environ.get('ABSENSI_PANEL_KINERJA') == '1'
 
 # Peta Status untuk tampilan Button/Radio dan Key (untuk disimpan ke Sheets)
 STATUS_DISPLAY = {
@@ -28,6 +46,7 @@ STATUS_DISPLAY = {
     'kosong': '⚪ Kosong',
 }
 
+
 # Mapping untuk warna tombol (Saat tombol TIDAK aktif/secondary)
 STATUS_COLOR = {
     'masuk': 'primary', 
@@ -40,87 +59,49 @@ STATUS_COLOR = {
     'kosong': 'secondary', 
 }
 
-# --- FUNGSI KOMUNIKASI API (Apps Script) ---
-def get_data_from_sheets(sheet_name):
-    """Membaca data dari Google Sheets melalui Apps Script API (GET)."""
-    try:
-        response = requests.get(APPS_SCRIPT_URL, params={'sheet': sheet_name}, timeout=10)
-        response.raise_for_status() 
-        if not response.text.strip():
-            st.exception("Error: Respons dari Apps Script kosong. Mohon periksa URL dan status deployment Apps Script Anda.")
-            return None
-        result = response.json()
-        if result['status'] == 200:
-            return result['data']
-        else:
-            st.exception(f"Error dari Apps Script (GET): {result['message']}")
-            return None
-    except requests.exceptions.Timeout:
-        st.exception("Gagal koneksi: Permintaan waktu tunggu (timeout) ke Apps Script.")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.exception(f"Gagal koneksi ke Apps Script API. Pastikan URL benar: {e}")
-        return None
-    except json.JSONDecodeError as e:
-        st.exception(f"Gagal memproses respons (JSON Error). Apps Script mungkin mengembalikan HTML/Teks Error. Kesalahan: {e}")
-        st.code(response.text, language='text', label="Raw Apps Script Response")
-        return None
-    except Exception as e:
-        st.exception(f"Terjadi kesalahan tak terduga: {e}")
-        return None
-
-def post_data_to_sheets(sheet_name, payload):
-    """Menulis data ke Google Sheets melalui Apps Script API (POST)."""
+def post_data_to_sheets(sheet_name, payload, action=None, idempoten=False):
+    """
+    Menulis data ke Google Sheets melalui Apps Script API (POST). Penulisan tidak diulang
+    setelah timeout baca (bisa membuat baris ganda); idempoten=True hanya untuk aksi yang
+    aman diulang.
+    """
     try:
-        response = requests.post(APPS_SCRIPT_URL, params={'sheet': sheet_name}, json=payload, timeout=10)
-        response.raise_for_status() 
-        if not response.text.strip():
-            st.exception("Error POST: Respons dari Apps Script kosong. Mohon periksa status deployment.")
-            return False
-        result = response.json()
-        if result['status'] == 200:
-            return result['data'] if 'data' in result else True
-        else:
-            st.exception(f"Error dari Apps Script (POST): {result['message']}")
-            return False
-    except requests.exceptions.Timeout:
-        st.exception("Gagal koneksi: Permintaan waktu tunggu (timeout) saat POST data.")
-        return False
-    except requests.exceptions.RequestException as e:
-        st.exception(f"Gagal koneksi ke Apps Script API. Pastikan URL benar: {e}")
-        return False
-    except json.JSONDecodeError as e:
-        st.exception(f"Gagal memproses respons POST (JSON Error). Apps Script mungkin mengembalikan HTML/Teks Error. Kesalahan: {e}")
-        st.code(response.text, language='text', label="Raw Apps Script Response (POST)")
-        return False
-    except Exception as e:
-        st.exception(f"Terjadi kesalahan tak terduga saat POST: {e}")
+        return kirim_post(sheet_name, payload, action=action, idempoten=idempoten)
+    except AppsScriptError as e:
+        st.exception(str(e))
+        if e.raw_text is not None:
+            st.code(e.raw_text, language='text', label="Raw Apps Script Response (POST)")
         return False
 
 
-# --- 1. SETUP DATA KARYAWAN (BACA DARI SHEETS) ---
-def load_karyawan():
-    data = get_data_from_sheets(SHEET_KARYAWAN)
-    if data:
-        df = pd.DataFrame(data)
-        if not df.empty:
-            df['ID_Karyawan'] = df['ID_Karyawan'].astype(str).str.strip()
-            df['ID_Karyawan'] = pd.to_numeric(df['ID_Karyawan'], errors='coerce').fillna(0).astype(int) 
-            st.session_state.df_karyawan = df.set_index('ID_Karyawan')
-        else:
-            st.session_state.df_karyawan = pd.DataFrame(columns=['ID_Karyawan', 'Nama_Karyawan']).set_index('ID_Karyawan')
-    else:
-        st.session_state.df_karyawan = pd.DataFrame(columns=['ID_Karyawan', 'Nama_Karyawan']).set_index('ID_Karyawan')
+# --- 1. MASTER KARYAWAN DI SESI ---
+def load_karyawan(dari_sheets=False):
+    """Memuat ulang master karyawan bersama (dari mirror lokal atau dari sheets) lalu memasangnya di sesi ini."""
+    get_master_karyawan().muat(dari_sheets=dari_sheets)
+    pakai_master_karyawan()
 
-# --- FUNGSI CACHE UNTUK DATA ABSENSI ---
-@st.cache_data(show_spinner="Memuat data absensi terbaru...")
-def get_absensi_data():
-    """Mengambil semua data absensi dari sheets dengan caching."""
-    return get_data_from_sheets(SHEET_ABSENSI)
+def pakai_master_karyawan():
+    """Memasang master karyawan bersama di session state jika versinya lebih baru dari yang dipakai sesi ini."""
+    master = get_master_karyawan()
+    if not master.termuat:
+        # Start pertama tanpa mirror dan Sheets gagal: coba lagi di rerun berikutnya
+        master.muat()
+        if not master.termuat:
+            st.error("Gagal memuat master karyawan dari Google Sheets. Periksa URL dan status deployment Apps Script (detail di log).")
+    versi, df, nama_per_id, id_per_nama = master.snapshot()
+    if st.session_state.get('versi_karyawan') != versi:
+        st.session_state.df_karyawan = df
+        st.session_state.nama_per_id = nama_per_id
+        st.session_state.id_per_nama = id_per_nama
+        st.session_state.versi_karyawan = versi
 
 # --- INIITALISASI AWAL ---
-if 'df_karyawan' not in st.session_state:
-    load_karyawan() 
+get_kinerja().mulai_rerun()
+mulai_sinkron_latar()
+mulai_pengirim_outbox()
+
+pakai_master_karyawan()
+if 'df_absensi_harian' not in st.session_state:
     st.session_state.df_absensi_harian = pd.DataFrame(columns=['Tanggal', 'ID_Karyawan', 'Status_Kehadiran'])
 
 if 'rekap_tahun' not in st.session_state:
@@ -134,25 +115,26 @@ if 'quick_input_date' not in st.session_state:
 # --- 2. FUNGSI INPUT KARYAWAN BARU (TULIS KE SHEETS) ---
 def tambah_karyawan(nama_baru):
     """Menambahkan nama karyawan baru ke sheets dan memperbarui session state."""
-    df_k = st.session_state.df_karyawan
-    
     nama_baru_clean = nama_baru.strip()
     
     if not nama_baru_clean:
         st.warning("Nama karyawan tidak boleh kosong.")
         return
         
-    if nama_baru_clean in df_k['Nama_Karyawan'].values:
+    if nama_baru_clean in st.session_state.id_per_nama:
         st.warning(f"Karyawan '{nama_baru_clean}' sudah ada dalam daftar.")
         return
 
     payload = {'nama_karyawan': nama_baru_clean}
     
+    # Tidak diulang otomatis: percobaan ulang bisa membuat karyawan ganda
     result = post_data_to_sheets(SHEET_KARYAWAN, payload)
     
     if result and 'id' in result:
         st.success(f"Karyawan '{nama_baru_clean}' (ID: {result['id']}) berhasil ditambahkan dan **diunggah**.")
-        load_karyawan() 
+        # Naikkan versi master bersama; sesi lain memakainya di rerun berikutnya tanpa memuat ulang sheet
+        get_master_karyawan().tambah(result['id'], nama_baru_clean)
+        pakai_master_karyawan()
         st.rerun() 
         
     elif result is not False:
@@ -161,20 +143,14 @@ def tambah_karyawan(nama_baru):
 # --- 3. FUNGSI INPUT ABSENSI HARIAN (TULIS KE SHEETS) ---
 def input_absensi(tanggal, nama_karyawan, status, produksi):
     """Mencatat absensi harian dan menyimpannya di Google Sheets."""
-    df_k = st.session_state.df_karyawan
-    
-    if df_k.empty:
+    if st.session_state.df_karyawan.empty:
         st.error("Daftar karyawan kosong. Tambahkan karyawan terlebih dahulu.")
         return False
 
-    try:
-        # Menggunakan .index[0] karena index adalah ID_Karyawan
-        karyawan_id = df_k[df_k['Nama_Karyawan'] == nama_karyawan].index[0]
-    except IndexError:
+    karyawan_id_std = st.session_state.id_per_nama.get(nama_karyawan)
+    if karyawan_id_std is None:
         st.error(f"Karyawan '{nama_karyawan}' tidak ditemukan di master list.")
         return False
-
-    karyawan_id_std = int(karyawan_id) 
     
     payload = {
         'tanggal': tanggal.strftime('%Y-%m-%d'),
@@ -182,116 +158,190 @@ def input_absensi(tanggal, nama_karyawan, status, produksi):
         'status': status,
         'produksi': produksi 
     }
+
+    if OUTBOX_AKTIF:
+        # Commit ke outbox lokal; pengiriman ke Sheets dilakukan di latar belakang
+        antrekan_absensi(tanggal, [{'id_karyawan': karyawan_id_std, 'status': status, 'produksi': produksi}])
+        return True
     
-    if post_data_to_sheets(SHEET_ABSENSI, payload):
+    result = post_data_to_sheets(SHEET_ABSENSI, payload)
+    if result:
+        # Write-through: pakai baris echo dari Apps Script bila ada
+        echo = result if isinstance(result, dict) else {}
+        row = echo.get('row') or baris_absensi(tanggal, karyawan_id_std, status, produksi)
+        get_absensi_cache().terapkan_tulis([(row, echo.get('index'))])
         return True
     else:
         return False
 
+def input_absensi_batch(tanggal, rows):
+    """
+    Seperti kirim_absensi_batch, tetapi menampilkan error ke operator dan mengembalikan
+    None jika permintaan gagal seluruhnya.
+    """
+    try:
+        return kirim_absensi_batch(tanggal, rows)
+    except AppsScriptError as e:
+        st.exception(str(e))
+        if e.raw_text is not None:
+            st.code(e.raw_text, language='text', label="Raw Apps Script Response (POST)")
+        return None
 
 # --- 4. FUNGSI REKAP BULANAN (BACA & PROSES DARI CACHE) ---
+def hasil_tab(nama, parameter, hitung):
+    """
+    Hasil `hitung()` untuk view `nama` dengan `parameter` (tuple hashable), disimpan per sesi.
+    Dihitung ulang hanya jika parameter, isi data absensi (stempel cache) atau versi master
+    karyawan berubah, sehingga rerun dari widget lain di tab yang sama tidak menghitung ulang.
+    Selama start dingin (mirror belum termuat) hasil tidak disimpan; slice GET bersaring
+    sudah di-cache oleh AbsensiCache.
+    """
+    cache = get_absensi_cache()
+    if not cache.termuat:
+        return hitung()
+    kunci = (nama, parameter, cache.stempel(), st.session_state.versi_karyawan)
+    hasil = st.session_state.setdefault('hasil_tab', {})
+    if kunci in hasil:
+        hasil[kunci] = hasil.pop(kunci)
+        return hasil[kunci]
+    hasil[kunci] = nilai = hitung()
+    while len(hasil) > HASIL_TAB_MAKS:
+        del hasil[next(iter(hasil))]
+    return nilai
+
+@terukur('rekap_bulanan')
 def rekap_bulanan(tahun, bulan):
     """
-    Mengambil data dari cache, memfilter, dan menghitung rekap.
-    Diurutkan berdasarkan ID_Karyawan terkecil.
+    Rekap bulanan untuk master karyawan sesi ini (lihat hitung_rekap_bulanan).
+    Diurutkan berdasarkan ID_Karyawan terkecil; error ditampilkan ke operator.
     """
-    
-    data_absensi = get_absensi_data()
-    
-    if not data_absensi or st.session_state.df_karyawan.empty:
+    cache = get_absensi_data()
+    if cache is None or st.session_state.df_karyawan.empty:
         return pd.DataFrame()
-        
-    try:
-        df_absensi = pd.DataFrame(data_absensi) 
-        
-        # MODIFIKASI: Sertakan 'ID_Karyawan' di kolom_rekap untuk kasus data kosong
-        kolom_rekap_final = ['ID_Karyawan', 'Nama_Karyawan', 'Total Produksi'] + STATUS_ABSENSI
-        
-        if df_absensi.empty:
-            df_rekap = st.session_state.df_karyawan.copy().reset_index()
-            for col in kolom_rekap_final:
-                if col not in df_rekap.columns:
-                    df_rekap[col] = 0
-            df_rekap['Total Produksi'] = 0
-            # MODIFIKASI: Urutkan berdasarkan 'ID_Karyawan'
-            return df_rekap[kolom_rekap_final].sort_values(by='ID_Karyawan').reset_index(drop=True)
-
-        # --- PEMROSESAN DATA ---
-        
-        df_absensi['Tanggal'] = pd.to_datetime(df_absensi['Tanggal'], errors='coerce', utc=True)
-        df_absensi['Tanggal'] = df_absensi['Tanggal'].dt.tz_convert('Asia/Jakarta')
-        df_absensi['Tanggal'] = df_absensi['Tanggal'].dt.normalize().dt.tz_localize(None)
 
-        df_absensi['ID_Karyawan'] = pd.to_numeric(df_absensi['ID_Karyawan'], errors='coerce').fillna(0).astype(int)
-        
-        if 'Produksi' in df_absensi.columns:
-            df_absensi['Produksi'] = pd.to_numeric(df_absensi['Produksi'], errors='coerce').fillna(0)
-        else:
-            df_absensi['Produksi'] = 0
-
-        df_filtered = df_absensi[
-            (df_absensi['Tanggal'].dt.year == tahun) & 
-            (df_absensi['Tanggal'].dt.month == bulan)
-        ].copy() 
-        
-        if df_filtered.empty: 
-            df_rekap = st.session_state.df_karyawan.copy().reset_index()
-            for col in kolom_rekap_final:
-                if col not in df_rekap.columns:
-                    df_rekap[col] = 0
-            df_rekap['Total Produksi'] = 0
-            # MODIFIKASI: Urutkan berdasarkan 'ID_Karyawan'
-            return df_rekap[kolom_rekap_final].sort_values(by='ID_Karyawan').reset_index(drop=True)
-
-        # --- PERBAIKAN FINAL UNTUK KONFLIK NAMA KOLOM 'Tanggal' ---
-        
-        df_filtered['Tanggal_Key'] = df_filtered['Tanggal'].dt.normalize()
-        
-        df_final_daily = df_filtered.sort_values('Tanggal').groupby(
-            ['ID_Karyawan', 'Tanggal_Key'] 
-        ).last().reset_index() 
-        
-        df_final_daily = df_final_daily.drop(columns=['Tanggal'])
-        df_final_daily = df_final_daily.rename(columns={'Tanggal_Key': 'Tanggal'})
+    try:
+        return hasil_tab(
+            'rekap_bulanan', (tahun, bulan),
+            functools.partial(hitung_rekap_bulanan, cache, st.session_state.df_karyawan, tahun, bulan)
+        )
+    except Exception as e:
+        st.error(f"Gagal memproses data rekap. Pastikan format kolom di Sheets sudah benar: {e}")
+        return pd.DataFrame()
 
-        # Hitung jumlah status & total produksi
-        df_counts = df_final_daily.groupby(['ID_Karyawan', 'Status_Kehadiran']).size().unstack(fill_value=0)
-        df_produksi = df_final_daily.groupby('ID_Karyawan')['Produksi'].sum().reset_index()
-        df_produksi = df_produksi.rename(columns={'Produksi': 'Total Produksi'})
-        df_produksi = df_produksi.set_index('ID_Karyawan')
+@terukur('rekap_rentang')
+def rekap_rentang(dari, sampai, per='bulan'):
+    """
+    Rekap absensi untuk rentang tanggal [dari, sampai], dikelompokkan per bulan/kuartal/tahun
+    (lihat PERIODE_REKAP). Semua periode dihitung dalam satu agregasi groupby atas data
+    ternormalisasi; periode di tepi rentang hanya menghitung tanggal di dalam rentang.
+    Mengembalikan satu baris per (Periode, karyawan), diurutkan berdasarkan periode lalu ID.
+    """
+    cache = get_absensi_data()
+    df_k = st.session_state.df_karyawan
 
-        df_rekap = st.session_state.df_karyawan.copy() 
-        
-        df_rekap = df_rekap.merge(df_counts, left_index=True, right_index=True, how='left')
-        df_rekap = df_rekap.merge(df_produksi, left_index=True, right_index=True, how='left')
-        
-        for status in STATUS_ABSENSI:
-            if status not in df_rekap.columns:
-                df_rekap[status] = 0
-                
-        df_rekap = df_rekap.fillna(0)
-        
-        for status in STATUS_ABSENSI:
-            df_rekap[status] = df_rekap[status].astype(int)
-            
-        df_rekap['Total Produksi'] = df_rekap['Total Produksi'].astype(int)
-            
-        df_rekap = df_rekap.reset_index() # ID_Karyawan sekarang menjadi kolom lagi
+    if cache is None or df_k.empty or dari > sampai:
+        return pd.DataFrame(columns=KOLOM_REKAP_RENTANG)
 
-        # MODIFIKASI: Pastikan kolom output menyertakan ID_Karyawan
-        df_rekap = df_rekap[kolom_rekap_final]
-        
-        # MODIFIKASI PENGURUTAN: Urutkan berdasarkan ID_Karyawan
-        return df_rekap.sort_values(by='ID_Karyawan').reset_index(drop=True)
-            
+    try:
+        return hasil_tab('rekap_rentang', (dari, sampai, per), lambda: hitung_rekap_rentang(
+            cache.query_harian(dari, sampai), dari, sampai, PERIODE_REKAP[per][0], df_k.index, st.session_state.nama_per_id
+        ))
     except Exception as e:
         st.error(f"Gagal memproses data rekap. Pastikan format kolom di Sheets sudah benar: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(columns=KOLOM_REKAP_RENTANG)
+
+
+@terukur('tinjauan_harian')
+def tinjauan_harian(df_final_daily):
+    """Menyiapkan status final satu tanggal untuk tab Tinjauan Harian (nama, label status, urut ID)."""
+    # Merge dengan data karyawan untuk mendapatkan Nama Karyawan
+    df_master = st.session_state.df_karyawan.reset_index()
+    df_final_daily = df_final_daily.merge(df_master[['ID_Karyawan', 'Nama_Karyawan']], on='ID_Karyawan', how='left')
+    
+    # Kolom untuk ditampilkan
+    kolom_tinjauan = ['ID_Karyawan', 'Tanggal', 'Nama_Karyawan', 'Status_Kehadiran', 'Produksi']
+    df_display = df_final_daily[kolom_tinjauan].copy()
+
+    # Ganti nama Status untuk tampilan
+    df_display['Status_Display'] = df_display['Status_Kehadiran'].map(STATUS_DISPLAY)
+    
+    # MODIFIKASI: Urutkan berdasarkan ID Karyawan terkecil
+    return df_display.sort_values(by='ID_Karyawan')
 
 
 # --- 6. FUNGSI BARU UNTUK INPUT CEPAT (BERBASIS TOMBOL) ---
 
+KODE_ENTRI_BARU = -2     # belum ada data di Sheets untuk (karyawan, tanggal)
+KODE_STATUS_LAIN = -1    # status di Sheets di luar STATUS_ABSENSI
+
+def kode_status(status):
+    """Mengubah deret status menjadi kode int8 (posisi di STATUS_ABSENSI)."""
+    status = pd.Series(status, dtype=object)
+    kode = pd.Categorical(status, categories=STATUS_ABSENSI).codes.astype(np.int8)
+    kode[(status == '__NEW_ENTRY__').to_numpy()] = KODE_ENTRI_BARU
+    return kode
+
+class GridInputCepat:
+    """
+    State edit input cepat untuk satu tanggal: array status (kode) dan produksi yang
+    diindeks posisi karyawan, plus peta ID -> posisi untuk callback tombol.
+    """
+
+    KODE_KOSONG = STATUS_ABSENSI.index('kosong')
+
+    def __init__(self, ids, kode_awal, produksi_awal):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.posisi = {id_karyawan: i for i, id_karyawan in enumerate(self.ids.tolist())}
+        # Entri baru ditampilkan sebagai 'kosong' di UI
+        self.kode = np.where(kode_awal == KODE_ENTRI_BARU, self.KODE_KOSONG, kode_awal).astype(np.int8)
+        self.produksi = np.asarray(produksi_awal, dtype=np.int64).copy()
+
+    def sesuaikan(self, ids, kode_awal, produksi_awal):
+        """Menyesuaikan dengan master karyawan baru; edit untuk karyawan yang masih ada dipertahankan."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if np.array_equal(ids, self.ids):
+            return self
+        baru = GridInputCepat(ids, kode_awal, produksi_awal)
+        lama = np.array([self.posisi.get(i, -1) for i in ids.tolist()], dtype=np.int64)
+        ada = lama >= 0
+        baru.kode[ada] = self.kode[lama[ada]]
+        baru.produksi[ada] = self.produksi[lama[ada]]
+        return baru
+
+    def status(self, pos):
+        kode = self.kode[pos]
+        return STATUS_ABSENSI[kode] if kode >= 0 else None
+
+    def atur_status(self, id_karyawan, status_key):
+        self.kode[self.posisi[id_karyawan]] = STATUS_ABSENSI.index(status_key)
+
+    def atur_produksi(self, id_karyawan, produksi):
+        self.produksi[self.posisi[id_karyawan]] = produksi
+
+    def perubahan(self, kode_awal, produksi_awal):
+        """Mask baris yang berbeda dari data awal (entri baru berstatus 'kosong' ikut terhitung)."""
+        should_update = (self.kode != kode_awal) | (self.produksi != produksi_awal)
+        should_update |= (kode_awal == KODE_ENTRI_BARU) & (self.kode == self.KODE_KOSONG)
+        return should_update
+
+def ambil_grid_input_cepat(tanggal_input):
+    """Mengambil state grid untuk tanggal tertentu (None jika belum ada) dan menandainya baru dipakai."""
+    grids = st.session_state.setdefault('grid_input_cepat', {})
+    grid = grids.pop(tanggal_input, None)
+    if grid is not None:
+        grids[tanggal_input] = grid
+    return grid
+
+def simpan_grid_input_cepat(tanggal_input, grid):
+    """Menyimpan state grid dan membuang tanggal yang paling lama tidak dibuka (maks GRID_TANGGAL_MAKS)."""
+    grids = st.session_state.setdefault('grid_input_cepat', {})
+    grids.pop(tanggal_input, None)
+    grids[tanggal_input] = grid
+    while len(grids) > GRID_TANGGAL_MAKS:
+        del grids[next(iter(grids))]
+
 # Fungsi untuk memuat status dan produksi yang sudah tercatat
+@terukur('get_current_status')
 def get_current_status(tanggal_input):
     """Mengambil status dan produksi hari ini untuk semua karyawan."""
     
@@ -299,25 +349,15 @@ def get_current_status(tanggal_input):
     if df_k.empty:
         return pd.DataFrame()
 
-    data_absensi = get_absensi_data()
-    df_absensi = pd.DataFrame(data_absensi) if data_absensi else pd.DataFrame(columns=['Tanggal', 'ID_Karyawan', 'Status_Kehadiran', 'Produksi'])
+    cache = get_absensi_data()
 
-    if not df_absensi.empty:
-        df_absensi['Tanggal'] = pd.to_datetime(df_absensi['Tanggal'], errors='coerce', utc=True)
-        df_absensi['Tanggal'] = df_absensi['Tanggal'].dt.tz_convert('Asia/Jakarta').dt.normalize().dt.tz_localize(None)
-        df_absensi['ID_Karyawan'] = pd.to_numeric(df_absensi['ID_Karyawan'], errors='coerce').fillna(0).astype(int)
-        
-        tanggal_str = tanggal_input.strftime('%Y-%m-%d')
-        df_filtered = df_absensi[df_absensi['Tanggal'].dt.normalize() == pd.to_datetime(tanggal_str)]
+    if cache is not None:
+        # Query mirror hanya untuk tanggal yang dipilih; hasilnya sudah final per (ID, tanggal)
+        df_filtered = cache.query_harian(tanggal_input, tanggal_input)
         
-        # FIX: Gunakan .last() setelah di-sort untuk memastikan status terakhir yang diambil
-        df_current_status = df_filtered.sort_values(by='Tanggal').groupby('ID_Karyawan').agg(
-            {'Status_Kehadiran': 'last', 'Produksi': 'last'}
-        ).reset_index()
-        
-        df_current_status = df_current_status.rename(columns={'Status_Kehadiran': 'Status_Awal', 'Produksi': 'Produksi_Awal'})
-        df_current_status['Status_Awal'] = df_current_status['Status_Awal'].str.lower()
-        df_current_status['Produksi_Awal'] = pd.to_numeric(df_current_status['Produksi_Awal'], errors='coerce').fillna(0).astype(int)
+        df_current_status = df_filtered[['ID_Karyawan', 'Status_Kehadiran', 'Produksi']].rename(
+            columns={'Status_Kehadiran': 'Status_Awal', 'Produksi': 'Produksi_Awal'}
+        )
     else:
         df_current_status = pd.DataFrame(columns=['ID_Karyawan', 'Status_Awal', 'Produksi_Awal'])
     
@@ -329,44 +369,133 @@ def get_current_status(tanggal_input):
     df_merged = df_k_reset.merge(df_current_status, on='ID_Karyawan', how='left')
     
     # PERBAIKAN BUG KOSONG: Gunakan placeholder unik '__NEW_ENTRY__' untuk data yang benar-benar baru (NULL)
-    df_merged['Status_Awal'] = df_merged['Status_Awal'].fillna('__NEW_ENTRY__').astype(str)
+    df_merged['Status_Awal'] = df_merged['Status_Awal'].astype(object).fillna('__NEW_ENTRY__').astype(str)
     df_merged['Produksi_Awal'] = df_merged['Produksi_Awal'].fillna(0).astype(int)
     
-    # Siapkan session state untuk produksi (agar bisa di-edit)
-    for index, row in df_merged.iterrows():
-        key_status = f"status_{row['ID_Karyawan']}_{tanggal_input}"
-        key_prod = f"prod_{row['ID_Karyawan']}_{tanggal_input}"
-        
-        # Inisialisasi session state untuk status
-        initial_status_session = row['Status_Awal']
-        if initial_status_session == '__NEW_ENTRY__':
-            initial_status_session = 'kosong' # Tampilkan 'kosong' di UI untuk entri baru
-
-        if key_status not in st.session_state:
-            st.session_state[key_status] = initial_status_session
-            
-        # Inisialisasi session state untuk produksi
-        if key_prod not in st.session_state:
-            st.session_state[key_prod] = row['Produksi_Awal']
+    # Siapkan state grid (array status/produksi per posisi karyawan) agar bisa di-edit
+    ids = df_merged['ID_Karyawan'].to_numpy()
+    kode_awal = kode_status(df_merged['Status_Awal'])
+    produksi_awal = df_merged['Produksi_Awal'].to_numpy()
+    grid = ambil_grid_input_cepat(tanggal_input)
+    if grid is None:
+        grid = GridInputCepat(ids, kode_awal, produksi_awal)
+    else:
+        grid = grid.sesuaikan(ids, kode_awal, produksi_awal)
+    simpan_grid_input_cepat(tanggal_input, grid)
         
     return df_merged[['ID_Karyawan', 'Nama_Karyawan', 'Status_Awal', 'Produksi_Awal']]
 
 
 def handle_status_click(id_karyawan, tanggal_input, status_key):
     """Callback function saat tombol status diklik."""
-    key_status = f"status_{id_karyawan}_{tanggal_input}"
-    key_prod = f"prod_{id_karyawan}_{tanggal_input}"
+    grid = ambil_grid_input_cepat(tanggal_input)
     
-    # Perbarui status di session state
-    st.session_state[key_status] = status_key
+    # Perbarui status di state grid
+    grid.atur_status(id_karyawan, status_key)
     
     # FIX: Memastikan status non-produksi mereset produksi menjadi 0
     if status_key in ['alpha', 'sakit', 'izin', 'resign', 'libur', 'kosong', '1/2 hari']: 
-        st.session_state[key_prod] = 0
+        grid.atur_produksi(id_karyawan, 0)
+
+def perubahan_input_cepat(df_data, grid):
+    """
+    Membandingkan state grid dengan data awal secara vektor dan mengembalikan payload
+    [{'id_karyawan', 'status', 'produksi'}] untuk baris yang perlu disimpan. Status di luar
+    STATUS_ABSENSI (KODE_STATUS_LAIN) yang tidak diubah dikirim apa adanya dari Status_Awal.
+    """
+    should_update = grid.perubahan(kode_status(df_data['Status_Awal']), df_data['Produksi_Awal'].to_numpy())
+    return [
+        {'id_karyawan': id_karyawan, 'status': status_awal if kode == KODE_STATUS_LAIN else STATUS_ABSENSI[kode], 'produksi': produksi}
+        for id_karyawan, kode, produksi, status_awal in zip(
+            grid.ids[should_update].tolist(), grid.kode[should_update].tolist(), grid.produksi[should_update].tolist(),
+            df_data['Status_Awal'].to_numpy()[should_update].tolist()
+        )
+    ]
+
+def bersihkan_state_input_cepat(tanggal_input):
+    """Menghapus state grid dan widget input cepat untuk satu tanggal agar dimuat ulang dari data terbaru."""
+    grid = st.session_state.get('grid_input_cepat', {}).pop(tanggal_input, None)
+    if grid is None:
+        return
+    for id_karyawan in grid.ids.tolist():
+        st.session_state.pop(f"prod_input_ui_{id_karyawan}_{tanggal_input}", None)
+
+def tampilkan_outbox():
+    """Menampilkan entri outbox yang belum terkirim (menunggu/gagal) beserta aksi operator."""
+    df_outbox = get_outbox().entri()
+    if df_outbox.empty:
+        return
+
+    jumlah_pending = int((df_outbox['keadaan'] == 'pending').sum())
+    jumlah_gagal = int((df_outbox['keadaan'] == 'gagal').sum())
+    with st.expander(f"📤 Antrean unggah ke Sheets: {jumlah_pending} menunggu, {jumlah_gagal} gagal", expanded=jumlah_gagal > 0):
+        df_tampil = df_outbox.copy()
+        df_tampil['Nama_Karyawan'] = df_tampil['id_karyawan'].map(st.session_state.nama_per_id)
+        df_tampil['Status'] = df_tampil['status'].map(STATUS_DISPLAY)
+        st.dataframe(
+            df_tampil[['tanggal', 'id_karyawan', 'Nama_Karyawan', 'Status', 'produksi', 'keadaan', 'percobaan', 'pesan']].rename(columns={
+                'tanggal': 'Tanggal',
+                'id_karyawan': 'ID',
+                'Nama_Karyawan': 'Nama Karyawan',
+                'produksi': 'Produksi',
+                'keadaan': 'Keadaan',
+                'percobaan': 'Percobaan',
+                'pesan': 'Pesan Terakhir'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
 
+        col_kirim, col_ulang, col_buang = st.columns(3)
+        if col_kirim.button("🔄 Kirim Sekarang", key='outbox_kirim'):
+            mulai_pengirim_outbox().bangunkan()
+        if col_ulang.button("↩️ Coba Lagi yang Gagal", key='outbox_ulang', disabled=jumlah_gagal == 0):
+            get_outbox().coba_lagi_gagal()
+            mulai_pengirim_outbox().bangunkan()
+            st.rerun()
+        if col_buang.button("🗑️ Buang yang Gagal", key='outbox_buang', disabled=jumlah_gagal == 0):
+            get_outbox().buang_gagal()
+            st.rerun()
+
+def tampilkan_kompaksi():
+    """Aksi admin: kompaksi log Absensi Harian untuk periode tertutup."""
+    cache = get_absensi_cache()
+    terakhir = get_mirror().kompaksi_terakhir()
+    st.subheader("Kompaksi Log Absensi")
+    st.caption(
+        f"Sheet {SHEET_ABSENSI} saat ini {cache.offset:,} baris. Kompaksi terakhir: "
+        f"{terakhir.strftime('%d %B %Y') if terakhir else 'belum pernah'}. "
+        f"Baris koreksi yang tergantikan dipindah ke sheet {SHEET_ARSIP}."
+    )
+    with st.form("form_kompaksi"):
+        sampai = st.date_input("Ringkas data s.d. tanggal", value=batas_kompaksi(), max_value=batas_kompaksi(), key='kompaksi_sampai')
+        if st.form_submit_button("🧹 Jalankan Kompaksi"):
+            try:
+                with st.spinner("Meringkas log absensi..."):
+                    hasil = kompaksi_absensi(sampai)
+                st.success(
+                    f"Kompaksi selesai: {hasil['sebelum']:,} → {hasil['sesudah']:,} baris "
+                    f"({hasil['diarsipkan']:,} baris diarsipkan)."
+                )
+            except AppsScriptError as e:
+                st.error(f"Kompaksi gagal: {e}")
+
+@st.fragment
+@terukur('input_cepat.render')
 def tampilkan_input_cepat_harian_button():
-    """Menampilkan input cepat harian berbasis tombol dan memproses penyimpanan."""
+    """
+    Menampilkan input cepat harian berbasis tombol dan memproses penyimpanan.
+
+    Dijalankan sebagai fragment: klik tombol status/ubah produksi hanya me-render ulang grid ini,
+    bukan seluruh aplikasi. Setelah penyimpanan, st.rerun() memuat ulang seluruh aplikasi agar
+    tab lain ikut melihat data baru.
+    """
     
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        # Rerun fragment saja: pengukuran dicatat sebagai rerun tersendiri
+        get_kinerja().mulai_rerun('fragment')
+
     tanggal_input = st.session_state.quick_input_date 
     # Data sudah diurutkan berdasarkan ID di get_current_status
     df_data = get_current_status(tanggal_input) 
@@ -391,17 +520,14 @@ def tampilkan_input_cepat_harian_button():
         
     st.markdown('***') # Garis pemisah Header
         
-    updates_made = False
+    grid = ambil_grid_input_cepat(tanggal_input)
+    produksi_ui = []
     
     # Tampilkan Data Karyawan
-    for index, row in df_data.iterrows():
-        id_karyawan = row['ID_Karyawan']
-        nama_karyawan = row['Nama_Karyawan']
-        
-        # Ambil status dan produksi saat ini dari session state
-        current_status_key = st.session_state[f"status_{id_karyawan}_{tanggal_input}"]
-        current_prod = st.session_state[f"prod_{id_karyawan}_{tanggal_input}"]
-        
+    for pos, (id_karyawan, nama_karyawan, current_prod) in enumerate(zip(
+        grid.ids.tolist(), df_data['Nama_Karyawan'].tolist(), grid.produksi.tolist()
+    )):
+        current_status_key = grid.status(pos)
         cols = st.columns(column_widths)
         
         # Kolom ID dan Nama
@@ -409,14 +535,14 @@ def tampilkan_input_cepat_harian_button():
         cols[1].write(nama_karyawan)
         
         # Kolom Produksi (Number Input)
-        st.session_state[f"prod_{id_karyawan}_{tanggal_input}"] = cols[2].number_input(
+        produksi_ui.append(cols[2].number_input(
             "Produksi",
             min_value=0,
             value=current_prod, 
             step=1,
             key=f"prod_input_ui_{id_karyawan}_{tanggal_input}", 
             label_visibility="collapsed"
-        )
+        ))
         
         # Kolom Tombol Status
         for i, status_key in enumerate(STATUS_ABSENSI):
@@ -433,117 +559,235 @@ def tampilkan_input_cepat_harian_button():
                 use_container_width=True
             )
 
-        # Logika Cek Perubahan
-        status_awal_ui = row['Status_Awal']
-        produksi_awal_ui = row['Produksi_Awal']
-        
-        is_new_entry = status_awal_ui == '__NEW_ENTRY__'
-        
-        # Cek apakah ada perubahan yang perlu disimpan
-        if current_status_key != status_awal_ui or current_prod != produksi_awal_ui:
-            updates_made = True
-            
-        # Jika ini adalah entri baru dan statusnya 'kosong', tetap anggap ada perubahan
-        if is_new_entry and current_status_key == 'kosong':
-            updates_made = True 
+    grid.produksi[:] = produksi_ui
 
+    # Logika Cek Perubahan (vektor, sekali untuk semua karyawan)
+    rows_to_update = perubahan_input_cepat(df_data, grid)
+    updates_made = bool(rows_to_update)
 
     st.markdown("---")
 
     # --- 3. LOGIKA PENYIMPANAN ---
     
     if st.button("💾 Simpan Perubahan Absensi Harian ke Google Sheets", disabled=not updates_made):
-        
-        rows_to_update = []
-        success_count = 0
-        
-        for index, row in df_data.iterrows():
-            id_karyawan = row['ID_Karyawan']
+        simpan_input_cepat(tanggal_input, rows_to_update)
+
+
+@terukur('input_cepat.simpan')
+def simpan_input_cepat(tanggal_input, rows_to_update):
+    """Menyimpan perubahan input cepat satu tanggal (outbox, batch, atau per baris paralel) lalu memuat ulang aplikasi."""
+    success_count = 0
+
+    if not rows_to_update:
+        st.info("Tidak ada perubahan yang perlu disimpan.")
+        return
+
+    if OUTBOX_AKTIF:
+        # Commit ke outbox lokal (milidetik); pengirim latar mengunggah ke Sheets
+        antrekan_absensi(tanggal_input, rows_to_update)
+        st.toast(f"Absensi {len(rows_to_update)} karyawan pada {tanggal_input} tersimpan dan masuk antrean unggah ke Sheets.", icon="📤")
+        bersihkan_state_input_cepat(tanggal_input)
+        st.rerun()
+
+    placeholder_msg = st.empty()
+    placeholder_msg.info(f"Mengunggah **{len(rows_to_update)}** perubahan absensi ke Google Sheets...")
+    
+    failed_updates = []
+    nama_per_id = st.session_state.nama_per_id
+
+    if BATCH_ABSENSI_AKTIF:
+        # Satu round trip untuk semua perubahan pada tanggal ini
+        hasil_unggah = input_absensi_batch(tanggal_input, rows_to_update)
+    else:
+        # Tanpa aksi batch: kirim per baris secara paralel sambil menampilkan progres
+        hasil_unggah = input_absensi_konkuren(
+            tanggal_input, rows_to_update,
+            progres=lambda selesai, total: placeholder_msg.info(
+                f"Mengunggah perubahan absensi ke Google Sheets... **{selesai}/{total}** selesai"
+            )
+        )
+
+    if hasil_unggah is None:
+        failed_updates = [nama_per_id[item['id_karyawan']] for item in rows_to_update]
+    else:
+        for item, hasil in zip(rows_to_update, hasil_unggah):
+            if hasil['ok']:
+                success_count += 1
+            else:
+                st.error(f"Gagal menyimpan absensi {nama_per_id[item['id_karyawan']]}: {hasil['message']}")
+                failed_updates.append(nama_per_id[item['id_karyawan']])
             
-            status_awal = row['Status_Awal']
-            produksi_awal = row['Produksi_Awal']
+    # Logika pasca-update
+    if success_count > 0:
+        # Cache sudah diperbarui lewat write-through; rekonsiliasi berjalan di latar belakang
+        placeholder_msg.success(f"Absensi untuk **{success_count} karyawan** pada {tanggal_input} berhasil diperbarui dan **diunggah** ke Sheets!")
+        
+        if failed_updates:
+            st.warning(f"{len(failed_updates)} karyawan gagal diperbarui (lihat detail error di atas): {', '.join(failed_updates)}. Silakan coba lagi.")
             
-            # Nilai final diambil dari session state
-            status_final = st.session_state[f"status_{id_karyawan}_{tanggal_input}"]
-            produksi_final = st.session_state[f"prod_{id_karyawan}_{tanggal_input}"]
+        # Bersihkan session state terkait input cepat untuk memuat ulang status baru
+        bersihkan_state_input_cepat(tanggal_input)
+        
+        st.rerun() # Muat ulang tampilan setelah berhasil
+    else:
+        placeholder_msg.error("Gagal mengunggah data. Periksa koneksi atau Apps Script URL Anda.")
+        if failed_updates:
+            st.warning(f"Semua karyawan gagal diperbarui (lihat detail error di atas): {', '.join(failed_updates)}.")
 
-            # Logika Unggah yang Diperbaiki:
-            should_update = False
-            is_new_entry = status_awal == '__NEW_ENTRY__'
-            
-            if status_final != status_awal or produksi_final != produksi_awal:
-                should_update = True
-                
-            if is_new_entry and status_final == 'kosong':
-                should_update = True
-
-
-            if should_update:
-                rows_to_update.append({
-                    'id_karyawan': id_karyawan,
-                    'nama_karyawan': row['Nama_Karyawan'],
-                    'status': status_final,
-                    'produksi': produksi_final
-                })
-
-        if not rows_to_update:
-            st.info("Tidak ada perubahan yang perlu disimpan.")
+
+# --- 7. TAMPILAN IMPOR MASSAL (CSV/XLSX) ---
+def tampilkan_impor_massal():
+    """Tab impor massal: unggah berkas, pratinjau hasil validasi dan perubahan, lalu unggah."""
+    st.caption(
+        "Kolom: `Tanggal` (YYYY-MM-DD atau DD/MM/YYYY), `ID_Karyawan` dan/atau `Nama_Karyawan`, "
+        f"`Status_Kehadiran` ({', '.join(STATUS_ABSENSI)}), `Produksi` (opsional, default 0). "
+        "Baris yang sama persis dengan data tercatat dilewati; untuk karyawan dan tanggal yang sama, baris terakhir dipakai."
+    )
+    st.download_button("Unduh Template CSV", data=TEMPLATE_IMPOR.encode('utf-8'), file_name='template_impor_absensi.csv', mime='text/csv', key='impor_template')
+    berkas = st.file_uploader("Berkas CSV/XLSX", type=['csv', 'xlsx'], key='impor_berkas')
+    if berkas is None:
+        st.session_state.pop('impor_persiapan', None)
+        return
+
+    # Hasil validasi disimpan per berkas agar rerun lain tidak membaca ulang berkas
+    persiapan = st.session_state.get('impor_persiapan')
+    if persiapan is None or persiapan[0] != berkas.file_id:
+        try:
+            with st.spinner("Membaca dan memvalidasi berkas..."):
+                persiapan = (berkas.file_id, siapkan_impor(
+                    berkas, berkas.name, get_absensi_data(), st.session_state.nama_per_id))
+        except ValueError as e:
+            st.error(str(e))
             return
+        st.session_state.impor_persiapan = persiapan
+    hasil = persiapan[1]
+    df_rencana, df_galat = hasil['rencana'], hasil['galat']
 
-        placeholder_msg = st.empty()
-        placeholder_msg.info(f"Mengunggah **{len(rows_to_update)}** perubahan absensi ke Google Sheets...")
-        
-        failed_updates = []
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Baris Berkas", f"{hasil['jumlah_baris']:,}")
+    col2.metric("Tidak Valid", f"{len(df_galat):,}")
+    col3.metric("Duplikat di Berkas", f"{hasil['duplikat']:,}")
+    col4.metric("Sudah Sama", f"{hasil['tidak_berubah']:,}")
+    col5.metric("Akan Diunggah", f"{len(df_rencana):,}")
 
-        for item in rows_to_update:
-            try:
-                if input_absensi(tanggal_input, item['nama_karyawan'], item['status'], item['produksi']):
-                    success_count += 1
-                else:
-                    failed_updates.append(item['nama_karyawan'])
-            except Exception as e:
-                st.exception(f"Error fatal saat mengirim data untuk {item['nama_karyawan']}: {e}")
-                failed_updates.append(item['nama_karyawan'])
-                
-        # Logika pasca-update
-        if success_count > 0:
-            get_absensi_data.clear() # Hapus cache data absensi
-            time.sleep(0.5)
-            
-            placeholder_msg.success(f"Absensi untuk **{success_count} karyawan** pada {tanggal_input} berhasil diperbarui dan **diunggah** ke Sheets!")
-            
-            if failed_updates:
-                st.warning(f"{len(failed_updates)} karyawan gagal diperbarui (lihat detail error di atas): {', '.join(failed_updates)}. Silakan coba lagi.")
-                
-            # Bersihkan session state terkait input cepat untuk memuat ulang status baru
-            for key in list(st.session_state.keys()):
-                if (key.startswith(f'status_') or key.startswith(f'prod_')):
-                    if f'_{tanggal_input}' in key:
-                        del st.session_state[key]
-            
-            st.rerun() # Muat ulang tampilan setelah berhasil
-        else:
-            placeholder_msg.error("Gagal mengunggah data. Periksa koneksi atau Apps Script URL Anda.")
-            if failed_updates:
-                st.warning(f"Semua karyawan gagal diperbarui (lihat detail error di atas): {', '.join(failed_updates)}.")
+    if not df_galat.empty:
+        with st.expander(f"⚠️ {len(df_galat):,} baris tidak valid (dilewati)", expanded=df_rencana.empty):
+            st.dataframe(df_galat, hide_index=True, use_container_width=True)
+
+    if df_rencana.empty:
+        st.info("Tidak ada perubahan yang perlu diunggah.")
+        return
+
+    st.dataframe(
+        df_rencana.assign(
+            Status_Lama=df_rencana['Status_Lama'].map(STATUS_DISPLAY).fillna('—'),
+            Status_Kehadiran=df_rencana['Status_Kehadiran'].astype(str).map(STATUS_DISPLAY),
+        ).rename(columns={
+            'ID_Karyawan': 'ID',
+            'Nama_Karyawan': 'Nama Karyawan',
+            'Status_Lama': 'Status Lama',
+            'Status_Kehadiran': 'Status Baru',
+            'Produksi_Lama': 'Produksi Lama',
+            'Produksi': 'Produksi Baru'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    if st.button(f"📤 Unggah {len(df_rencana):,} Perubahan", type='primary', key='impor_unggah'):
+        progres = st.progress(0.0)
+        berhasil, gagal = unggah_impor(df_rencana, progres=progres.progress)
+        st.session_state.pop('impor_persiapan', None)
+        if berhasil:
+            tujuan = "masuk antrean unggah ke Sheets" if OUTBOX_AKTIF else "diunggah ke Sheets"
+            st.success(f"{berhasil:,} baris absensi berhasil {tujuan}.")
+        if gagal:
+            st.error(f"{len(gagal):,} baris gagal diunggah.")
+            st.dataframe(pd.DataFrame(gagal), hide_index=True, use_container_width=True)
+
+
+# --- 8. TAMPILAN EKSPOR ---
+def tampilkan_ekspor(kunci, label, nama_berkas, buat_potongan, kolom):
+    """
+    Pilihan format + tombol unduh. `kolom` adalah skema ekspor (KOLOM_EKSPOR_*).
+    `buat_potongan` (tanpa argumen, tanpa akses state sesi)
+    baru dipanggil saat tombol diklik, di thread unduhan Streamlit, sehingga render tab tidak
+    pernah membangun berkas yang tidak diunduh.
+    """
+    col_format, col_unduh = st.columns([1, 3])
+    with col_format:
+        format_ekspor = st.selectbox(
+            "Format", options=format_ekspor_tersedia(), format_func=lambda f: FORMAT_EKSPOR[f][0],
+            key=f'{kunci}_format', label_visibility='collapsed', persist_state='page'
+        )
+    _, mime, ekstensi, _ = FORMAT_EKSPOR[format_ekspor]
+    with col_unduh:
+        st.download_button(
+            label=label,
+            data=lambda: tulis_ekspor(buat_potongan(), format_ekspor, kolom),
+            file_name=f'{nama_berkas}{ekstensi}',
+            mime=mime,
+            key=kunci
+        )
+
+def tampilkan_ekspor_data(dari, sampai):
+    """Ekspor data harian final (semua karyawan) atau riwayat satu karyawan untuk rentang terpilih."""
+    cache = get_absensi_data()
+    nama_per_id = st.session_state.nama_per_id
+    with st.expander("📦 Ekspor Data Harian"):
+        id_terpilih = st.selectbox(
+            "Karyawan",
+            options=[None] + sorted(nama_per_id),
+            format_func=lambda i: "Semua karyawan" if i is None else f"{i} - {nama_per_id[i]}",
+            key='ekspor_harian_karyawan',
+            persist_state='page'
+        )
+        akhiran = '' if id_terpilih is None else f'_karyawan_{id_terpilih}'
+        tampilkan_ekspor(
+            'unduh_ekspor_harian',
+            "📥 Unduh Data Harian" if id_terpilih is None else "📥 Unduh Riwayat Karyawan",
+            f'absensi_harian_{dari}_{sampai}{akhiran}',
+            functools.partial(potongan_harian, cache, nama_per_id, dari, sampai, id_terpilih),
+            KOLOM_EKSPOR_HARIAN
+        )
+
+
+def tampilkan_panel_kinerja():
+    """Panel debug di sidebar: rincian waktu rerun ini, ringkasan terbaru, dan ekspor log JSON."""
+    kinerja = get_kinerja()
+    rerun = kinerja.rerun_aktif()
+    with st.sidebar.expander("⏱️ Kinerja (debug)", expanded=True):
+        df_rerun = pd.DataFrame(kinerja.catatan(rerun))
+        st.caption(f"Rerun #{rerun}")
+        if not df_rerun.empty:
+            st.dataframe(df_rerun.drop(columns=['waktu', 'rerun', 'jenis']), hide_index=True, use_container_width=True)
+
+        df_semua = pd.DataFrame(kinerja.catatan())
+        if not df_semua.empty:
+            st.caption(f"Ringkasan {len(df_semua)} pengukuran terakhir (semua sesi dan job latar), dalam ms")
+            df_ringkas = df_semua.groupby('nama')['ms'].agg(
+                jumlah='count', total='sum', median='median', p95=lambda x: x.quantile(0.95), maks='max'
+            ).sort_values('total', ascending=False)
+            st.dataframe(df_ringkas.round(1), use_container_width=True)
+            st.download_button(
+                label="📥 Unduh Log Kinerja (.jsonl)",
+                data='\n'.join(json.dumps(c, default=str) for c in kinerja.catatan()).encode('utf-8'),
+                file_name='kinerja_absensi.jsonl',
+                mime='application/x-ndjson',
+                key='unduh_log_kinerja'
+            )
 
 
 # --- 5. TAMPILAN STREAMLIT (DASHBOARD) ---
 st.set_page_config(layout="wide", page_title="Dashboard Absensi Karyawan")
 st.title("Absensi Karyawan")
 
-tab_input_cepat, tab_input, tab_rekap, tab_master, tab_harian = st.tabs([
-    "⚡ Input Cepat Harian", 
-    "✍️ Input Absensi Satuan", 
-    "📈 Rekap Bulanan", 
-    "👥 Kelola Karyawan", 
-    "🔍 Tinjauan Harian"
-])
 
 # ----------------------------------------------------
 # TAB INPUT CEPAT HARIAN (BERBASIS TOMBOL)
 # ----------------------------------------------------
-with tab_input_cepat:
+def tampilkan_tab_input_cepat():
+    """Tab input cepat: pilih tanggal, antrean unggah, dan grid tombol status."""
     st.header("Input Absensi Cepat Harian")
     
     col1, col2 = st.columns([1, 4])
@@ -551,13 +795,15 @@ with tab_input_cepat:
         date_quick_input = st.date_input("Tanggal Absensi", value=st.session_state.quick_input_date, key='quick_input_date_tab_cepat')
         st.session_state.quick_input_date = date_quick_input
     
+    tampilkan_outbox()
     tampilkan_input_cepat_harian_button()
     
 
 # ----------------------------------------------------
 # TAB 3: KELOLA KARYAWAN (MASTER LIST)
 # ----------------------------------------------------
-with tab_master:
+def tampilkan_tab_master():
+    """Tab kelola karyawan: tambah karyawan, daftar karyawan, dan kompaksi."""
     st.header("Kelola Data Karyawan")
     with st.form("form_karyawan_baru", clear_on_submit=True):
         nama_baru = st.text_input("Nama Karyawan Baru (Input Sekali Saja)")
@@ -580,10 +826,14 @@ with tab_master:
     else:
         st.info("Silakan tambahkan karyawan pertama Anda.")
 
+    st.markdown("---")
+    tampilkan_kompaksi()
+
 # ----------------------------------------------------
 # TAB 1: INPUT ABSENSI HARIAN (SATUAN)
 # ----------------------------------------------------
-with tab_input:
+def tampilkan_tab_input():
+    """Tab input absensi satuan (form)."""
     st.header("Input Kehadiran Harian (Satuan)")
     
     if st.session_state.df_karyawan.empty:
@@ -621,20 +871,36 @@ with tab_input:
             
             if submitted:
                 if input_absensi(tanggal_input, nama_terpilih, status_terpilih, produksi_input):
-                    st.success(f"Absensi untuk **{nama_terpilih}** pada {tanggal_input} ({status_terpilih_display}) dengan produksi **{produksi_input}** berhasil dicatat dan **diunggah** ke Sheets!")
-                    get_absensi_data.clear()
-                    time.sleep(0.5)
+                    tujuan = "masuk antrean unggah" if OUTBOX_AKTIF else "**diunggah**"
+                    st.success(f"Absensi untuk **{nama_terpilih}** pada {tanggal_input} ({status_terpilih_display}) dengan produksi **{produksi_input}** berhasil dicatat dan {tujuan} ke Sheets!")
                     st.rerun()
 
+# ----------------------------------------------------
+# TAB IMPOR MASSAL (CSV/XLSX)
+# ----------------------------------------------------
+def tampilkan_tab_impor():
+    """Tab impor massal CSV/XLSX."""
+    st.header("Impor Absensi Massal")
+
+    if st.session_state.df_karyawan.empty:
+        st.warning("Tambahkan nama karyawan di tab 'Kelola Karyawan' terlebih dahulu.")
+    else:
+        tampilkan_impor_massal()
+
 # ----------------------------------------------------
 # TAB 2: REKAP BULANAN
 # ----------------------------------------------------
-with tab_rekap:
+def tampilkan_tab_rekap():
+    """Tab rekap bulanan untuk tahun/bulan terpilih, plus ekspor."""
     st.header("Rekapitulasi Absensi Per Bulan")
     
     col_tah, col_bul = st.columns(2)
     
-    tahun_options = [date.today().year] + list(range(2023, date.today().year))
+    # Tahun dari data tertua yang tercatat (minimal 2023) sampai tahun ini
+    cache_rekap = get_absensi_data()
+    tanggal_pertama = hasil_tab('tanggal_pertama', (), cache_rekap.tanggal_pertama) if cache_rekap is not None else None
+    tahun_awal = min(2023, tanggal_pertama.year) if tanggal_pertama is not None else 2023
+    tahun_options = list(range(tahun_awal, date.today().year + 1))
     tahun_options_sorted = sorted(list(set(tahun_options)), reverse=True)
     
     with col_tah:
@@ -647,7 +913,7 @@ with tab_rekap:
             "Pilih Tahun", 
             options=tahun_options_sorted,
             index=default_year_index,
-            key='rekap_tahun_tab' 
+            key='rekap_tahun_tab', persist_state='page'
         )
     
     with col_bul:
@@ -662,7 +928,7 @@ with tab_rekap:
             options=bulan_options, 
             format_func=lambda x: date(2000, x, 1).strftime('%B'),
             index=default_month_index,
-            key='rekap_bulan_tab' 
+            key='rekap_bulan_tab', persist_state='page'
         )
     
     df_rekap = rekap_bulanan(tahun_rekap, bulan_rekap)
@@ -683,65 +949,92 @@ with tab_rekap:
             use_container_width=True
         )
         
-        csv_export = df_rekap.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Unduh Data Rekap (.csv)",
-            data=csv_export,
-            file_name=f'rekap_absensi_{tahun_rekap}_{bulan_rekap}.csv',
-            mime='text/csv',
+        tampilkan_ekspor(
+            'unduh_rekap_bulanan', "📥 Unduh Data Rekap", f'rekap_absensi_{tahun_rekap}_{bulan_rekap}',
+            functools.partial(iter, [df_rekap]),
+            KOLOM_EKSPOR_REKAP_BULANAN
         )
     else:
         st.info(f"Tidak ada data absensi yang tercatat untuk bulan {bulan_rekap}/{tahun_rekap} atau data karyawan masih kosong.")
         
+# ----------------------------------------------------
+# TAB REKAP PERIODE (BULAN / KUARTAL / TAHUN / RENTANG BEBAS)
+# ----------------------------------------------------
+def tampilkan_tab_rekap_periode():
+    """Tab rekap per periode untuk rentang terpilih, plus ekspor."""
+    st.header("Rekapitulasi Absensi Per Periode")
+
+    col_dari, col_sampai, col_per = st.columns(3)
+    with col_dari:
+        rekap_dari = st.date_input("Dari Tanggal", value=date(date.today().year, 1, 1), key='rekap_periode_dari', persist_state='page')
+    with col_sampai:
+        rekap_sampai = st.date_input("Sampai Tanggal", value=date.today(), key='rekap_periode_sampai', persist_state='page')
+    with col_per:
+        rekap_per = st.selectbox(
+            "Kelompokkan Per",
+            options=list(PERIODE_REKAP.keys()),
+            format_func=lambda x: PERIODE_REKAP[x][1],
+            key='rekap_periode_per',
+            persist_state='page'
+        )
+
+    if rekap_dari > rekap_sampai:
+        st.warning("'Dari Tanggal' harus sebelum atau sama dengan 'Sampai Tanggal'.")
+    else:
+        df_rekap_periode = rekap_rentang(rekap_dari, rekap_sampai, rekap_per)
+
+        if not df_rekap_periode.empty:
+            st.subheader(f"Ringkasan Absensi {PERIODE_REKAP[rekap_per][1]}: {rekap_dari} s/d {rekap_sampai}")
+
+            kolom_ganti_nama = {k: STATUS_DISPLAY.get(k, k.capitalize()) for k in STATUS_ABSENSI}
+            kolom_ganti_nama['ID_Karyawan'] = 'ID'
+            st.dataframe(
+                df_rekap_periode.rename(columns=kolom_ganti_nama).style.format({'Total Produksi': '{:,}'}),
+                hide_index=True,
+                use_container_width=True
+            )
+
+            tampilkan_ekspor(
+                'unduh_rekap_periode', "📥 Unduh Data Rekap", f'rekap_absensi_{rekap_per}_{rekap_dari}_{rekap_sampai}',
+                functools.partial(
+                    potongan_rekap, get_absensi_data(), st.session_state.df_karyawan.index,
+                    st.session_state.nama_per_id, rekap_dari, rekap_sampai, rekap_per
+                ),
+                KOLOM_EKSPOR_REKAP_RENTANG
+            )
+        else:
+            st.info("Tidak ada data absensi yang tercatat untuk rentang ini atau data karyawan masih kosong.")
+
+        tampilkan_ekspor_data(rekap_dari, rekap_sampai)
+
 # ----------------------------------------------------
 # TAB 4: TINJAUAN HARIAN (REKAP PRODUKSI HARIAN)
 # ----------------------------------------------------
-with tab_harian:
+def tampilkan_tab_harian():
+    """Tab tinjauan status final dan produksi satu tanggal."""
     st.header("Rekap Data Harian (Termasuk Produksi)")
     
-    data_absensi = get_absensi_data()
+    cache = get_absensi_data()
+    tanggal_terakhir = hasil_tab('tanggal_terakhir', (), cache.tanggal_terakhir) if cache is not None else None
+    if tanggal_terakhir is None and cache is not None and not cache.termuat:
+        # Mirror masih dimuat: tinjau hari ini lewat GET bersaring
+        tanggal_terakhir = pd.Timestamp(date.today())
     
-    if not data_absensi or st.session_state.df_karyawan.empty:
+    if tanggal_terakhir is None or st.session_state.df_karyawan.empty:
         st.warning("Tidak ada data absensi yang ditemukan atau daftar karyawan kosong.")
     else:
-        df_absensi = pd.DataFrame(data_absensi)
-        
-        df_absensi['Tanggal'] = pd.to_datetime(df_absensi['Tanggal'], errors='coerce', utc=True)
-        df_absensi['Tanggal'] = df_absensi['Tanggal'].dt.tz_convert('Asia/Jakarta')
-        df_absensi['Tanggal'] = df_absensi['Tanggal'].dt.normalize().dt.tz_localize(None)
-
-        df_absensi['ID_Karyawan'] = pd.to_numeric(df_absensi['ID_Karyawan'], errors='coerce').fillna(0).astype(int)
-        
-        if 'Produksi' in df_absensi.columns:
-            df_absensi['Produksi'] = pd.to_numeric(df_absensi['Produksi'], errors='coerce').fillna(0).astype(int)
-        else:
-            df_absensi['Produksi'] = 0
-            
-        # Merge dengan data karyawan untuk mendapatkan Nama Karyawan
-        df_master = st.session_state.df_karyawan.copy().reset_index()
-        df_absensi = df_absensi.merge(df_master[['ID_Karyawan', 'Nama_Karyawan']], on='ID_Karyawan', how='left')
-
         # Filter berdasarkan tanggal terbaru (default)
-        tanggal_terpilih = st.date_input("Pilih Tanggal Tinjauan", value=df_absensi['Tanggal'].max().date(), key='tinjauan_harian_date')
+        tanggal_terpilih = st.date_input("Pilih Tanggal Tinjauan", value=tanggal_terakhir.date(), key='tinjauan_harian_date', persist_state='page')
         
-        df_filtered_harian = df_absensi[df_absensi['Tanggal'].dt.date == tanggal_terpilih].copy()
+        # Hasil query sudah berisi entri terakhir per (ID, tanggal), yaitu status final
+        df_display = hasil_tab(
+            'tinjauan_harian', (tanggal_terpilih,),
+            lambda: tinjauan_harian(cache.query_harian(tanggal_terpilih, tanggal_terpilih))
+        )
         
-        if df_filtered_harian.empty:
+        if df_display.empty:
             st.info(f"Tidak ada absensi tercatat pada tanggal {tanggal_terpilih}.")
         else:
-            # Mengambil entri terakhir untuk hari itu (status final)
-            df_final_daily = df_filtered_harian.sort_values(by='Tanggal').groupby('ID_Karyawan').last().reset_index()
-            
-            # Kolom untuk ditampilkan
-            kolom_tinjauan = ['ID_Karyawan', 'Tanggal', 'Nama_Karyawan', 'Status_Kehadiran', 'Produksi']
-            df_display = df_final_daily[kolom_tinjauan]
-
-            # Ganti nama Status untuk tampilan
-            df_display['Status_Display'] = df_display['Status_Kehadiran'].map(STATUS_DISPLAY)
-            
-            # MODIFIKASI: Urutkan berdasarkan ID Karyawan terkecil
-            df_display = df_display.sort_values(by='ID_Karyawan')
-
             st.dataframe(
                 df_display[['ID_Karyawan', 'Nama_Karyawan', 'Status_Display', 'Produksi']].rename(columns={
                     'ID_Karyawan': 'ID',
@@ -756,3 +1049,32 @@ with tab_harian:
             # Hitung total produksi harian
             total_prod = df_display['Produksi'].sum()
             st.metric(label=f"Total Produksi {tanggal_terpilih}", value=f"{total_prod:,}")
+
+# ----------------------------------------------------
+# NAVIGASI TAB
+# ----------------------------------------------------
+# Label tab -> fungsi tampilan. Dengan on_change='rerun' hanya tab yang terbuka yang dijalankan
+# pada setiap rerun; tab lain tidak membaca data maupun menghitung rekap, jadi latensi satu tab
+# tidak bergantung pada tab lain. Pindah tab memicu rerun yang menjalankan tab tujuan.
+TAB_DASHBOARD = {
+    "⚡ Input Cepat Harian": tampilkan_tab_input_cepat,
+    "✍️ Input Absensi Satuan": tampilkan_tab_input,
+    "📥 Impor Massal": tampilkan_tab_impor,
+    "📈 Rekap Bulanan": tampilkan_tab_rekap,
+    "🗓️ Rekap Periode": tampilkan_tab_rekap_periode,
+    "👥 Kelola Karyawan": tampilkan_tab_master,
+    "🔍 Tinjauan Harian": tampilkan_tab_harian,
+}
+
+tab_dashboard = st.tabs(list(TAB_DASHBOARD), key='tab_dashboard', on_change='rerun')
+for (label_tab, tampilkan_tab), tab in zip(TAB_DASHBOARD.items(), tab_dashboard):
+    if tab.open:
+        with tab, ukur_kinerja('tab.render', tab=label_tab):
+            tampilkan_tab()
+
+# ----------------------------------------------------
+# PANEL KINERJA (DEBUG)
+# ----------------------------------------------------
+if KINERJA_PANEL_AKTIF or st.query_params.get('debug') == '1':
+    tampilkan_panel_kinerja()
+
@@ -0,0 +1,199 @@
+"""
+CLI batch absensi di atas absensi_inti.py, tanpa Streamlit.
+
+Secara default hanya membaca mirror SQLite lokal (tanpa jaringan), sehingga bisa dijalankan
+dari cron/skrip di mesin yang sama dengan dashboard. Dengan --sinkron, mirror diselaraskan
+dulu dengan Apps Script. Subperintah:
+    sinkron         menyelaraskan mirror lokal dengan sheets
+    rekap-bulanan   satu berkas rekap per bulan ke sebuah folder
+    rekap           rekap rentang per bulan/kuartal/tahun ke satu berkas
+    harian          data harian final (opsional satu karyawan) ke satu berkas
+    kompaksi        kompaksi log Absensi Harian (selalu lewat Apps Script)
+
+Cara pakai:
+    python absensi_cli.py --sinkron rekap-bulanan --dari 2025-01 --sampai 2025-06 --format xlsx --output rekap/
+    python absensi_cli.py rekap --dari 2025-01-01 --sampai 2025-12-31 --per kuartal --output rekap_2025.csv
+    python absensi_cli.py --mirror /data/absensi_mirror.sqlite3 harian --dari 2025-03-01 --sampai 2025-03-31 --karyawan 12 --output -
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+from datetime import date
+
+import absensi_inti
+
+
+class GalatCLI(Exception):
+    """Kegagalan yang dilaporkan ke stderr dengan kode keluar 1."""
+
+
+def _tanggal(teks):
+    try:
+        return date.fromisoformat(teks)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tanggal tidak valid: {teks!r} (format YYYY-MM-DD)")
+
+def _bulan(teks):
+    try:
+        tahun, bulan = (int(x) for x in teks.split('-'))
+        return date(tahun, bulan, 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bulan tidak valid: {teks!r} (format YYYY-MM)")
+
+def daftar_bulan(dari, sampai):
+    """(tahun, bulan) dari bulan `dari` s.d. bulan `sampai`."""
+    tahun, bulan = dari.year, dari.month
+    while (tahun, bulan) <= (sampai.year, sampai.month):
+        yield tahun, bulan
+        tahun, bulan = (tahun + 1, 1) if bulan == 12 else (tahun, bulan + 1)
+
+
+# --- DATA ---
+def sinkron():
+    """Menyelaraskan master karyawan dan Absensi Harian di mirror dengan sheets."""
+    if not absensi_inti.sinkron_karyawan():
+        raise GalatCLI("Gagal mengambil sheet Karyawan dari Apps Script (detail di log).")
+    cache = absensi_inti.get_absensi_cache()
+    if not cache.sinkron():
+        raise GalatCLI("Gagal menyinkronkan Absensi Harian dari Apps Script (detail di log).")
+    absensi_inti.get_master_karyawan().muat()
+    return cache
+
+def siapkan_data(args):
+    """(cache, df_karyawan, nama_per_id) dari mirror lokal; sinkron dulu jika --sinkron."""
+    if args.sinkron:
+        cache = sinkron()
+    else:
+        mirror = absensi_inti.get_mirror()
+        if mirror.karyawan() is None or not mirror.watermark()[0]:
+            raise GalatCLI(
+                f"Mirror lokal {absensi_inti.MIRROR_PATH} belum berisi data. "
+                "Jalankan dengan --sinkron (atau jalankan dashboard) terlebih dahulu."
+            )
+        cache = absensi_inti.get_absensi_cache()
+    _, df_k, nama_per_id, _ = absensi_inti.get_master_karyawan().snapshot()
+    return cache, df_k, nama_per_id
+
+def tulis_berkas(potongan, format_ekspor, kolom, tujuan):
+    """Menulis potongan (skema `kolom`) ke `tujuan` (path, atau '-' untuk stdout)."""
+    berkas = absensi_inti.tulis_ekspor(potongan, format_ekspor, kolom)
+    try:
+        if tujuan == '-':
+            shutil.copyfileobj(berkas, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            with open(tujuan, 'wb') as f:
+                shutil.copyfileobj(berkas, f)
+    finally:
+        berkas.close()
+
+
+# --- SUBPERINTAH ---
+def cmd_sinkron(args):
+    cache = sinkron()
+    _, df_k, _, _ = absensi_inti.get_master_karyawan().snapshot()
+    print(f"Mirror {absensi_inti.MIRROR_PATH}: {len(df_k)} karyawan, {cache.offset:,} baris Absensi Harian.", file=sys.stderr)
+
+def cmd_rekap_bulanan(args):
+    if args.sampai < args.dari:
+        raise GalatCLI("--sampai tidak boleh sebelum --dari.")
+    cache, df_k, _ = siapkan_data(args)
+    os.makedirs(args.output, exist_ok=True)
+    ekstensi = absensi_inti.FORMAT_EKSPOR[args.format][2]
+    for tahun, bulan in daftar_bulan(args.dari, args.sampai):
+        df_rekap = absensi_inti.hitung_rekap_bulanan(cache, df_k, tahun, bulan)
+        tujuan = os.path.join(args.output, f'rekap_absensi_{tahun}_{bulan:02d}{ekstensi}')
+        tulis_berkas([df_rekap], args.format, absensi_inti.KOLOM_EKSPOR_REKAP_BULANAN, tujuan)
+        print(f"{tujuan}: {len(df_rekap)} karyawan", file=sys.stderr)
+
+def cmd_rekap(args):
+    if args.sampai < args.dari:
+        raise GalatCLI("--sampai tidak boleh sebelum --dari.")
+    cache, df_k, nama_per_id = siapkan_data(args)
+    ids = sorted(nama_per_id)
+    tulis_berkas(absensi_inti.potongan_rekap(cache, ids, nama_per_id, args.dari, args.sampai, args.per),
+                 args.format, absensi_inti.KOLOM_EKSPOR_REKAP_RENTANG, args.output)
+
+def cmd_harian(args):
+    if args.sampai < args.dari:
+        raise GalatCLI("--sampai tidak boleh sebelum --dari.")
+    cache, _, nama_per_id = siapkan_data(args)
+    tulis_berkas(absensi_inti.potongan_harian(cache, nama_per_id, args.dari, args.sampai, args.karyawan),
+                 args.format, absensi_inti.KOLOM_EKSPOR_HARIAN, args.output)
+
+def cmd_kompaksi(args):
+    try:
+        hasil = absensi_inti.kompaksi_absensi(args.sampai)
+    except absensi_inti.AppsScriptError as e:
+        raise GalatCLI(f"Kompaksi gagal: {e}")
+    print(f"Kompaksi s.d. {args.sampai or absensi_inti.batas_kompaksi()}: {hasil['sebelum']:,} -> {hasil['sesudah']:,} baris "
+          f"({hasil['diarsipkan']:,} diarsipkan).", file=sys.stderr)
+
+
+def buat_parser():
+    parser = argparse.ArgumentParser(description='CLI batch absensi (rekap, ekspor, sinkron, kompaksi) tanpa Streamlit')
+    parser.add_argument('--mirror', help='path mirror SQLite (default: ABSENSI_MIRROR_PATH / absensi_mirror.sqlite3)')
+    parser.add_argument('--url', help='URL Web App Apps Script (default: APPS_SCRIPT_URL)')
+    parser.add_argument('--sinkron', action='store_true', help='selaraskan mirror dengan sheets sebelum membaca')
+    parser.add_argument('-v', '--verbose', action='store_true', help='tampilkan log info')
+    sub = parser.add_subparsers(dest='perintah', required=True)
+    format_ekspor = dict(choices=list(absensi_inti.FORMAT_EKSPOR), default='csv', help='format berkas (default: csv)')
+
+    p = sub.add_parser('sinkron', help='selaraskan mirror lokal dengan sheets')
+    p.set_defaults(fungsi=cmd_sinkron)
+
+    p = sub.add_parser('rekap-bulanan', help='satu berkas rekap per bulan')
+    p.add_argument('--dari', type=_bulan, required=True, help='bulan pertama (YYYY-MM)')
+    p.add_argument('--sampai', type=_bulan, help='bulan terakhir (YYYY-MM, default: sama dengan --dari)')
+    p.add_argument('--format', **format_ekspor)
+    p.add_argument('--output', default='.', help='folder tujuan (default: folder kerja)')
+    p.set_defaults(fungsi=cmd_rekap_bulanan)
+
+    p = sub.add_parser('rekap', help='rekap rentang tanggal per periode')
+    p.add_argument('--dari', type=_tanggal, required=True, help='YYYY-MM-DD')
+    p.add_argument('--sampai', type=_tanggal, required=True, help='YYYY-MM-DD')
+    p.add_argument('--per', choices=list(absensi_inti.PERIODE_REKAP), default='bulan')
+    p.add_argument('--format', **format_ekspor)
+    p.add_argument('--output', default='-', help="berkas tujuan, '-' untuk stdout (default)")
+    p.set_defaults(fungsi=cmd_rekap)
+
+    p = sub.add_parser('harian', help='data harian final')
+    p.add_argument('--dari', type=_tanggal, required=True, help='YYYY-MM-DD')
+    p.add_argument('--sampai', type=_tanggal, required=True, help='YYYY-MM-DD')
+    p.add_argument('--karyawan', type=int, help='hanya ID karyawan ini')
+    p.add_argument('--format', **format_ekspor)
+    p.add_argument('--output', default='-', help="berkas tujuan, '-' untuk stdout (default)")
+    p.set_defaults(fungsi=cmd_harian)
+
+    p = sub.add_parser('kompaksi', help='kompaksi log Absensi Harian lewat Apps Script')
+    p.add_argument('--sampai', type=_tanggal, help='YYYY-MM-DD (default: akhir periode tertutup terakhir)')
+    p.set_defaults(fungsi=cmd_kompaksi)
+    return parser
+
+def main(argv=None):
+    args = buat_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+
+    # Harus diatur sebelum singleton (mirror, klien) pertama kali dibuat
+    if args.mirror:
+        absensi_inti.MIRROR_PATH = args.mirror
+    if args.url:
+        absensi_inti.APPS_SCRIPT_URL = args.url
+    if getattr(args, 'sampai', None) is None and args.perintah == 'rekap-bulanan':
+        args.sampai = args.dari
+    if args.perintah in ('rekap', 'harian', 'rekap-bulanan') and args.format not in absensi_inti.format_ekspor_tersedia():
+        print(f"Format {args.format} butuh modul {absensi_inti.FORMAT_EKSPOR[args.format][3]}.", file=sys.stderr)
+        return 1
+
+    try:
+        args.fungsi(args)
+    except GalatCLI as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1877 @@
+"""
+Inti data dan rekap absensi tanpa Streamlit: klien Apps Script, mirror SQLite lokal, cache
+Absensi Harian, outbox, rekap, impor dan ekspor.
+
+Mengimpor modul ini tidak membuka koneksi jaringan, tidak membuat berkas, dan tidak
+menjalankan thread. Semua itu baru terjadi saat fungsi terkait dipanggil (get_mirror,
+get_absensi_cache, mulai_sinkron_latar, ...). Objek bersama (mirror, cache, outbox, master
+karyawan) adalah singleton per proses. Dipakai oleh dashboard (absensi.py), CLI batch
+(absensi_cli.py) dan benchmark.py.
+"""
+import base64
+import functools
+import gzip
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('absensi')
+logger_kinerja = logging.getLogger('absensi.kinerja')
+
+# --- KONFIGURASI DAN INIITALISASI ---
+
+# GANTI INI dengan URL Web App lengkap yang Anda dapatkan setelah Deploy Apps Script!
+APPS_SCRIPT_URL = os.environ.get('APPS_SCRIPT_URL', 'https://script.google.com/macros/s/AKfycbwaOxQ2ElWZlcmvdl3FgIATCJIvz4RqpXgd_FXl1clTCUpa_ToBHwByXrFdQKZjGXfD/exec')
+
+# Simpan absensi banyak karyawan dalam satu POST (?action=batch). Matikan jika
+# deployment Apps Script belum mendukung aksi batch; perubahan lalu dikirim per baris
+# secara paralel, maksimal UNGGAH_MAKS_KONKUREN sekaligus (jaga kuota Apps Script).
+BATCH_ABSENSI_AKTIF = True
+UNGGAH_MAKS_KONKUREN = 4
+
+# Pengaturan klien HTTP ke Apps Script (dipakai bersama oleh semua sesi)
+HTTP_TIMEOUT = (5, 10)          # (connect, read) dalam detik
+HTTP_MAKS_RETRY = 3             # percobaan ulang untuk error sementara (timeout, 429, 5xx)
+HTTP_BACKOFF_DASAR = 0.5        # detik, dilipatgandakan setiap percobaan
+HTTP_BACKOFF_MAKS = 8.0
+HTTP_MAKS_KONKUREN = 4          # batas permintaan paralel ke Apps Script
+
+# Jeda (detik) sebelum cache absensi dicocokkan ulang dengan sheets setelah penyimpanan
+JEDA_REKONSILIASI = 5
+
+# Mirror lokal (SQLite) kedua sheet; aplikasi membaca dari sini dan job latar
+# menyelaraskannya dengan Sheets setiap SINKRON_INTERVAL detik.
+MIRROR_PATH = os.environ.get('ABSENSI_MIRROR_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'absensi_mirror.sqlite3'))
+SINKRON_INTERVAL = 60
+
+# Outbox: penyimpanan operator di-commit ke jurnal lokal dan dikirim ke Sheets di
+# latar belakang. Matikan untuk kembali menunggu Apps Script saat menyimpan.
+OUTBOX_AKTIF = True
+OUTBOX_INTERVAL = 5             # detik antar pengurasan outbox (juga dasar backoff)
+OUTBOX_BACKOFF_MAKS = 300
+OUTBOX_UKURAN_BATCH = 200
+
+# Minta respons Absensi Harian dalam format kolom terkompresi (format=kolom); deployment
+# yang belum mendukungnya tetap mengirim daftar baris dan otomatis dipakai apa adanya.
+FORMAT_KOLOM_AKTIF = True
+
+# Kompaksi log Absensi Harian (?action=compact): bulan yang sudah berakhir lebih dari
+# KOMPAKSI_JEDA_HARI hari diringkas menjadi satu baris per (karyawan, tanggal), baris yang
+# tergantikan dipindah ke sheet SHEET_ARSIP. Dengan KOMPAKSI_OTOMATIS, job latar menjalankannya
+# sekali setiap ada bulan yang baru tertutup; tanpa itu hanya dari tab Kelola Karyawan.
+KOMPAKSI_OTOMATIS = False
+KOMPAKSI_JEDA_HARI = 7
+
+# Impor massal CSV/XLSX: berkas dibaca per potongan IMPOR_UKURAN_POTONGAN baris; tanpa
+# outbox, perubahan diunggah per tanggal dalam batch berisi paling banyak IMPOR_UKURAN_BATCH baris.
+IMPOR_UKURAN_POTONGAN = 5000
+IMPOR_UKURAN_BATCH = 200
+
+# Ekspor dibuat per potongan (satu bulan data harian atau satu periode rekap) saat tombol
+# unduh diklik; berkas hasil disimpan di memori sampai EKSPOR_MEMORI_MAKS byte, lalu di disk.
+EKSPOR_MEMORI_MAKS = 16 * 2**20
+
+# Jumlah hasil GET bersaring (from/to/id_karyawan) yang disimpan selama mirror belum termuat
+SARING_CACHE_MAKS = 32
+
+# Instrumentasi kinerja: log terstruktur (satu baris JSON per pengukuran ke logger 'absensi.kinerja')
+KINERJA_LOG_AKTIF = os.environ.get('ABSENSI_LOG_KINERJA') == '1'
+KINERJA_KAPASITAS = 5000        # jumlah pengukuran terakhir yang disimpan per proses
+
+SHEET_KARYAWAN = 'Karyawan'
+SHEET_ABSENSI = 'Absensi Harian'
+SHEET_ARSIP = 'Absensi Arsip'
+
+# DAFTAR STATUS LENGKAP
+STATUS_ABSENSI = ['masuk', 'sakit', 'izin', 'alpha', '1/2 hari', 'resign', 'libur', 'kosong']
+
+# Pengelompokan rekap rentang tanggal: kunci -> (frekuensi period pandas, label)
+PERIODE_REKAP = {
+    'bulan': ('M', 'Bulanan'),
+    'kuartal': ('Q', 'Kuartalan'),
+    'tahun': ('Y', 'Tahunan'),
+}
+
+# --- INSTRUMENTASI KINERJA ---
+class PencatatKinerja:
+    """
+    Buffer melingkar (per proses) berisi pengukuran waktu jalur panas. Setiap catatan diberi
+    nomor rerun dari thread skrip yang sedang berjalan (None untuk job latar), sehingga
+    panel debug bisa menampilkan rincian per rerun. Aman dipakai dari thread mana pun.
+    """
+
+    def __init__(self, kapasitas=KINERJA_KAPASITAS):
+        self.lock = threading.Lock()
+        self.buffer = deque(maxlen=kapasitas)
+        self._lokal = threading.local()
+        self._nomor = itertools.count(1)
+
+    def mulai_rerun(self, jenis='app'):
+        """Menandai awal rerun (skrip penuh atau fragment) di thread ini; mengembalikan nomornya."""
+        self._lokal.rerun = next(self._nomor)
+        self._lokal.jenis = jenis
+        return self._lokal.rerun
+
+    def rerun_aktif(self):
+        return getattr(self._lokal, 'rerun', None)
+
+    def catat(self, nama, detik, **meta):
+        catatan = {
+            'waktu': round(time.time(), 3),
+            'nama': nama,
+            'ms': round(detik * 1000, 3),
+            'rerun': getattr(self._lokal, 'rerun', None),
+            'jenis': getattr(self._lokal, 'jenis', 'latar'),
+            'thread': threading.current_thread().name,
+            **meta,
+        }
+        with self.lock:
+            self.buffer.append(catatan)
+        if KINERJA_LOG_AKTIF:
+            logger_kinerja.info(json.dumps(catatan, default=str))
+
+    @contextmanager
+    def ukur(self, nama, **meta):
+        """Mengukur blok `with`; blok bisa menambah penghitung ke dict yang di-yield."""
+        mulai = time.perf_counter()
+        try:
+            yield meta
+        finally:
+            self.catat(nama, time.perf_counter() - mulai, **meta)
+
+    def catatan(self, rerun=None):
+        with self.lock:
+            data = list(self.buffer)
+        return data if rerun is None else [c for c in data if c['rerun'] == rerun]
+
+
+@functools.lru_cache(maxsize=None)
+def get_kinerja():
+    """Satu pencatat kinerja per proses, dipakai bersama oleh semua sesi dan job latar."""
+    return PencatatKinerja()
+
+def ukur_kinerja(nama, **meta):
+    return get_kinerja().ukur(nama, **meta)
+
+def terukur(nama):
+    """Dekorator: mencatat waktu setiap pemanggilan fungsi dengan nama `nama`."""
+    def dekorator(fungsi):
+        @functools.wraps(fungsi)
+        def pembungkus(*args, **kwargs):
+            with ukur_kinerja(nama):
+                return fungsi(*args, **kwargs)
+        return pembungkus
+    return dekorator
+
+
+# --- KLIEN HTTP APPS SCRIPT (KONEKSI DIPAKAI ULANG + RETRY) ---
+class AppsScriptClient:
+    """
+    Klien HTTP untuk Web App Apps Script: koneksi keep-alive dipakai ulang antar
+    rerun dan sesi, error sementara dicoba ulang dengan exponential backoff + jitter,
+    dan jumlah permintaan paralel dibatasi.
+    """
+
+    STATUS_RETRY = {429, 500, 502, 503, 504}
+
+    def __init__(self, url, timeout=HTTP_TIMEOUT, maks_retry=HTTP_MAKS_RETRY,
+                 backoff_dasar=HTTP_BACKOFF_DASAR, backoff_maks=HTTP_BACKOFF_MAKS,
+                 maks_konkuren=HTTP_MAKS_KONKUREN):
+        self.url = url
+        self.timeout = timeout
+        self.maks_retry = maks_retry
+        self.backoff_dasar = backoff_dasar
+        self.backoff_maks = backoff_maks
+        self.maks_konkuren = maks_konkuren
+        self._slot = threading.BoundedSemaphore(maks_konkuren)
+
+        self.session = requests.Session()
+        # Apps Script membalas lewat redirect ke googleusercontent.com, jadi pool per host
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=maks_konkuren)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _jeda(self, percobaan, response=None):
+        """Lama tunggu sebelum percobaan berikutnya (full jitter, hormati Retry-After)."""
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(float(response.headers['Retry-After']), self.backoff_maks)
+        return random.uniform(0, min(self.backoff_maks, self.backoff_dasar * (2 ** percobaan)))
+
+    def request(self, method, params, payload=None, idempoten=True):
+        """
+        Mengirim permintaan dan mengembalikan `requests.Response`.
+        Permintaan non-idempoten hanya diulang jika koneksi belum sempat terbentuk,
+        agar data tidak tertulis dua kali.
+        """
+        with ukur_kinerja(f'http.{method}', sheet=params.get('sheet'), action=params.get('action')) as meta:
+            response = self._request(method, params, payload, idempoten)
+            meta.update(http_status=response.status_code, bytes=len(response.content))
+            return response
+
+    def _request(self, method, params, payload, idempoten):
+        percobaan = 0
+        while True:
+            try:
+                with self._slot:
+                    response = self.session.request(method, self.url, params=params, json=payload, timeout=self.timeout)
+                if response.status_code in self.STATUS_RETRY and idempoten and percobaan < self.maks_retry:
+                    time.sleep(self._jeda(percobaan, response))
+                    percobaan += 1
+                    continue
+                response.raise_for_status()
+                return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                bisa_diulang = idempoten or isinstance(e, requests.exceptions.ConnectTimeout)
+                if not bisa_diulang or percobaan >= self.maks_retry:
+                    raise
+                time.sleep(self._jeda(percobaan))
+                percobaan += 1
+
+    def get(self, params):
+        return self.request('GET', params)
+
+    def post(self, params, payload, idempoten=False):
+        return self.request('POST', params, payload, idempoten=idempoten)
+
+
+@functools.lru_cache(maxsize=None)
+def get_apps_script_client():
+    """Satu klien bersama per proses sehingga koneksi TLS dipakai ulang oleh semua sesi."""
+    return AppsScriptClient(APPS_SCRIPT_URL)
+
+
+# --- FORMAT RESPONS KOLOM (gzip + base64) ---
+FORMAT_KOLOM = 'kolom-gzip'
+
+class BarisKolom:
+    """
+    Baris sheet dalam bentuk kolom (nama kolom -> list nilai) dari respons format kolom.
+    Berperilaku seperti list baris (len, indeks, slice, iterasi) sehingga kode sinkron tidak
+    perlu membedakan format; normalisasi_absensi membaca kolomnya langsung. Null (kolom yang
+    tidak ada di baris aslinya) tidak ikut di dict baris, jadi baris sama persis dengan format
+    baris, termasuk `anchor` yang dibandingkan saat sinkron delta.
+    """
+
+    def __init__(self, kolom):
+        self.kolom = kolom
+        self._jumlah = len(next(iter(kolom.values()), []))
+
+    def __len__(self):
+        return self._jumlah
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return BarisKolom({k: v[i] for k, v in self.kolom.items()})
+        return {k: v[i] for k, v in self.kolom.items() if v[i] is not None}
+
+    def __iter__(self):
+        for i in range(self._jumlah):
+            yield self[i]
+
+    def nilai(self, nama, bawaan=None):
+        """List nilai satu kolom; `bawaan` untuk setiap baris jika kolomnya tidak ada."""
+        return self.kolom[nama] if nama in self.kolom else [bawaan] * self._jumlah
+
+def dekode_kolom(teks):
+    """base64(gzip(JSON {kolom: [nilai, ...]})) -> BarisKolom."""
+    return BarisKolom(json.loads(gzip.decompress(base64.b64decode(teks))))
+
+def params_absensi(**params):
+    """Parameter GET sheet Absensi Harian, dengan permintaan format kolom jika diaktifkan."""
+    if FORMAT_KOLOM_AKTIF:
+        params['format'] = 'kolom'
+    return params
+
+
+# --- FUNGSI KOMUNIKASI API (Apps Script) ---
+@terukur('get_data_from_sheets')
+def get_data_from_sheets(sheet_name, params=None, hasil_lengkap=False):
+    """
+    Membaca data dari Google Sheets melalui Apps Script API (GET).
+    `params` ditambahkan ke query string; dengan hasil_lengkap=True seluruh objek
+    balasan dikembalikan (bukan hanya 'data'), mis. untuk membaca watermark.
+    Mengembalikan None jika gagal (detailnya dicatat ke logger 'absensi').
+    """
+    try:
+        response = get_apps_script_client().get({'sheet': sheet_name, **(params or {})})
+        if not response.text.strip():
+            logger.error("Respons GET dari Apps Script kosong. Mohon periksa URL dan status deployment Apps Script.")
+            return None
+        with ukur_kinerja('json.decode', sheet=sheet_name, bytes=len(response.content)):
+            result = response.json()
+        if result['status'] == 200:
+            if result.get('format') == FORMAT_KOLOM:
+                with ukur_kinerja('kolom.decode', sheet=sheet_name):
+                    result['data'] = dekode_kolom(result.pop('kolom'))
+            return result if hasil_lengkap else result['data']
+        else:
+            logger.error("Error dari Apps Script (GET %s): %s", sheet_name, result['message'])
+            return None
+    except requests.exceptions.Timeout:
+        logger.error("Gagal koneksi: permintaan GET %s ke Apps Script melewati batas waktu.", sheet_name)
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.error("Gagal koneksi ke Apps Script API. Pastikan URL benar: %s", e)
+        return None
+    except json.JSONDecodeError as e:
+        logger.error("Gagal memproses respons GET (JSON Error), Apps Script mungkin mengembalikan HTML/teks error: %s\n%s", e, response.text[:2000])
+        return None
+    except Exception:
+        logger.exception("Terjadi kesalahan tak terduga saat GET %s", sheet_name)
+        return None
+
+class AppsScriptError(Exception):
+    """Kegagalan memanggil Apps Script; pesannya siap ditampilkan ke operator."""
+
+    def __init__(self, message, raw_text=None, sementara=False):
+        super().__init__(message)
+        self.raw_text = raw_text
+        self.sementara = sementara  # True jika layak dicoba lagi nanti (koneksi/timeout)
+
+
+@terukur('kirim_post')
+def kirim_post(sheet_name, payload, action=None, idempoten=False):
+    """
+    POST ke Apps Script tanpa menyentuh UI: mengembalikan `data` balasan (atau True)
+    dan melempar AppsScriptError jika gagal. Aman dipanggil dari thread pekerja.
+    Apps Script menambah baris di setiap POST, jadi secara default POST hanya diulang
+    jika koneksi belum terbentuk; timeout baca dilaporkan sebagai kegagalan sementara.
+    """
+    params = {'sheet': sheet_name}
+    if action:
+        params['action'] = action
+    try:
+        response = get_apps_script_client().post(params, payload, idempoten=idempoten)
+        if not response.text.strip():
+            raise AppsScriptError("Error POST: Respons dari Apps Script kosong. Mohon periksa status deployment.")
+        with ukur_kinerja('json.decode', sheet=sheet_name, bytes=len(response.content)):
+            result = response.json()
+        if result['status'] == 200:
+            return result['data'] if 'data' in result else True
+        raise AppsScriptError(f"Error dari Apps Script (POST): {result['message']}")
+    except AppsScriptError:
+        raise
+    except requests.exceptions.Timeout:
+        raise AppsScriptError("Gagal koneksi: Permintaan waktu tunggu (timeout) saat POST data.", sementara=True)
+    except requests.exceptions.RequestException as e:
+        raise AppsScriptError(f"Gagal koneksi ke Apps Script API. Pastikan URL benar: {e}", sementara=True)
+    except json.JSONDecodeError as e:
+        raise AppsScriptError(
+            f"Gagal memproses respons POST (JSON Error). Apps Script mungkin mengembalikan HTML/Teks Error. Kesalahan: {e}",
+            raw_text=response.text
+        )
+    except Exception as e:
+        raise AppsScriptError(f"Terjadi kesalahan tak terduga saat POST: {e}")
+
+# --- MIRROR LOKAL (SQLITE) UNTUK KEDUA SHEET ---
+SKEMA_MIRROR = """
+CREATE TABLE IF NOT EXISTS meta (
+    kunci TEXT PRIMARY KEY,
+    nilai TEXT
+);
+CREATE TABLE IF NOT EXISTS karyawan (
+    id_karyawan INTEGER PRIMARY KEY,
+    nama_karyawan TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS absensi_harian (
+    id_karyawan INTEGER NOT NULL,
+    tanggal TEXT NOT NULL,
+    status TEXT NOT NULL,
+    produksi INTEGER NOT NULL,
+    PRIMARY KEY (id_karyawan, tanggal)
+);
+CREATE INDEX IF NOT EXISTS idx_absensi_harian_tanggal ON absensi_harian (tanggal);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dibuat REAL NOT NULL,
+    tanggal TEXT NOT NULL,
+    id_karyawan INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    produksi INTEGER NOT NULL,
+    keadaan TEXT NOT NULL DEFAULT 'pending',
+    percobaan INTEGER NOT NULL DEFAULT 0,
+    coba_lagi REAL NOT NULL DEFAULT 0,
+    pesan TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_kunci ON outbox (tanggal, id_karyawan);
+CREATE TABLE IF NOT EXISTS rekap_bulanan (
+    bulan TEXT NOT NULL,
+    id_karyawan INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    jumlah INTEGER NOT NULL,
+    produksi INTEGER NOT NULL,
+    PRIMARY KEY (bulan, id_karyawan, status)
+);
+"""
+
+class MirrorLokal:
+    """
+    Cermin SQLite lokal untuk sheet Karyawan dan Absensi Harian.
+
+    `absensi_harian` menyimpan status final per (ID_Karyawan, tanggal) dan
+    `rekap_bulanan` jumlah status serta produksi per (bulan, ID_Karyawan, status);
+    keduanya dipelihara inkremental saat baris baru masuk. Watermark sinkron
+    (jumlah baris sheet yang sudah diterapkan dan baris terakhirnya) disimpan di `meta`
+    sehingga aplikasi bisa langsung membaca dari disk saat start.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=FULL')  # outbox harus tahan crash/mati listrik
+        self.conn.executescript(SKEMA_MIRROR)
+
+    def _baca_meta(self, kunci, default=None):
+        row = self.conn.execute('SELECT nilai FROM meta WHERE kunci = ?', (kunci,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _tulis_meta(self, kunci, nilai):
+        self.conn.execute(
+            'INSERT INTO meta (kunci, nilai) VALUES (?, ?) ON CONFLICT(kunci) DO UPDATE SET nilai = excluded.nilai',
+            (kunci, json.dumps(nilai))
+        )
+
+    # --- Karyawan ---
+    def karyawan(self):
+        """Daftar karyawan tersimpan dalam bentuk baris sheet, atau None jika belum pernah disinkron."""
+        with self.lock:
+            if not self._baca_meta('karyawan_termuat', False):
+                return None
+            rows = self.conn.execute('SELECT id_karyawan, nama_karyawan FROM karyawan ORDER BY id_karyawan').fetchall()
+        return [{'ID_Karyawan': id_karyawan, 'Nama_Karyawan': nama} for id_karyawan, nama in rows]
+
+    def ganti_karyawan(self, data):
+        rows = []
+        for r in data:
+            id_karyawan = pd.to_numeric(str(r.get('ID_Karyawan', '')).strip(), errors='coerce')
+            rows.append((0 if pd.isna(id_karyawan) else int(id_karyawan), str(r.get('Nama_Karyawan', ''))))
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM karyawan')
+            self.conn.executemany('INSERT OR REPLACE INTO karyawan (id_karyawan, nama_karyawan) VALUES (?, ?)', rows)
+            self._tulis_meta('karyawan_termuat', True)
+
+    def tambah_karyawan(self, id_karyawan, nama):
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO karyawan (id_karyawan, nama_karyawan) VALUES (?, ?)', (int(id_karyawan), nama))
+
+    # --- Absensi ---
+    def watermark(self):
+        """(termuat, offset, anchor) dari sinkron terakhir."""
+        with self.lock:
+            return (
+                self._baca_meta('absensi_termuat', False),
+                self._baca_meta('absensi_offset', 0),
+                self._baca_meta('absensi_anchor'),
+            )
+
+    def atur_watermark(self, offset, anchor):
+        """Menggeser watermark tanpa mengubah isi (mis. setelah kompaksi yang tidak mengubah status final)."""
+        with self.lock, self.conn:
+            self._tulis_meta('absensi_offset', offset)
+            self._tulis_meta('absensi_anchor', anchor)
+
+    def kompaksi_terakhir(self):
+        """Batas tanggal kompaksi terakhir yang berhasil, atau None."""
+        with self.lock:
+            sampai = self._baca_meta('kompaksi_sampai')
+        return date.fromisoformat(sampai) if sampai else None
+
+    def catat_kompaksi(self, sampai):
+        with self.lock, self.conn:
+            self._tulis_meta('kompaksi_sampai', sampai.strftime('%Y-%m-%d'))
+
+    def ganti_absensi(self, rows):
+        """
+        Membangun ulang seluruh tabel absensi dari isi sheet lengkap (vektor). Pemanggil
+        sebaiknya tidak menyimpan referensi ke `rows` agar JSON mentah bisa dibebaskan
+        setelah konversi.
+        """
+        jumlah_baris, anchor = len(rows), (rows[-1] if rows else None)
+        df = normalisasi_absensi(rows).drop_duplicates(subset=['ID_Karyawan', 'Hari'], keep='last')
+        del rows
+        tanggal = hari_ke_str(df['Hari'])
+        df_rekap = df.assign(bulan=tanggal.astype('U7')).groupby(
+            ['bulan', 'ID_Karyawan', 'Status_Kehadiran'], observed=True
+        ).agg(jumlah=('Produksi', 'size'), produksi=('Produksi', 'sum')).reset_index()
+
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM absensi_harian')
+            self.conn.execute('DELETE FROM rekap_bulanan')
+            self.conn.executemany(
+                'INSERT INTO absensi_harian (id_karyawan, tanggal, status, produksi) VALUES (?, ?, ?, ?)',
+                zip(df['ID_Karyawan'].tolist(), tanggal.tolist(), df['Status_Kehadiran'].tolist(), df['Produksi'].tolist())
+            )
+            self.conn.executemany(
+                'INSERT INTO rekap_bulanan (bulan, id_karyawan, status, jumlah, produksi) VALUES (?, ?, ?, ?, ?)',
+                zip(df_rekap['bulan'].tolist(), df_rekap['ID_Karyawan'].tolist(), df_rekap['Status_Kehadiran'].tolist(),
+                    df_rekap['jumlah'].tolist(), df_rekap['produksi'].tolist())
+            )
+            self._tulis_meta('absensi_termuat', True)
+            self._tulis_meta('absensi_offset', jumlah_baris)
+            self._tulis_meta('absensi_anchor', anchor)
+
+    def tambah_absensi(self, rows):
+        """
+        Menerapkan baris sheet baru (berurutan) ke absensi_harian dan rekap_bulanan.
+        Baris koreksi mengurangi kontribusi status lama sebelum menambah yang baru.
+        """
+        if not rows:
+            return
+        df = normalisasi_absensi(rows)
+        with self.lock, self.conn:
+            offset = self._baca_meta('absensi_offset', 0)
+            for id_karyawan, tanggal, status, produksi in zip(
+                df['ID_Karyawan'].tolist(), hari_ke_str(df['Hari']).tolist(),
+                df['Status_Kehadiran'].tolist(), df['Produksi'].tolist()
+            ):
+                bulan = tanggal[:7]
+                lama = self.conn.execute(
+                    'SELECT status, produksi FROM absensi_harian WHERE id_karyawan = ? AND tanggal = ?',
+                    (id_karyawan, tanggal)
+                ).fetchone()
+                if lama:
+                    self.conn.execute(
+                        'UPDATE rekap_bulanan SET jumlah = jumlah - 1, produksi = produksi - ? '
+                        'WHERE bulan = ? AND id_karyawan = ? AND status = ?',
+                        (lama[1], bulan, id_karyawan, lama[0])
+                    )
+                self.conn.execute(
+                    'INSERT INTO absensi_harian (id_karyawan, tanggal, status, produksi) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(id_karyawan, tanggal) DO UPDATE SET status = excluded.status, produksi = excluded.produksi',
+                    (id_karyawan, tanggal, status, produksi)
+                )
+                self.conn.execute(
+                    'INSERT INTO rekap_bulanan (bulan, id_karyawan, status, jumlah, produksi) VALUES (?, ?, ?, 1, ?) '
+                    'ON CONFLICT(bulan, id_karyawan, status) DO UPDATE SET '
+                    'jumlah = jumlah + 1, produksi = produksi + excluded.produksi',
+                    (bulan, id_karyawan, status, produksi)
+                )
+            self._tulis_meta('absensi_offset', offset + len(rows))
+            self._tulis_meta('absensi_anchor', rows[-1])
+
+    def query_harian(self, dari, sampai, id_karyawan=None):
+        """Status final per (ID, tanggal) untuk rentang tanggal [dari, sampai], opsional satu karyawan."""
+        sql = ('SELECT tanggal, id_karyawan, status, produksi FROM absensi_harian '
+               'WHERE tanggal BETWEEN ? AND ?')
+        params = [dari.strftime('%Y-%m-%d'), sampai.strftime('%Y-%m-%d')]
+        if id_karyawan is not None:
+            sql += ' AND id_karyawan = ?'
+            params.append(int(id_karyawan))
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        df = pd.DataFrame(rows, columns=['Tanggal', 'ID_Karyawan', 'Status_Kehadiran', 'Produksi'])
+        df['Tanggal'] = pd.to_datetime(df['Tanggal'], format='%Y-%m-%d')
+        df['ID_Karyawan'] = df['ID_Karyawan'].astype('int32')
+        df['Status_Kehadiran'] = kategori_status(df['Status_Kehadiran'])
+        df['Produksi'] = df['Produksi'].astype('int32')
+        return df
+
+    def final(self, id_karyawan, tanggal):
+        """(status, produksi) final untuk satu karyawan pada satu tanggal, atau None."""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT status, produksi FROM absensi_harian WHERE id_karyawan = ? AND tanggal = ?',
+                (int(id_karyawan), tanggal.strftime('%Y-%m-%d'))
+            ).fetchone()
+
+    def tanggal_terakhir(self):
+        with self.lock:
+            row = self.conn.execute('SELECT MAX(tanggal) FROM absensi_harian').fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+
+    def tanggal_pertama(self):
+        with self.lock:
+            row = self.conn.execute('SELECT MIN(tanggal) FROM absensi_harian').fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+
+    def rekap_bulan(self, tahun, bulan):
+        """{ID_Karyawan: {status: jumlah, ..., 'Total Produksi': n}} untuk satu bulan."""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT id_karyawan, status, jumlah, produksi FROM rekap_bulanan WHERE bulan = ?',
+                (f'{tahun:04d}-{bulan:02d}',)
+            ).fetchall()
+        entri_bulan = {}
+        for id_karyawan, status, jumlah, produksi in rows:
+            entri = entri_bulan.setdefault(id_karyawan, {'Total Produksi': 0})
+            entri[status] = jumlah
+            entri['Total Produksi'] += produksi
+        return entri_bulan
+
+
+@functools.lru_cache(maxsize=None)
+def get_mirror():
+    """Satu koneksi mirror per proses, dipakai bersama oleh semua sesi dan job latar."""
+    return MirrorLokal(MIRROR_PATH)
+
+
+# --- 1. SETUP DATA KARYAWAN (BACA DARI MIRROR LOKAL / SHEETS) ---
+def sinkron_karyawan():
+    """Menyalin sheet Karyawan ke mirror lokal. Mengembalikan True jika berhasil."""
+    data = get_data_from_sheets(SHEET_KARYAWAN)
+    if data is None:
+        return False
+    get_mirror().ganti_karyawan(data)
+    return True
+
+@terukur('parse.karyawan')
+def frame_karyawan(data):
+    """DataFrame master karyawan (index ID_Karyawan) dari baris sheet/mirror."""
+    df = pd.DataFrame(data or [])
+    if df.empty:
+        return pd.DataFrame(columns=['ID_Karyawan', 'Nama_Karyawan']).set_index('ID_Karyawan')
+    df['ID_Karyawan'] = df['ID_Karyawan'].astype(str).str.strip()
+    df['ID_Karyawan'] = pd.to_numeric(df['ID_Karyawan'], errors='coerce').fillna(0).astype(int) 
+    return df.set_index('ID_Karyawan')
+
+def bangun_indeks_karyawan(df_k):
+    """
+    Membangun indeks hash ID->nama dan nama->ID dari master karyawan. Hanya dipanggil saat master
+    dimuat ulang, sehingga pencarian per baris tidak perlu memindai kolom DataFrame.
+    """
+    nama_per_id = {int(id_karyawan): str(nama) for id_karyawan, nama in zip(df_k.index, df_k['Nama_Karyawan'])}
+    # Nama ganda (jika ada di sheet) mengikuti baris pertama, sama seperti .index[0] sebelumnya
+    id_per_nama = {}
+    for id_karyawan, nama in nama_per_id.items():
+        id_per_nama.setdefault(nama, id_karyawan)
+    return nama_per_id, id_per_nama
+
+class MasterKaryawan:
+    """
+    Master karyawan bersama untuk semua sesi dalam satu proses: satu DataFrame + indeks,
+    dengan stempel versi yang naik setiap kali isinya berubah (karyawan baru, sinkron latar).
+    Sesi hanya menyimpan referensi dan versi yang terakhir dipakai; objek di sini tidak
+    boleh diubah di tempat, selalu diganti utuh.
+    """
+
+    def __init__(self, mirror):
+        self.mirror = mirror
+        self.lock = threading.Lock()
+        self.versi = 0
+        self.termuat = False
+        self._ganti([])
+
+    def _ganti(self, data):
+        df = frame_karyawan(data)
+        nama_per_id, id_per_nama = bangun_indeks_karyawan(df)
+        self.df, self.nama_per_id, self.id_per_nama = df, nama_per_id, id_per_nama
+        self.versi += 1
+
+    def muat(self, dari_sheets=False):
+        """Memuat ulang dari mirror lokal (atau dari sheets jika diminta/belum ada); versi naik hanya jika isinya berubah."""
+        data = None if dari_sheets else self.mirror.karyawan()
+        if data is None and sinkron_karyawan():
+            data = self.mirror.karyawan()
+        if data is None:
+            # Sheets tidak terjangkau: pertahankan master yang ada
+            return
+        with self.lock:
+            baru = frame_karyawan(data)
+            if self.termuat and baru.equals(self.df):
+                return
+            self._ganti(data)
+            self.termuat = True
+
+    def tambah(self, id_karyawan, nama):
+        """Menambahkan karyawan baru tanpa memuat ulang seluruh sheet, lalu menaikkan versi."""
+        self.mirror.tambah_karyawan(id_karyawan, nama)
+        with self.lock:
+            data = [{'ID_Karyawan': i, 'Nama_Karyawan': n} for i, n in self.nama_per_id.items()]
+            data.append({'ID_Karyawan': int(id_karyawan), 'Nama_Karyawan': nama})
+            self._ganti(data)
+
+    def snapshot(self):
+        with self.lock:
+            return self.versi, self.df, self.nama_per_id, self.id_per_nama
+
+@functools.lru_cache(maxsize=None)
+def get_master_karyawan():
+    """Satu master karyawan per proses, dipakai bersama oleh semua sesi."""
+    master = MasterKaryawan(get_mirror())
+    master.muat()
+    return master
+
+# --- FUNGSI CACHE UNTUK DATA ABSENSI ---
+class AbsensiCache:
+    """
+    Pintu baca/tulis data Absensi Harian di atas mirror lokal.
+
+    Watermark adalah jumlah baris sheet yang sudah diterapkan ke mirror (`offset`).
+    Sinkron meminta GET ?offset=N sehingga hanya baris baru yang ditransfer. Apps
+    Script membalas dengan `total` (jumlah baris sheet) dan `anchor` (baris ke N-1);
+    jika sheet menyusut atau anchor tidak sama dengan baris terakhir yang diterapkan,
+    watermark dianggap tidak valid dan seluruh sheet dimuat ulang.
+
+    Penyimpanan yang berhasil langsung diterapkan (write-through). Baris yang
+    posisinya di sheet diketahui dan bersambung dengan watermark langsung masuk ke
+    mirror; sisanya disimpan sebagai baris lokal sampai rekonsiliasi di latar
+    belakang menarik baris aslinya dari sheets. Semua query menggabungkan baris lokal
+    dan entri outbox yang belum terkirim.
+    """
+
+    def __init__(self, mirror, outbox=None):
+        self.mirror = mirror
+        self.outbox = outbox
+        self.lock = threading.Lock()
+        self._lock_sinkron = threading.RLock()
+        self.termuat, self.offset, self.anchor = mirror.watermark()
+        self.lokal = []     # (urutan, index sheet atau None, baris) hasil write-through yang belum tersinkron
+        self.versi = 0      # naik setiap isi data berubah
+        self._urutan = 0
+        self._timer = None
+        self._tersaring = {}    # (dari, sampai, id) -> frame dari GET bersaring, selama mirror belum termuat
+        self._muat_latar = None
+        self._berhenti = False
+
+    def stempel(self):
+        """Penanda isi data saat ini (versi cache + versi outbox); berubah setiap kali hasil query bisa berbeda."""
+        return self.versi, (self.outbox.versi if self.outbox is not None else 0)
+
+    def kosong(self):
+        return self.termuat and self.offset == 0 and not self._baris_lokal()
+
+    def muat_penuh_latar(self):
+        """Memulai pemuatan penuh sheet di thread latar (jika belum berjalan) tanpa menahan UI."""
+        with self.lock:
+            if self._berhenti or self.termuat or (self._muat_latar is not None and self._muat_latar.is_alive()):
+                return
+            self._muat_latar = threading.Thread(target=self.sinkron, name='muat-penuh-absensi', daemon=True)
+            self._muat_latar.start()
+
+    def _query_server(self, dari, sampai, id_karyawan=None):
+        """Slice absensi dari Apps Script (GET bersaring), di-cache sampai mirror termuat."""
+        kunci = (dari, sampai, id_karyawan)
+        with self.lock:
+            if kunci in self._tersaring:
+                return self._tersaring[kunci]
+        df = get_absensi_tersaring(dari, sampai, id_karyawan)
+        if df is None:
+            return None
+        with self.lock:
+            self._tersaring[kunci] = df
+            while len(self._tersaring) > SARING_CACHE_MAKS:
+                del self._tersaring[next(iter(self._tersaring))]
+        return df
+
+    def _tambah(self, rows):
+        self.mirror.tambah_absensi(rows)
+        self.offset += len(rows)
+        self.anchor = rows[-1]
+
+    def _rapikan_lokal(self, urutan_sinkron):
+        """
+        Membuang baris lokal yang sudah tercakup watermark dan memindahkan baris lokal
+        yang kini bersambung dengan watermark ke mirror. Baris lokal tanpa index yang
+        ditulis sebelum sinkron dimulai pasti sudah ikut terbaca, jadi ikut dibuang.
+        Mengembalikan True jika ada baris lokal yang dibuang atau dipindah.
+        """
+        sisa = [
+            (urutan, index, row) for urutan, index, row in self.lokal
+            if (index is not None and index >= self.offset) or (index is None and urutan > urutan_sinkron)
+        ]
+        while sisa and sisa[0][1] == self.offset:
+            self._tambah([sisa.pop(0)[2]])
+        berubah = len(sisa) != len(self.lokal)
+        self.lokal = sisa
+        return berubah
+
+    @terukur('sinkron.absensi')
+    def sinkron(self, penuh=False):
+        """Mengambil baris baru sejak watermark; memuat penuh jika belum pernah/tidak valid/diminta."""
+        with self._lock_sinkron:
+            with self.lock:
+                termuat, offset, anchor = self.termuat, self.offset, self.anchor
+                urutan_sinkron = self._urutan
+
+            result = None
+            if termuat and not penuh:
+                result = get_data_from_sheets(SHEET_ABSENSI, params=params_absensi(offset=offset), hasil_lengkap=True)
+                if result is None:
+                    return False
+                if 'total' in result:
+                    # Balasan delta; Apps Script bisa mengembalikan offset/total sebagai string
+                    # (e.parameter.offset). Jika tidak cocok dengan watermark, `data` hanya
+                    # potongan sheet: jangan pernah dipakai sebagai sheet utuh, muat penuh saja.
+                    try:
+                        valid = int(result.get('offset')) == offset and int(result['total']) >= offset
+                    except (TypeError, ValueError):
+                        valid = False
+                    if not valid or (offset > 0 and result.get('anchor') != anchor):
+                        result = None  # watermark tidak valid
+                else:
+                    # Deployment lama mengabaikan offset dan mengirim seluruh sheet
+                    result = {'data': result['data'], 'penuh': True}
+
+            if result is None:
+                data = get_data_from_sheets(SHEET_ABSENSI, params=params_absensi())
+                if data is None:
+                    return False
+                result = {'data': data, 'penuh': True}
+
+            with self.lock:
+                self._tersaring = {}
+                berubah = bool(result.get('penuh'))
+                if berubah:
+                    # JSON mentah tidak disimpan: setelah dikonversi, list-nya bisa dibebaskan
+                    self.mirror.ganti_absensi(result.pop('data'))
+                    self.termuat, self.offset, self.anchor = self.mirror.watermark()
+                else:
+                    # Baris write-through yang masuk selama GET berjalan sudah ada di mirror
+                    baru = result.pop('data')[self.offset - offset:]
+                    if baru:
+                        self._tambah(baru)
+                        berubah = True
+                if self._rapikan_lokal(urutan_sinkron):
+                    berubah = True
+                # Delta kosong (sinkron latar tanpa perubahan) tidak membatalkan hasil yang tersimpan
+                if berubah:
+                    self.versi += 1
+            return True
+
+    def kompaksi(self, sampai):
+        """
+        Meminta Apps Script meringkas baris s.d. `sampai` (lihat kompaksi_absensi). Status
+        final tidak berubah, jadi jika sheet sebelum kompaksi persis sama dengan yang sudah
+        diterapkan ke mirror, cukup watermark yang digeser; jika ada baris yang belum
+        terbaca, seluruh sheet (yang kini lebih kecil) dimuat ulang. Melempar AppsScriptError.
+        """
+        with self._lock_sinkron:
+            if not self.sinkron():
+                raise AppsScriptError("Gagal menyinkronkan data absensi sebelum kompaksi.", sementara=True)
+            # Kompaksi dengan batas yang sama aman diulang: hasilnya tidak berubah
+            hasil = kirim_post(SHEET_ABSENSI, {'sampai': sampai.strftime('%Y-%m-%d')}, action='compact', idempoten=True)
+            with self.lock:
+                cocok = hasil['sebelum'] == self.offset
+                if cocok:
+                    self.offset, self.anchor = hasil['sesudah'], hasil['anchor']
+                    self.mirror.atur_watermark(self.offset, self.anchor)
+                else:
+                    # Index baris lokal merujuk ke sheet lama; biarkan sinkron penuh membuangnya
+                    self.lokal = [(urutan, None, row) for urutan, _, row in self.lokal]
+            if not cocok:
+                self.sinkron(penuh=True)
+            self.mirror.catat_kompaksi(sampai)
+        return hasil
+
+    def terapkan_tulis(self, tulisan):
+        """
+        Write-through setelah POST berhasil. `tulisan` berisi pasangan (baris, index),
+        dengan index posisi baris di sheet dari echo Apps Script (None jika tidak ada).
+        Selama start dingin (mirror belum termuat) semua baris disimpan sebagai baris lokal,
+        yang digabung ke slice GET bersaring, sampai muat penuh/rekonsiliasi mencakupnya.
+        """
+        with self.lock:
+            # Baris yang bersambung dengan watermark diterapkan ke mirror dalam satu transaksi
+            bersambung = []
+            for row, index in tulisan:
+                self._urutan += 1
+                if self.termuat and index is not None and index == self.offset + len(bersambung) and not self.lokal:
+                    bersambung.append(row)
+                else:
+                    self.lokal = self.lokal + [(self._urutan, index, row)]
+            if bersambung:
+                self._tambah(bersambung)
+            self.versi += 1
+        self.jadwalkan_rekonsiliasi()
+
+    def jadwalkan_rekonsiliasi(self, jeda=JEDA_REKONSILIASI):
+        """Menjadwalkan satu sinkron delta di latar belakang untuk menangkap perbedaan dengan sheets."""
+        with self.lock:
+            if self._timer is not None or self._berhenti:
+                return
+            self._timer = threading.Timer(jeda, self._rekonsiliasi)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _rekonsiliasi(self):
+        with self.lock:
+            self._timer = None
+            if self._berhenti:
+                return
+        try:
+            self.sinkron()
+        except Exception:
+            logger.exception("Rekonsiliasi data absensi gagal")
+
+    def hentikan(self):
+        """
+        Membatalkan rekonsiliasi yang terjadwal, menunggu muat penuh/sinkron yang sedang berjalan,
+        dan tidak menjadwalkan kerja latar baru (mis. sebelum cache dibuang).
+        """
+        with self.lock:
+            self._berhenti = True
+            timer, self._timer = self._timer, None
+            muat_latar = self._muat_latar
+        if timer is not None:
+            timer.cancel()
+        if muat_latar is not None:
+            muat_latar.join()
+        with self._lock_sinkron:
+            pass
+
+    # --- Query (mirror + baris lokal) ---
+    def _baris_lokal(self):
+        """Baris yang belum ada di mirror: hasil write-through, lalu isi outbox (lebih baru)."""
+        rows = [row for _, _, row in self.lokal]
+        if self.outbox is not None:
+            rows += self.outbox.baris_tertunda()
+        return rows
+
+    def _frame_lokal(self):
+        rows = self._baris_lokal()
+        return normalisasi_absensi(rows) if rows else None
+
+    def query_harian(self, dari, sampai, id_karyawan=None):
+        """
+        Frame ternormalisasi berisi satu baris final per (ID_Karyawan, Tanggal) dalam
+        rentang [dari, sampai], opsional untuk satu karyawan saja.
+        """
+        df = None
+        if not self.termuat:
+            # Mirror belum siap (start dingin): ambil hanya rentang yang diminta dari Apps Script
+            df = self._query_server(dari, sampai, id_karyawan)
+        if df is None:
+            df = self.mirror.query_harian(dari, sampai, id_karyawan)
+        df_lokal = self._frame_lokal()
+        if df_lokal is not None:
+            df_lokal = df_lokal[
+                (df_lokal['Hari'] >= tanggal_ke_hari(dari)) & (df_lokal['Hari'] <= tanggal_ke_hari(sampai))
+            ]
+            if id_karyawan is not None:
+                df_lokal = df_lokal[df_lokal['ID_Karyawan'] == int(id_karyawan)]
+            if not df_lokal.empty:
+                df_lokal = df_lokal.assign(Tanggal=hari_ke_tanggal(df_lokal['Hari']))[df.columns]
+                # Last-write-wins: baris lokal ditulis setelah semua baris di mirror
+                df = pd.concat([df, df_lokal], ignore_index=True).drop_duplicates(
+                    subset=['ID_Karyawan', 'Tanggal'], keep='last'
+                ).reset_index(drop=True)
+        return df
+
+    def tanggal_terakhir(self):
+        """Tanggal absensi terbaru yang tercatat, atau None."""
+        kandidat = [self.mirror.tanggal_terakhir()]
+        df_lokal = self._frame_lokal()
+        if df_lokal is not None and not df_lokal.empty:
+            kandidat.append(hari_ke_tanggal([df_lokal['Hari'].max()])[0])
+        kandidat = [t for t in kandidat if t is not None]
+        return max(kandidat) if kandidat else None
+
+    def tanggal_pertama(self):
+        """Tanggal absensi tertua yang tercatat, atau None."""
+        kandidat = [self.mirror.tanggal_pertama()]
+        df_lokal = self._frame_lokal()
+        if df_lokal is not None and not df_lokal.empty:
+            kandidat.append(hari_ke_tanggal([df_lokal['Hari'].min()])[0])
+        kandidat = [t for t in kandidat if t is not None]
+        return min(kandidat) if kandidat else None
+
+    def rekap_bulan(self, tahun, bulan):
+        """Jumlah status dan total produksi per karyawan untuk satu bulan, dari rollup (O(karyawan))."""
+        if not self.termuat:
+            # Tanpa rollup: hitung dari slice bulan ini (GET bersaring + baris lokal)
+            awal_bulan = date(tahun, bulan, 1)
+            akhir_bulan = date(tahun + bulan // 12, bulan % 12 + 1, 1) - timedelta(days=1)
+            df = self.query_harian(awal_bulan, akhir_bulan)
+            df_bulan = df.groupby(['ID_Karyawan', 'Status_Kehadiran'], observed=True).size().unstack(fill_value=0)
+            df_bulan['Total Produksi'] = df.groupby('ID_Karyawan')['Produksi'].sum()
+            df_bulan.columns = df_bulan.columns.astype(str)
+            return df_bulan
+
+        entri_bulan = self.mirror.rekap_bulan(tahun, bulan)
+
+        df_lokal = self._frame_lokal()
+        if df_lokal is not None:
+            awal_bulan = date(tahun, bulan, 1)
+            awal_bulan_berikut = date(tahun + bulan // 12, bulan % 12 + 1, 1)
+            df_lokal = df_lokal[
+                (df_lokal['Hari'] >= tanggal_ke_hari(awal_bulan)) & (df_lokal['Hari'] < tanggal_ke_hari(awal_bulan_berikut))
+            ]
+            final = {}
+            for id_karyawan, tanggal, status, produksi in zip(
+                df_lokal['ID_Karyawan'].tolist(), hari_ke_tanggal(df_lokal['Hari']),
+                df_lokal['Status_Kehadiran'].tolist(), df_lokal['Produksi'].tolist()
+            ):
+                kunci = (id_karyawan, tanggal)
+                lama = final[kunci] if kunci in final else self.mirror.final(id_karyawan, tanggal)
+                entri = entri_bulan.setdefault(id_karyawan, {'Total Produksi': 0})
+                if lama is not None:
+                    entri[lama[0]] -= 1
+                    entri['Total Produksi'] -= lama[1]
+                entri[status] = entri.get(status, 0) + 1
+                entri['Total Produksi'] += int(produksi)
+                final[kunci] = (status, int(produksi))
+
+        df = pd.DataFrame.from_dict(entri_bulan, orient='index')
+        df.index.name = 'ID_Karyawan'
+        return df
+
+
+# Representasi ringkas data absensi: hari sebagai nomor hari sejak 1970-01-01 (WIB, int32),
+# ID dan produksi int32, status kategorikal di atas STATUS_ABSENSI.
+EPOCH_HARI = date(1970, 1, 1)
+FORMAT_TANGGAL_APPS_SCRIPT = '%Y-%m-%dT%H:%M:%S.%fZ'   # tanggal dari JSON Apps Script (UTC)
+
+def tanggal_ke_hari(tanggal):
+    """date/Timestamp -> nomor hari (int)."""
+    return (pd.Timestamp(tanggal).date() - EPOCH_HARI).days
+
+def hari_ke_tanggal(hari):
+    """Deret/array nomor hari -> datetime64 (tengah malam, tanpa zona waktu)."""
+    return pd.to_datetime(np.asarray(hari, dtype='int64'), unit='D')
+
+def hari_ke_str(hari):
+    """Array nomor hari -> array string 'YYYY-MM-DD'; setiap hari berbeda dikonversi sekali."""
+    unik, posisi = np.unique(np.asarray(hari, dtype='int64'), return_inverse=True)
+    return np.datetime_as_string(unik.astype('datetime64[D]'))[posisi]
+
+def per_nilai_unik(nilai, konversi):
+    """
+    Menerapkan `konversi` (fungsi vektor atas Series) hanya pada nilai yang berbeda, lalu
+    menyebarkan hasilnya kembali ke setiap baris. Kolom sheet sangat berulang (tanggal,
+    ID, status), jadi ini jauh lebih murah daripada mengonversi setiap baris.
+    """
+    kode, unik = pd.factorize(np.asarray(nilai, dtype=object), use_na_sentinel=False)
+    return np.asarray(konversi(pd.Series(unik, dtype=object)))[kode]
+
+def _hari_wib(unik):
+    # Format Apps Script dulu; sisanya (mis. 'YYYY-MM-DD' dari write-through) dengan parser umum
+    unik = unik.astype(str)
+    waktu = pd.to_datetime(unik, format=FORMAT_TANGGAL_APPS_SCRIPT, errors='coerce', utc=True)
+    sisa = waktu.isna()
+    if sisa.any():
+        waktu[sisa] = pd.to_datetime(unik[sisa], format='mixed', errors='coerce', utc=True)
+    hari_wib = waktu.dt.tz_convert('Asia/Jakarta').dt.tz_localize(None).dt.normalize()
+    return ((hari_wib - pd.Timestamp(EPOCH_HARI)) // pd.Timedelta(days=1)).to_numpy(dtype='float64', na_value=np.nan)
+
+def parse_hari_wib(nilai):
+    """Nilai Tanggal mentah -> nomor hari WIB (float, NaN jika tidak valid); tiap string berbeda di-parse sekali."""
+    return per_nilai_unik(nilai, _hari_wib)
+
+def _angka(unik):
+    return pd.to_numeric(unik, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+def kategori_status(status):
+    """Status huruf kecil sebagai kategorikal; status di luar STATUS_ABSENSI ikut sebagai kategori tambahan."""
+    kode, unik = pd.factorize(np.asarray(status, dtype=object), use_na_sentinel=False)
+    unik = pd.Series(unik, dtype=object).astype(str).str.strip().str.lower()
+    lain = sorted(set(unik) - set(STATUS_ABSENSI))
+    kategori = pd.CategoricalDtype(STATUS_ABSENSI + lain)
+    return pd.Categorical.from_codes(pd.Categorical(unik, dtype=kategori).codes[kode], dtype=kategori)
+
+@terukur('parse.absensi')
+def normalisasi_absensi(data):
+    """
+    Mengubah baris mentah Apps Script menjadi DataFrame ringkas bertipe:
+    Hari (int32, nomor hari WIB), ID_Karyawan (int32), Status_Kehadiran (kategorikal, huruf kecil),
+    Produksi (int32). Baris dengan tanggal tidak valid dibuang.
+    """
+    if isinstance(data, BarisKolom):
+        # Format kolom: tidak perlu membongkar baris per baris
+        kolom = {
+            'Tanggal': data.nilai('Tanggal'), 'ID_Karyawan': data.nilai('ID_Karyawan'),
+            'Status_Kehadiran': data.nilai('Status_Kehadiran'), 'Produksi': data.nilai('Produksi', 0),
+        }
+    else:
+        kolom = {
+            'Tanggal': [r.get('Tanggal') for r in data], 'ID_Karyawan': [r.get('ID_Karyawan') for r in data],
+            'Status_Kehadiran': [r.get('Status_Kehadiran') for r in data], 'Produksi': [r.get('Produksi', 0) for r in data],
+        }
+    df = pd.DataFrame({
+        'Hari': parse_hari_wib(kolom['Tanggal']),
+        'ID_Karyawan': per_nilai_unik(kolom['ID_Karyawan'], _angka),
+        'Status_Kehadiran': kategori_status(kolom['Status_Kehadiran']),
+        'Produksi': per_nilai_unik(kolom['Produksi'], _angka),
+    })
+    df = df[df['Hari'].notna()].reset_index(drop=True)
+    df['Hari'] = df['Hari'].astype('int32')
+    df['ID_Karyawan'] = df['ID_Karyawan'].fillna(0).astype('int32')
+    df['Produksi'] = df['Produksi'].fillna(0).astype('int32')
+    return df
+
+
+def get_absensi_tersaring(dari, sampai, id_karyawan=None):
+    """
+    Mengambil absensi untuk rentang hari WIB [dari, sampai] (opsional satu karyawan) lewat GET
+    bersaring (`from`/`to`/`id_karyawan`). Mengembalikan frame final per (ID, tanggal) seperti
+    MirrorLokal.query_harian, atau None jika gagal.
+    """
+    params = params_absensi(**{'from': dari.strftime('%Y-%m-%d'), 'to': sampai.strftime('%Y-%m-%d')})
+    if id_karyawan is not None:
+        params['id_karyawan'] = int(id_karyawan)
+    result = get_data_from_sheets(SHEET_ABSENSI, params=params, hasil_lengkap=True)
+    if result is None:
+        return None
+
+    df = normalisasi_absensi(result['data'])
+    if 'filter' not in result:
+        # Deployment lama mengabaikan filter dan mengirim seluruh sheet: saring di sini
+        df = df[(df['Hari'] >= tanggal_ke_hari(dari)) & (df['Hari'] <= tanggal_ke_hari(sampai))]
+        if id_karyawan is not None:
+            df = df[df['ID_Karyawan'] == int(id_karyawan)]
+    df = df.drop_duplicates(subset=['ID_Karyawan', 'Hari'], keep='last')
+    df = df.assign(Tanggal=hari_ke_tanggal(df['Hari']))
+    return df[['Tanggal', 'ID_Karyawan', 'Status_Kehadiran', 'Produksi']].reset_index(drop=True)
+
+@functools.lru_cache(maxsize=None)
+def get_absensi_cache():
+    """Satu cache absensi per proses, dipakai bersama oleh semua sesi."""
+    return AbsensiCache(get_mirror(), get_outbox())
+
+def get_absensi_data():
+    """
+    Memastikan data absensi tersedia (langsung dari mirror lokal; sheet hanya dimuat
+    penuh jika mirror masih kosong, di latar belakang). Mengembalikan AbsensiCache.
+    """
+    cache = get_absensi_cache()
+    if not cache.termuat:
+        # Start dingin: sheet dimuat penuh di latar belakang; sementara itu query memakai GET bersaring
+        cache.muat_penuh_latar()
+    return cache
+
+def batas_kompaksi(hari_ini=None):
+    """Tanggal terakhir periode tertutup: akhir bulan sebelum bulan (hari ini - KOMPAKSI_JEDA_HARI)."""
+    acuan = (hari_ini or date.today()) - timedelta(days=KOMPAKSI_JEDA_HARI)
+    return date(acuan.year, acuan.month, 1) - timedelta(days=1)
+
+@terukur('kompaksi.absensi')
+def kompaksi_absensi(sampai=None):
+    """
+    Meringkas log Absensi Harian s.d. `sampai` (default: batas_kompaksi()) menjadi satu
+    baris final per (ID_Karyawan, tanggal); baris yang tergantikan dipindah Apps Script ke
+    sheet SHEET_ARSIP. Mengembalikan dict `sebelum`, `sesudah`, `diarsipkan` (jumlah baris)
+    dan melempar AppsScriptError jika gagal.
+    """
+    sampai = sampai or batas_kompaksi()
+    return get_absensi_cache().kompaksi(sampai)
+
+def kompaksi_terjadwal():
+    """Kompaksi otomatis: hanya berjalan jika ada periode tertutup baru sejak kompaksi terakhir."""
+    sampai = batas_kompaksi()
+    terakhir = get_mirror().kompaksi_terakhir()
+    if terakhir is not None and terakhir >= sampai:
+        return None
+    hasil = kompaksi_absensi(sampai)
+    logger.info("Kompaksi absensi s.d. %s: %d -> %d baris", sampai, hasil['sebelum'], hasil['sesudah'])
+    return hasil
+
+@functools.lru_cache(maxsize=None)
+def mulai_sinkron_latar():
+    """
+    Menjalankan job latar (sekali per proses) yang menyelaraskan mirror lokal dengan
+    kedua sheet setiap SINKRON_INTERVAL detik, sehingga Sheets menjadi target sinkron
+    dan bukan jalur baca.
+    """
+    cache = get_absensi_cache()
+    master = get_master_karyawan()
+
+    def loop():
+        while True:
+            try:
+                # Versi master naik hanya jika sheet Karyawan berubah (mis. diedit langsung di Sheets)
+                master.muat(dari_sheets=True)
+                cache.sinkron()
+                if KOMPAKSI_OTOMATIS:
+                    kompaksi_terjadwal()
+            except Exception:
+                logger.exception("Sinkron latar mirror lokal gagal")
+            time.sleep(SINKRON_INTERVAL)
+
+    thread = threading.Thread(target=loop, name='sinkron-mirror-absensi', daemon=True)
+    thread.start()
+    return thread
+
+def baris_absensi(tanggal, id_karyawan, status, produksi):
+    """Baris sheet Absensi Harian yang setara dengan payload POST (dipakai jika Apps Script tidak mengirim echo)."""
+    return {
+        'Tanggal': tanggal.strftime('%Y-%m-%d'),
+        'ID_Karyawan': int(id_karyawan),
+        'Status_Kehadiran': status,
+        'Produksi': int(produksi)
+    }
+
+# --- OUTBOX: JURNAL PENULISAN ABSENSI YANG TAHAN GANGGUAN ---
+class OutboxAbsensi:
+    """
+    Jurnal penulisan absensi di mirror SQLite. Penyimpanan operator langsung
+    di-commit ke sini (milidetik) lalu dikirim ke Sheets oleh PengirimOutbox.
+    Entri 'pending' menunggu dikirim (dengan backoff jika Apps Script tidak
+    bisa dihubungi); entri 'gagal' ditolak Apps Script dan menunggu tindakan
+    operator. Keduanya ikut ditampilkan sebagai status terbaru.
+    """
+
+    def __init__(self, mirror):
+        self.mirror = mirror
+        self.conn = mirror.conn
+        self.lock = mirror.lock
+        self.versi = 0      # naik setiap baris yang ikut ditampilkan berubah
+
+    def antrekan(self, tanggal, rows):
+        """Mencatat perubahan absensi satu tanggal; entri pending lama untuk karyawan yang sama diganti."""
+        tanggal_str = tanggal.strftime('%Y-%m-%d')
+        sekarang = time.time()
+        with self.lock, self.conn:
+            for item in rows:
+                self.conn.execute(
+                    "DELETE FROM outbox WHERE tanggal = ? AND id_karyawan = ? AND keadaan = 'pending'",
+                    (tanggal_str, int(item['id_karyawan']))
+                )
+                self.conn.execute(
+                    'INSERT INTO outbox (dibuat, tanggal, id_karyawan, status, produksi) VALUES (?, ?, ?, ?, ?)',
+                    (sekarang, tanggal_str, int(item['id_karyawan']), item['status'], int(item['produksi']))
+                )
+            self.versi += 1
+
+    def entri(self, keadaan=None):
+        """Semua entri (atau yang berkeadaan tertentu) sebagai DataFrame, urut sesuai waktu simpan."""
+        sql = 'SELECT id, dibuat, tanggal, id_karyawan, status, produksi, keadaan, percobaan, pesan FROM outbox'
+        params = []
+        if keadaan:
+            sql += ' WHERE keadaan = ?'
+            params.append(keadaan)
+        with self.lock:
+            rows = self.conn.execute(sql + ' ORDER BY id', params).fetchall()
+        return pd.DataFrame(rows, columns=['id', 'dibuat', 'tanggal', 'id_karyawan', 'status', 'produksi', 'keadaan', 'percobaan', 'pesan'])
+
+    def baris_tertunda(self):
+        """Entri pending dan gagal dalam bentuk baris sheet, untuk digabung ke status yang ditampilkan."""
+        with self.lock:
+            rows = self.conn.execute('SELECT tanggal, id_karyawan, status, produksi FROM outbox ORDER BY id').fetchall()
+        return [
+            {'Tanggal': tanggal, 'ID_Karyawan': id_karyawan, 'Status_Kehadiran': status, 'Produksi': produksi}
+            for tanggal, id_karyawan, status, produksi in rows
+        ]
+
+    def ambil_siap(self, batas):
+        """Entri pending yang sudah waktunya dikirim, urut FIFO."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, tanggal, id_karyawan, status, produksi, percobaan, dibuat FROM outbox "
+                "WHERE keadaan = 'pending' AND coba_lagi <= ? ORDER BY id LIMIT ?",
+                (time.time(), batas)
+            ).fetchall()
+        # Kunci idempotensi tetap sama di setiap pengiriman ulang entri yang sama
+        return [
+            {'id': r[0], 'tanggal': r[1], 'id_karyawan': r[2], 'status': r[3], 'produksi': r[4], 'percobaan': r[5],
+             'kunci': f'outbox-{r[0]}-{r[6]!r}'}
+            for r in rows
+        ]
+
+    def terkirim(self, ids):
+        with self.lock, self.conn:
+            self.conn.executemany('DELETE FROM outbox WHERE id = ?', [(i,) for i in ids])
+            self.versi += 1
+
+    def tunda(self, entri, pesan):
+        """Menjadwalkan ulang entri dengan exponential backoff setelah kegagalan sementara."""
+        sekarang = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'UPDATE outbox SET percobaan = percobaan + 1, coba_lagi = ?, pesan = ? WHERE id = ?',
+                [(sekarang + min(OUTBOX_BACKOFF_MAKS, OUTBOX_INTERVAL * 2 ** e['percobaan']), pesan, e['id']) for e in entri]
+            )
+
+    def gagal(self, entri, pesan_per_id):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET keadaan = 'gagal', percobaan = percobaan + 1, pesan = ? WHERE id = ?",
+                [(pesan_per_id[e['id']], e['id']) for e in entri]
+            )
+
+    def coba_lagi_gagal(self):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE outbox SET keadaan = 'pending', coba_lagi = 0 WHERE keadaan = 'gagal'")
+
+    def buang_gagal(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM outbox WHERE keadaan = 'gagal'")
+            self.versi += 1
+
+
+class PengirimOutbox:
+    """Job latar yang menguras outbox ke Sheets per tanggal, dalam batch, dengan retry."""
+
+    def __init__(self, outbox):
+        self.outbox = outbox
+        self.event = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name='pengirim-outbox-absensi', daemon=True)
+        self.thread.start()
+
+    def bangunkan(self):
+        """Meminta pengiriman segera (mis. setelah operator menyimpan)."""
+        self.event.set()
+
+    def _loop(self):
+        while True:
+            self.event.wait(OUTBOX_INTERVAL)
+            self.event.clear()
+            try:
+                while self.kirim_sekali():
+                    pass
+            except Exception:
+                logger.exception("Pengiriman outbox absensi gagal")
+
+    def kirim_sekali(self):
+        """Mengirim satu gelombang entri siap. Mengembalikan True jika ada entri yang terkirim."""
+        entri = self.outbox.ambil_siap(OUTBOX_UKURAN_BATCH)
+        per_tanggal = {}
+        for e in entri:
+            per_tanggal.setdefault(e['tanggal'], []).append(e)
+
+        ada_terkirim = False
+        for tanggal_str, kelompok in per_tanggal.items():
+            tanggal = date.fromisoformat(tanggal_str)
+            try:
+                if BATCH_ABSENSI_AKTIF:
+                    hasil = kirim_absensi_batch(tanggal, kelompok)
+                else:
+                    hasil = input_absensi_konkuren(tanggal, kelompok)
+            except AppsScriptError as err:
+                if err.sementara:
+                    self.outbox.tunda(kelompok, str(err))
+                else:
+                    self.outbox.gagal(kelompok, {e['id']: str(err) for e in kelompok})
+                continue
+
+            terkirim = [e['id'] for e, h in zip(kelompok, hasil) if h['ok']]
+            ditunda = [e for e, h in zip(kelompok, hasil) if not h['ok'] and h.get('sementara')]
+            ditolak = [e for e, h in zip(kelompok, hasil) if not h['ok'] and not h.get('sementara')]
+            self.outbox.terkirim(terkirim)
+            if ditunda:
+                self.outbox.tunda(ditunda, next(h['message'] for h in hasil if not h['ok'] and h.get('sementara')))
+            if ditolak:
+                self.outbox.gagal(ditolak, {e['id']: h['message'] for e, h in zip(kelompok, hasil) if not h['ok']})
+            ada_terkirim = ada_terkirim or bool(terkirim)
+        return ada_terkirim
+
+
+@functools.lru_cache(maxsize=None)
+def get_outbox():
+    return OutboxAbsensi(get_mirror())
+
+@functools.lru_cache(maxsize=None)
+def mulai_pengirim_outbox():
+    """Menjalankan pengirim outbox (sekali per proses)."""
+    return PengirimOutbox(get_outbox())
+
+def antrekan_absensi(tanggal, rows):
+    """Menyimpan perubahan absensi ke outbox lokal dan membangunkan pengirim; kembali dalam milidetik."""
+    get_outbox().antrekan(tanggal, rows)
+    mulai_pengirim_outbox().bangunkan()
+
+
+# --- PENULISAN ABSENSI KE SHEETS (TANPA UI) ---
+def dict_kirim(item):
+    """
+    Satu baris absensi dalam bentuk payload POST. `kunci` (jika ada) adalah kunci
+    idempotensi: Apps Script tidak menambah baris kedua untuk kunci yang sudah tercatat,
+    sehingga pengiriman ulang setelah timeout tidak membuat baris ganda.
+    """
+    baris = {
+        'id_karyawan': int(item['id_karyawan']),
+        'status': item['status'],
+        'produksi': int(item['produksi'])
+    }
+    if item.get('kunci'):
+        baris['kunci'] = item['kunci']
+    return baris
+
+def kirim_absensi_batch(tanggal, rows):
+    """
+    Mencatat absensi banyak karyawan untuk satu tanggal dalam satu POST (?action=batch)
+    tanpa menyentuh UI. Mengembalikan daftar hasil per baris [{'id_karyawan', 'ok', 'message'}]
+    dengan urutan sama seperti `rows`; melempar AppsScriptError jika permintaan gagal seluruhnya.
+    `kunci` (opsional per baris) diteruskan sebagai kunci idempotensi.
+    """
+    payload = {
+        'tanggal': tanggal.strftime('%Y-%m-%d'),
+        'rows': [dict_kirim(item) for item in rows]
+    }
+
+    result = kirim_post(SHEET_ABSENSI, payload, action='batch')
+    if not isinstance(result, dict) or 'results' not in result:
+        raise AppsScriptError("Balasan batch dari Apps Script tidak berisi 'results'. Pastikan deployment mendukung aksi batch.")
+
+    hasil_per_id = {int(r['id_karyawan']): r for r in result['results'] if 'id_karyawan' in r}
+    hasil = []
+    tulisan = []
+    for item in payload['rows']:
+        r = hasil_per_id.get(item['id_karyawan'])
+        if r is None:
+            hasil.append({'id_karyawan': item['id_karyawan'], 'ok': False, 'message': 'Tidak ada hasil dari Apps Script.'})
+        else:
+            hasil.append({'id_karyawan': item['id_karyawan'], 'ok': bool(r.get('ok')), 'message': r.get('message', '')})
+            if r.get('ok'):
+                row = r.get('row') or baris_absensi(tanggal, item['id_karyawan'], item['status'], item['produksi'])
+                tulisan.append((row, r.get('index')))
+
+    if tulisan:
+        get_absensi_cache().terapkan_tulis(tulisan)
+    return hasil
+
+def _unggah_absensi_satu(tanggal, item):
+    """Pekerja fan-out: POST satu baris tanpa menyentuh UI. Mengembalikan (ok, pesan, (baris, index), sementara)."""
+    payload = {'tanggal': tanggal.strftime('%Y-%m-%d'), **dict_kirim(item)}
+    try:
+        result = kirim_post(SHEET_ABSENSI, payload)
+    except AppsScriptError as e:
+        return False, str(e), None, e.sementara
+    echo = result if isinstance(result, dict) else {}
+    row = echo.get('row') or baris_absensi(tanggal, item['id_karyawan'], item['status'], item['produksi'])
+    return True, '', (row, echo.get('index')), False
+
+def input_absensi_konkuren(tanggal, rows, progres=None):
+    """
+    Mencatat absensi banyak karyawan dengan POST satu-baris yang dikirim paralel
+    (maksimal UNGGAH_MAKS_KONKUREN sekaligus), untuk deployment tanpa aksi batch.
+    `progres(selesai, total)` dipanggil di thread pemanggil setiap satu baris selesai.
+    Mengembalikan daftar hasil per baris seperti input_absensi_batch.
+    """
+    hasil = [None] * len(rows)
+    tulisan = []
+    with ThreadPoolExecutor(max_workers=max(1, min(UNGGAH_MAKS_KONKUREN, len(rows)))) as pool:
+        futures = {pool.submit(_unggah_absensi_satu, tanggal, item): i for i, item in enumerate(rows)}
+        for selesai, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                ok, pesan, tulis, sementara = future.result()
+            except Exception as e:
+                ok, pesan, tulis, sementara = False, f"Error fatal saat mengirim data: {e}", None, False
+            hasil[i] = {'id_karyawan': int(rows[i]['id_karyawan']), 'ok': ok, 'message': pesan, 'sementara': sementara}
+            if ok:
+                tulisan.append(tulis)
+            if progres:
+                progres(selesai, len(rows))
+
+    if tulisan:
+        # Urutkan sesuai posisi di sheet agar last-write-wins di cache sama dengan di sheets
+        if all(index is not None for _, index in tulisan):
+            tulisan.sort(key=lambda t: t[1])
+        get_absensi_cache().terapkan_tulis(tulisan)
+    return hasil
+
+
+# --- REKAP (TANPA STATE SESI) ---
+# Dtype ID_Karyawan di semua keluaran rekap (bulanan & rentang) dan skema ekspornya, terlepas
+# dari dtype master/frame harian (int32 setelah normalisasi_absensi) yang masuk
+DTYPE_ID_REKAP = 'int64'
+
+def hitung_rekap_bulanan(cache, df_k, tahun, bulan):
+    """
+    Rekap satu bulan dari rollup cache: jumlah status dan total produksi untuk setiap
+    karyawan di master `df_k` (index ID_Karyawan), diurutkan berdasarkan ID terkecil.
+    DataFrame kosong jika belum ada data absensi atau master kosong.
+    """
+    if cache.kosong() or df_k.empty:
+        return pd.DataFrame()
+
+    # MODIFIKASI: Sertakan 'ID_Karyawan' di kolom_rekap untuk kasus data kosong
+    kolom_rekap_final = ['ID_Karyawan', 'Nama_Karyawan', 'Total Produksi'] + STATUS_ABSENSI
+
+    # Jumlah status & total produksi diambil dari rollup bulanan yang dipelihara inkremental
+    df_bulan = cache.rekap_bulan(tahun, bulan)
+
+    if df_bulan.empty:
+        df_rekap = df_k.copy().reset_index()
+        for col in kolom_rekap_final:
+            if col not in df_rekap.columns:
+                df_rekap[col] = 0
+        df_rekap['Total Produksi'] = 0
+        df_rekap = df_rekap[kolom_rekap_final].astype({'ID_Karyawan': DTYPE_ID_REKAP})
+        return df_rekap.sort_values(by='ID_Karyawan').reset_index(drop=True)
+
+    df_rekap = df_k.copy().merge(df_bulan, left_index=True, right_index=True, how='left')
+
+    for status in STATUS_ABSENSI:
+        if status not in df_rekap.columns:
+            df_rekap[status] = 0
+
+    df_rekap = df_rekap.fillna(0)
+
+    for status in STATUS_ABSENSI:
+        df_rekap[status] = df_rekap[status].astype(int)
+
+    df_rekap['Total Produksi'] = df_rekap['Total Produksi'].astype(int)
+
+    # ID_Karyawan kembali menjadi kolom; urutkan berdasarkan ID terkecil
+    df_rekap = df_rekap.reset_index()[kolom_rekap_final].astype({'ID_Karyawan': DTYPE_ID_REKAP})
+    return df_rekap.sort_values(by='ID_Karyawan').reset_index(drop=True)
+
+KOLOM_REKAP_RENTANG = ['Periode', 'ID_Karyawan', 'Nama_Karyawan', 'Total Produksi'] + STATUS_ABSENSI
+
+def hitung_rekap_rentang(df, dari, sampai, freq, ids, nama_per_id):
+    """
+    Inti rekap_rentang: mengagregasi frame harian final `df` (lihat AbsensiCache.query_harian)
+    per (periode `freq`, ID) untuk semua `ids` di rentang [dari, sampai]. Tanpa state sesi,
+    sehingga juga dipakai ekspor di thread unduhan.
+    """
+    periode = df['Tanggal'].dt.to_period(freq)
+
+    # Satu kolom indikator per status + produksi, dijumlahkan sekali per (periode, ID)
+    df_jumlah = (
+        pd.get_dummies(df['Status_Kehadiran'])
+        .reindex(columns=STATUS_ABSENSI, fill_value=0)
+        .astype(int)
+    )
+    df_jumlah['Total Produksi'] = df['Produksi'].astype(int)
+    df_agregat = df_jumlah.groupby([periode, df['ID_Karyawan']]).sum()
+
+    # Setiap karyawan di master muncul di setiap periode, walau tanpa data
+    indeks_lengkap = pd.MultiIndex.from_product(
+        [pd.period_range(dari, sampai, freq=freq), ids],
+        names=['Periode', 'ID_Karyawan']
+    )
+    df_agregat.index.names = ['Periode', 'ID_Karyawan']
+    df_rekap = df_agregat.reindex(indeks_lengkap, fill_value=0).astype(int).reset_index()
+
+    df_rekap['ID_Karyawan'] = df_rekap['ID_Karyawan'].astype(DTYPE_ID_REKAP)
+    df_rekap['Nama_Karyawan'] = df_rekap['ID_Karyawan'].map(nama_per_id)
+    df_rekap['Periode'] = df_rekap['Periode'].astype(str)
+    return df_rekap[KOLOM_REKAP_RENTANG]
+
+
+# --- 7. FUNGSI IMPOR MASSAL (CSV/XLSX) ---
+# Nama kolom berkas (huruf kecil, spasi -> _) -> kolom internal
+KOLOM_IMPOR = {
+    'tanggal': 'Tanggal',
+    'id': 'ID_Karyawan',
+    'id_karyawan': 'ID_Karyawan',
+    'nama': 'Nama_Karyawan',
+    'nama_karyawan': 'Nama_Karyawan',
+    'status': 'Status_Kehadiran',
+    'status_kehadiran': 'Status_Kehadiran',
+    'produksi': 'Produksi',
+}
+FORMAT_TANGGAL_IMPOR = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S']
+TEMPLATE_IMPOR = "Tanggal,ID_Karyawan,Nama_Karyawan,Status_Kehadiran,Produksi\n2025-01-02,1,,masuk,12\n2025-01-02,,Budi,sakit,0\n"
+
+def _potongan_impor(df):
+    """Menyeragamkan nama kolom satu potongan; kolom yang tidak dikenal dibuang."""
+    df.columns = [KOLOM_IMPOR.get(str(k).strip().lower().replace(' ', '_'), None) for k in df.columns]
+    df = df.loc[:, [k is not None for k in df.columns]]
+    return df.loc[:, ~df.columns.duplicated()]
+
+def baca_berkas_impor(berkas, nama_berkas):
+    """
+    Membaca berkas CSV/XLSX per potongan IMPOR_UKURAN_POTONGAN baris (generator DataFrame),
+    sehingga berkas besar tidak pernah dimuat utuh sebagai objek Python. Kolom `Baris` berisi
+    nomor baris di berkas (header = baris 1).
+    """
+    if nama_berkas.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Membaca XLSX membutuhkan paket openpyxl (pip install openpyxl).")
+        wb = load_workbook(berkas, read_only=True, data_only=True)
+        try:
+            baris = wb.active.iter_rows(values_only=True)
+            header = next(baris, None)
+            if header is None:
+                return
+            nomor = 2
+            while True:
+                potongan = list(itertools.islice(baris, IMPOR_UKURAN_POTONGAN))
+                if not potongan:
+                    break
+                df = _potongan_impor(pd.DataFrame(potongan, columns=list(header), dtype=object))
+                df['Baris'] = range(nomor, nomor + len(df))
+                nomor += len(df)
+                yield df
+        finally:
+            wb.close()
+    else:
+        nomor = 2
+        for df in pd.read_csv(berkas, dtype=str, keep_default_na=False, chunksize=IMPOR_UKURAN_POTONGAN, sep=None, engine='python'):
+            df = _potongan_impor(df)
+            df['Baris'] = range(nomor, nomor + len(df))
+            nomor += len(df)
+            yield df
+
+def _hari_impor(unik):
+    hasil = []
+    for nilai in unik:
+        if isinstance(nilai, datetime):
+            nilai = nilai.date()
+        if isinstance(nilai, date):
+            hasil.append((nilai - EPOCH_HARI).days)
+            continue
+        teks, hari = str(nilai).strip(), np.nan
+        for fmt in FORMAT_TANGGAL_IMPOR:
+            try:
+                hari = (datetime.strptime(teks, fmt).date() - EPOCH_HARI).days
+                break
+            except ValueError:
+                continue
+        hasil.append(hari)
+    return np.asarray(hasil, dtype='float64')
+
+def indeks_nama_impor(nama_per_id):
+    """
+    (nama huruf kecil -> ID untuk nama yang hanya dipakai satu karyawan, set nama yang dipakai
+    lebih dari satu karyawan). Baris yang hanya menyebut nama ganda tidak bisa dipetakan.
+    """
+    id_per_nama, ganda = {}, set()
+    for id_karyawan, nama in nama_per_id.items():
+        kunci = str(nama).strip().lower()
+        if kunci in id_per_nama:
+            ganda.add(kunci)
+        id_per_nama.setdefault(kunci, int(id_karyawan))
+    for kunci in ganda:
+        del id_per_nama[kunci]
+    return id_per_nama, ganda
+
+def validasi_impor(df, nama_per_id):
+    """
+    Memvalidasi satu potongan impor terhadap master karyawan (`nama_per_id`) dan STATUS_ABSENSI.
+    ID dicocokkan dengan semua ID di master; nama hanya dipakai untuk menentukan ID jika nama
+    itu unik. Mengembalikan (frame valid [Baris, Hari, ID_Karyawan, Status_Kehadiran, Produksi],
+    frame galat [Baris, Alasan]).
+    """
+    id_per_nama_unik, nama_ganda = indeks_nama_impor(nama_per_id)
+    nama_kecil_per_id = {int(i): str(nama).strip().lower() for i, nama in nama_per_id.items()}
+    n = len(df)
+    kosong = pd.Series([''] * n, index=df.index, dtype=object)
+    kolom = lambda nama: df[nama].where(df[nama].notna(), '') if nama in df.columns else kosong
+    teks = lambda nama: kolom(nama).astype(str).str.strip()
+
+    hari = per_nilai_unik(kolom('Tanggal').to_numpy(dtype=object), _hari_impor)
+
+    id_teks, nama_teks = teks('ID_Karyawan'), teks('Nama_Karyawan')
+    id_angka = per_nilai_unik(id_teks.to_numpy(dtype=object), _angka)
+    nama_kecil = nama_teks.str.lower()
+    id_dari_nama = nama_kecil.map(id_per_nama_unik).to_numpy(dtype='float64', na_value=np.nan)
+    nama_ambigu = nama_kecil.isin(nama_ganda).to_numpy()
+    ada_id, ada_nama = id_teks != '', nama_teks != ''
+    id_seri = pd.Series(id_angka, index=df.index)
+    id_dikenal = id_seri.isin(set(nama_kecil_per_id))
+    nama_dari_id = id_seri.map(nama_kecil_per_id)
+    id_final = np.where(ada_id, id_angka, id_dari_nama)
+
+    status = teks('Status_Kehadiran').str.lower()
+    produksi_teks = teks('Produksi')
+    produksi = per_nilai_unik(produksi_teks.to_numpy(dtype=object), _angka)
+    produksi = np.where(produksi_teks == '', 0, produksi)
+
+    aturan = [
+        (np.isnan(hari), "Tanggal tidak valid"),
+        (~ada_id & ~ada_nama, "ID/nama karyawan kosong"),
+        (ada_id & ~id_dikenal, "ID karyawan tidak dikenal"),
+        (~ada_id & ada_nama & nama_ambigu, "Nama karyawan tidak unik (isi ID_Karyawan)"),
+        (~ada_id & ada_nama & ~nama_ambigu & np.isnan(id_dari_nama), "Nama karyawan tidak dikenal"),
+        (ada_id & ada_nama & id_dikenal & (nama_dari_id != nama_kecil), "ID dan nama karyawan tidak cocok"),
+        (~status.isin(STATUS_ABSENSI), "Status tidak valid"),
+        (np.isnan(produksi) | (produksi < 0) | (np.nan_to_num(produksi) % 1 != 0), "Produksi tidak valid"),
+    ]
+    alasan = pd.Series([''] * n, index=df.index, dtype=object)
+    for salah, pesan in aturan:
+        salah = np.asarray(salah, dtype=bool)
+        alasan[salah] = alasan[salah] + '; ' + pesan
+    galat = alasan != ''
+
+    ok = ~galat.to_numpy()
+    df_valid = pd.DataFrame({
+        'Baris': df['Baris'].to_numpy()[ok],
+        'Hari': hari[ok].astype('int32'),
+        'ID_Karyawan': id_final[ok].astype('int32'),
+        'Status_Kehadiran': kategori_status(status.to_numpy()[ok]),
+        'Produksi': produksi[ok].astype('int32'),
+    })
+    df_galat = pd.DataFrame({'Baris': df['Baris'][galat].to_numpy(), 'Alasan': alasan[galat].str[2:].to_numpy()})
+    return df_valid, df_galat
+
+@terukur('impor.siapkan')
+def siapkan_impor(berkas, nama_berkas, cache, nama_per_id):
+    """
+    Membaca dan memvalidasi berkas impor, membuang duplikat di dalam berkas (baris terakhir
+    menang, seperti di sheet) dan baris yang sama persis dengan data yang sudah tercatat.
+    Mengembalikan dict: `rencana` (perubahan yang akan diunggah, dengan status/produksi lama),
+    `galat`, `jumlah_baris`, `duplikat`, `tidak_berubah`. Master karyawan (`nama_per_id`) dan
+    data tercatat (`cache`) diberikan pemanggil. Melempar ValueError jika berkas tidak terbaca.
+    """
+    valid, galat, jumlah_baris = [], [], 0
+    try:
+        for df in baca_berkas_impor(berkas, nama_berkas):
+            if 'Tanggal' not in df.columns or 'Status_Kehadiran' not in df.columns or not (
+                {'ID_Karyawan', 'Nama_Karyawan'} & set(df.columns)
+            ):
+                raise ValueError("Berkas harus memiliki kolom Tanggal, Status_Kehadiran, dan ID_Karyawan atau Nama_Karyawan.")
+            jumlah_baris += len(df)
+            df_valid, df_galat = validasi_impor(df, nama_per_id)
+            valid.append(df_valid)
+            galat.append(df_galat)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Berkas tidak dapat dibaca: {e}")
+
+    kolom_rencana = ['Baris', 'Tanggal', 'ID_Karyawan', 'Nama_Karyawan', 'Status_Lama', 'Status_Kehadiran', 'Produksi_Lama', 'Produksi']
+    df_galat = pd.concat(galat, ignore_index=True) if galat else pd.DataFrame(columns=['Baris', 'Alasan'])
+    df = pd.concat(valid, ignore_index=True) if valid else pd.DataFrame()
+    if df.empty:
+        return {'rencana': pd.DataFrame(columns=kolom_rencana), 'galat': df_galat,
+                'jumlah_baris': jumlah_baris, 'duplikat': 0, 'tidak_berubah': 0}
+
+    jumlah_valid = len(df)
+    df = df.drop_duplicates(subset=['ID_Karyawan', 'Hari'], keep='last')
+    duplikat = jumlah_valid - len(df)
+
+    # Bandingkan dengan status final yang sudah tercatat (mirror + baris lokal)
+    df_lama = cache.query_harian(hari_ke_tanggal([df['Hari'].min()])[0], hari_ke_tanggal([df['Hari'].max()])[0])
+    df_lama = pd.DataFrame({
+        'Hari': df_lama['Tanggal'].to_numpy().astype('datetime64[D]').astype('int64').astype('int32'),
+        'ID_Karyawan': df_lama['ID_Karyawan'].to_numpy(),
+        'Status_Lama': df_lama['Status_Kehadiran'].astype(str).to_numpy(),
+        'Produksi_Lama': df_lama['Produksi'].to_numpy(),
+    })
+    df = df.merge(df_lama, on=['Hari', 'ID_Karyawan'], how='left')
+    sama = (df['Status_Lama'] == df['Status_Kehadiran'].astype(str)) & (df['Produksi_Lama'] == df['Produksi'])
+    df = df[~sama].sort_values(['Hari', 'ID_Karyawan']).reset_index(drop=True)
+
+    df['Tanggal'] = hari_ke_tanggal(df['Hari']).date
+    df['Nama_Karyawan'] = df['ID_Karyawan'].map(nama_per_id)
+    df['Produksi_Lama'] = df['Produksi_Lama'].astype('Int64')
+    return {'rencana': df[kolom_rencana], 'galat': df_galat.sort_values('Baris', ignore_index=True),
+            'jumlah_baris': jumlah_baris, 'duplikat': duplikat, 'tidak_berubah': int(sama.sum())}
+
+@terukur('impor.unggah')
+def unggah_impor(df_rencana, progres=None):
+    """
+    Mengunggah rencana impor per tanggal. Dengan OUTBOX_AKTIF semua baris dicatat ke outbox
+    (dikirim latar dalam batch); tanpa outbox dikirim langsung dalam batch IMPOR_UKURAN_BATCH
+    baris. Mengembalikan (jumlah berhasil, daftar gagal [{'tanggal', 'id_karyawan', 'message'}]).
+    """
+    kelompok = list(df_rencana.groupby('Tanggal', sort=True))
+    berhasil, gagal = 0, []
+    for i, (tanggal, df_tanggal) in enumerate(kelompok):
+        rows = [
+            {'id_karyawan': id_karyawan, 'status': status, 'produksi': produksi}
+            for id_karyawan, status, produksi in zip(
+                df_tanggal['ID_Karyawan'].tolist(), df_tanggal['Status_Kehadiran'].astype(str).tolist(),
+                df_tanggal['Produksi'].tolist()
+            )
+        ]
+        if OUTBOX_AKTIF:
+            get_outbox().antrekan(tanggal, rows)
+            berhasil += len(rows)
+        else:
+            for awal in range(0, len(rows), IMPOR_UKURAN_BATCH):
+                potongan = rows[awal:awal + IMPOR_UKURAN_BATCH]
+                try:
+                    hasil = kirim_absensi_batch(tanggal, potongan) if BATCH_ABSENSI_AKTIF else input_absensi_konkuren(tanggal, potongan)
+                except AppsScriptError as e:
+                    hasil = [{'id_karyawan': r['id_karyawan'], 'ok': False, 'message': str(e)} for r in potongan]
+                berhasil += sum(h['ok'] for h in hasil)
+                gagal += [{'tanggal': tanggal, 'id_karyawan': h['id_karyawan'], 'message': h['message']} for h in hasil if not h['ok']]
+        if progres is not None:
+            progres((i + 1) / len(kelompok))
+    if OUTBOX_AKTIF:
+        mulai_pengirim_outbox().bangunkan()
+    return berhasil, gagal
+
+
+# --- 8. FUNGSI EKSPOR (CSV/XLSX/PARQUET) ---
+# format -> (label, MIME, ekstensi, modul opsional yang dibutuhkan)
+FORMAT_EKSPOR = {
+    'csv': ('CSV', 'text/csv', '.csv', None),
+    'xlsx': ('Excel (XLSX)', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx', 'openpyxl'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet', '.parquet', 'pyarrow'),
+}
+
+# Skema kolom ekspor: kolom -> jenis ('tanggal' | 'bilangan' | 'teks'). Header XLSX/CSV dan
+# skema Parquet diambil dari sini, bukan dari isi potongan pertama (yang bisa kosong/semua null).
+KOLOM_EKSPOR_HARIAN = {
+    'Tanggal': 'tanggal', 'ID_Karyawan': 'bilangan', 'Nama_Karyawan': 'teks', 'Status_Kehadiran': 'teks', 'Produksi': 'bilangan',
+}
+KOLOM_EKSPOR_REKAP_BULANAN = {
+    'ID_Karyawan': 'bilangan', 'Nama_Karyawan': 'teks', 'Total Produksi': 'bilangan', **dict.fromkeys(STATUS_ABSENSI, 'bilangan'),
+}
+KOLOM_EKSPOR_REKAP_RENTANG = {'Periode': 'teks', **KOLOM_EKSPOR_REKAP_BULANAN}
+
+def format_ekspor_tersedia():
+    """Format ekspor yang dependensinya terpasang."""
+    return [f for f, (_, _, _, modul) in FORMAT_EKSPOR.items() if modul is None or importlib.util.find_spec(modul) is not None]
+
+def potongan_harian(cache, nama_per_id, dari, sampai, id_karyawan=None):
+    """
+    Generator data harian final (satu baris per karyawan per tanggal) untuk [dari, sampai],
+    satu bulan per potongan; opsional riwayat satu karyawan saja.
+    """
+    awal = dari
+    while awal <= sampai:
+        akhir = min(sampai, date(awal.year + awal.month // 12, awal.month % 12 + 1, 1) - timedelta(days=1))
+        df = cache.query_harian(awal, akhir, id_karyawan).sort_values(['Tanggal', 'ID_Karyawan'])
+        yield pd.DataFrame({
+            'Tanggal': df['Tanggal'].dt.date,
+            'ID_Karyawan': df['ID_Karyawan'],
+            'Nama_Karyawan': df['ID_Karyawan'].map(nama_per_id),
+            'Status_Kehadiran': df['Status_Kehadiran'].astype(str),
+            'Produksi': df['Produksi'],
+        })
+        awal = akhir + timedelta(days=1)
+
+def potongan_rekap(cache, ids, nama_per_id, dari, sampai, per='bulan'):
+    """Generator rekap rentang (lihat rekap_rentang), satu periode per potongan."""
+    freq = PERIODE_REKAP[per][0]
+    for periode in pd.period_range(dari, sampai, freq=freq):
+        awal = max(dari, periode.start_time.date())
+        akhir = min(sampai, periode.end_time.date())
+        yield hitung_rekap_rentang(cache.query_harian(awal, akhir), awal, akhir, freq, ids, nama_per_id)
+
+@terukur('ekspor.tulis')
+def tulis_ekspor(potongan, format_ekspor, kolom):
+    """
+    Menulis potongan-potongan DataFrame ke satu berkas CSV/XLSX/Parquet secara bertahap, tanpa
+    pernah menggabungkan semua potongan di memori. `kolom` (mis. KOLOM_EKSPOR_HARIAN) menentukan
+    urutan kolom, header dan skema Parquet, sehingga ekspor tanpa data tetap berisi header.
+    Mengembalikan file-like yang sudah di-rewind (bisa langsung diberikan ke st.download_button).
+    """
+    berkas = tempfile.SpooledTemporaryFile(max_size=EKSPOR_MEMORI_MAKS)
+    nama_kolom = list(kolom)
+
+    if format_ekspor == 'csv':
+        berkas.write(pd.DataFrame(columns=nama_kolom).to_csv(index=False).encode('utf-8'))
+        tulis = lambda df: berkas.write(df.to_csv(index=False, header=False).encode('utf-8'))
+    elif format_ekspor == 'xlsx':
+        from openpyxl import Workbook
+        penulis = Workbook(write_only=True)
+        lembar = penulis.create_sheet('Absensi')
+        lembar.append(nama_kolom)
+
+        def tulis(df):
+            for baris in df.astype(object).where(df.notna(), None).to_numpy().tolist():
+                lembar.append(baris)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        tipe = {'tanggal': pa.date32(), 'bilangan': pa.int64(), 'teks': pa.string()}
+        skema = pa.schema([(nama, tipe[jenis]) for nama, jenis in kolom.items()])
+        penulis = pq.ParquetWriter(berkas, skema)
+        tulis = lambda df: penulis.write_table(pa.Table.from_pandas(df, schema=skema, preserve_index=False))
+
+    for df in potongan:
+        if not df.empty:
+            tulis(df[nama_kolom])
+
+    if format_ekspor == 'xlsx':
+        penulis.save(berkas)
+    elif format_ekspor == 'parquet':
+        penulis.close()
+    berkas.seek(0)
+    return berkas
+
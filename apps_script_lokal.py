@@ -0,0 +1,293 @@
+"""
+Pengganti lokal (stand-in) untuk Web App Apps Script yang dipakai absensi.py.
+
+Meniru kontrak HTTP yang sama sehingga dashboard bisa dijalankan dan diuji tanpa
+Google Sheets:
+
+    GET  ?sheet=<nama>                  -> {"status": 200, "data": [baris, ...]}
+    GET  ?sheet=<nama>&offset=N         -> {"status": 200, "data": [baris ke-N dst.],
+                                            "offset": N, "total": <jumlah baris>,
+                                            "anchor": <baris ke N-1 atau null>}
+    GET  ?sheet=Absensi Harian&from=YYYY-MM-DD&to=YYYY-MM-DD&id_karyawan=N   (semua opsional)
+                                        -> {"status": 200, "data": [baris dalam rentang hari WIB],
+                                            "filter": {"from", "to", "id_karyawan"}}
+    GET  ...&format=kolom               -> seperti di atas, tetapi "data" diganti
+                                           "format": "kolom-gzip", "kolom": base64(gzip(JSON {kolom: [nilai, ...]}))
+    POST ?sheet=Karyawan                {"nama_karyawan"}
+                                        -> {"status": 200, "data": {"id": <id baru>}}
+    POST ?sheet=Absensi Harian          {"tanggal", "id_karyawan", "status", "produksi", "kunci" (opsional)}
+                                        -> {"status": 200, "data": {"index": <posisi baris>, "row": <baris tertulis>}}
+    POST ?sheet=Absensi Harian&action=batch
+                                        {"tanggal", "rows": [{"id_karyawan", "status", "produksi", "kunci" (opsional)}, ...]}
+                                        -> {"status": 200, "data": {"results": [{"id_karyawan", "ok", "message", "index", "row"}, ...]}}
+                                           baris dengan `kunci` yang sudah pernah tertulis tidak ditambah lagi
+                                           (balasan ok tanpa `index`), seperti pengiriman ulang setelah timeout
+    POST ?sheet=Absensi Harian&action=compact
+                                        {"sampai": "YYYY-MM-DD"}
+                                        -> {"status": 200, "data": {"sebelum", "sesudah", "diarsipkan", "anchor"}}
+                                           baris s.d. `sampai` (hari WIB) diringkas menjadi satu baris terakhir per
+                                           (ID_Karyawan, tanggal); baris yang tergantikan dipindah ke sheet Absensi Arsip
+
+Cara pakai:
+    python apps_script_lokal.py --port 8765 [--latensi 0.3]
+    APPS_SCRIPT_URL=http://localhost:8765/exec streamlit run absensi.py
+"""
+import argparse
+import base64
+import gzip
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SHEET_KARYAWAN = 'Karyawan'
+SHEET_ABSENSI = 'Absensi Harian'
+SHEET_ARSIP = 'Absensi Arsip'
+
+STATUS_ABSENSI = ['masuk', 'sakit', 'izin', 'alpha', '1/2 hari', 'resign', 'libur', 'kosong']
+
+# Sheets menyimpan tanggal sebagai tengah malam WIB; JSON Apps Script mengirimnya dalam UTC.
+OFFSET_WIB = timedelta(hours=7)
+
+
+def tanggal_ke_json(tanggal_str):
+    """Mengubah 'YYYY-MM-DD' menjadi string ISO UTC seperti yang dikirim Apps Script."""
+    tengah_malam_wib = datetime.strptime(tanggal_str, '%Y-%m-%d')
+    return (tengah_malam_wib - OFFSET_WIB).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def tanggal_wib(tanggal_json):
+    """Kebalikan tanggal_ke_json: string tanggal sheet -> date WIB (None jika tidak valid)."""
+    try:
+        if len(tanggal_json) == 10:
+            return date.fromisoformat(tanggal_json)
+        return (datetime.strptime(tanggal_json[:19], '%Y-%m-%dT%H:%M:%S') + OFFSET_WIB).date()
+    except (TypeError, ValueError):
+        return None
+
+
+FILTER_ABSENSI = ('from', 'to', 'id_karyawan')
+
+
+def ke_kolom(rows):
+    """Daftar baris -> base64(gzip(JSON {kolom: [nilai, ...]})); kolom yang tidak ada di suatu baris diisi null."""
+    nama_kolom = list(dict.fromkeys(k for row in rows for k in row))
+    kolom = {k: [row.get(k) for row in rows] for k in nama_kolom}
+    teks = json.dumps(kolom, separators=(',', ':')).encode('utf-8')
+    return base64.b64encode(gzip.compress(teks)).decode('ascii')
+
+
+class SheetsLokal:
+    """Penyimpanan in-memory untuk sheet Karyawan dan Absensi Harian."""
+
+    def __init__(self, karyawan=None, absensi=None):
+        self.lock = threading.Lock()
+        self.sheets = {
+            SHEET_KARYAWAN: list(karyawan or []),
+            SHEET_ABSENSI: list(absensi or []),
+            SHEET_ARSIP: [],
+        }
+        self.kunci_tertulis = {}    # kunci idempotensi -> baris yang tertulis
+
+    def get(self, sheet_name, params):
+        result = self._get(sheet_name, params)
+        if params.get('format') == 'kolom' and result.get('status') == 200:
+            # Seperti Apps Script: Utilities.gzip + base64, karena header Content-Encoding tidak bisa diatur
+            result['kolom'] = ke_kolom(result.pop('data'))
+            result['format'] = 'kolom-gzip'
+        return result
+
+    def _get(self, sheet_name, params):
+        with self.lock:
+            if sheet_name not in self.sheets:
+                return {'status': 404, 'message': f"Sheet '{sheet_name}' tidak ditemukan."}
+            rows = self.sheets[sheet_name]
+            if sheet_name == SHEET_ABSENSI and any(k in params for k in FILTER_ABSENSI):
+                return self._saring_absensi(rows, params)
+            if 'offset' not in params:
+                return {'status': 200, 'data': list(rows)}
+            try:
+                offset = int(params['offset'])
+            except ValueError:
+                return {'status': 400, 'message': f"Offset tidak valid: {params['offset']!r}"}
+            return {
+                'status': 200,
+                'data': rows[offset:],
+                'offset': offset,
+                'total': len(rows),
+                'anchor': rows[offset - 1] if 0 < offset <= len(rows) else None,
+            }
+
+    def _saring_absensi(self, rows, params):
+        try:
+            dari = date.fromisoformat(params['from']) if 'from' in params else None
+            sampai = date.fromisoformat(params['to']) if 'to' in params else None
+            id_karyawan = int(params['id_karyawan']) if 'id_karyawan' in params else None
+        except ValueError as e:
+            return {'status': 400, 'message': f"Filter tidak valid: {e}"}
+
+        def cocok(row):
+            if id_karyawan is not None and int(row['ID_Karyawan']) != id_karyawan:
+                return False
+            hari = tanggal_wib(row['Tanggal'])
+            if hari is None:
+                return False
+            return (dari is None or hari >= dari) and (sampai is None or hari <= sampai)
+
+        return {
+            'status': 200,
+            'data': [row for row in rows if cocok(row)],
+            'filter': {k: params[k] for k in FILTER_ABSENSI if k in params},
+        }
+
+    def post(self, sheet_name, params, payload):
+        with self.lock:
+            if sheet_name == SHEET_KARYAWAN:
+                return self._tambah_karyawan(payload)
+            if sheet_name == SHEET_ABSENSI:
+                if params.get('action') == 'batch':
+                    return self._tulis_absensi_batch(payload)
+                if params.get('action') == 'compact':
+                    return self._kompaksi_absensi(payload)
+                ok, message, echo = self._tulis_absensi(payload.get('tanggal'), payload)
+                if not ok:
+                    return {'status': 400, 'message': message}
+                return {'status': 200, 'message': message, 'data': echo}
+            return {'status': 404, 'message': f"Sheet '{sheet_name}' tidak ditemukan."}
+
+    def _kompaksi_absensi(self, payload):
+        try:
+            sampai = date.fromisoformat(payload.get('sampai', ''))
+        except (TypeError, ValueError):
+            return {'status': 400, 'message': f"Tanggal batas tidak valid: {payload.get('sampai')!r}"}
+        rows = self.sheets[SHEET_ABSENSI]
+        # Posisi baris terakhir per (ID_Karyawan, tanggal) di periode tertutup
+        terakhir = {}
+        for i, row in enumerate(rows):
+            hari = tanggal_wib(row.get('Tanggal'))
+            if hari is not None and hari <= sampai:
+                terakhir[(str(row.get('ID_Karyawan')), hari)] = i
+        dipertahankan = set(terakhir.values())
+        tetap, arsip = [], []
+        for i, row in enumerate(rows):
+            hari = tanggal_wib(row.get('Tanggal'))
+            (arsip if hari is not None and hari <= sampai and i not in dipertahankan else tetap).append(row)
+        self.sheets[SHEET_ARSIP].extend(arsip)
+        self.sheets[SHEET_ABSENSI] = tetap
+        return {'status': 200, 'data': {
+            'sebelum': len(rows),
+            'sesudah': len(tetap),
+            'diarsipkan': len(arsip),
+            'anchor': tetap[-1] if tetap else None,
+        }}
+
+    def _tambah_karyawan(self, payload):
+        nama = str(payload.get('nama_karyawan', '')).strip()
+        if not nama:
+            return {'status': 400, 'message': 'Nama karyawan kosong.'}
+        rows = self.sheets[SHEET_KARYAWAN]
+        id_baru = max((int(r['ID_Karyawan']) for r in rows), default=0) + 1
+        rows.append({'ID_Karyawan': id_baru, 'Nama_Karyawan': nama})
+        return {'status': 200, 'data': {'id': id_baru}}
+
+    def _tulis_absensi(self, tanggal, row):
+        kunci = row.get('kunci')
+        if kunci and kunci in self.kunci_tertulis:
+            # Pengiriman ulang: posisi baris bisa sudah bergeser (kompaksi), jadi index tidak dikirim
+            return True, 'Data absensi sudah tercatat.', {'row': self.kunci_tertulis[kunci]}
+        try:
+            tanggal_json = tanggal_ke_json(tanggal)
+        except (TypeError, ValueError):
+            return False, f"Tanggal tidak valid: {tanggal!r}", None
+        id_karyawan = row.get('id_karyawan')
+        if not any(int(k['ID_Karyawan']) == id_karyawan for k in self.sheets[SHEET_KARYAWAN]):
+            return False, f"ID karyawan {id_karyawan} tidak ditemukan.", None
+        if row.get('status') not in STATUS_ABSENSI:
+            return False, f"Status tidak valid: {row.get('status')!r}", None
+        baris = {
+            'Tanggal': tanggal_json,
+            'ID_Karyawan': id_karyawan,
+            'Status_Kehadiran': row['status'],
+            'Produksi': row.get('produksi', 0),
+        }
+        rows = self.sheets[SHEET_ABSENSI]
+        rows.append(baris)
+        if kunci:
+            self.kunci_tertulis[kunci] = baris
+        return True, 'Data absensi berhasil disimpan.', {'index': len(rows) - 1, 'row': baris}
+
+    def _tulis_absensi_batch(self, payload):
+        rows = payload.get('rows')
+        if not isinstance(rows, list):
+            return {'status': 400, 'message': "Payload batch harus memiliki daftar 'rows'."}
+        results = []
+        for row in rows:
+            ok, message, echo = self._tulis_absensi(payload.get('tanggal'), row)
+            results.append({'id_karyawan': row.get('id_karyawan'), 'ok': ok, 'message': message, **(echo or {})})
+        return {'status': 200, 'data': {'results': results}}
+
+
+def buat_handler(sheets, latensi=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        def _params(self):
+            query = parse_qs(urlparse(self.path).query)
+            return {k: v[0] for k, v in query.items()}
+
+        def _kirim(self, body):
+            if latensi:
+                # Meniru waktu round trip Apps Script
+                time.sleep(latensi)
+            data = json.dumps(body).encode('utf-8')
+            # Apps Script selalu membalas HTTP 200; status sebenarnya ada di body.
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            params = self._params()
+            self._kirim(sheets.get(params.get('sheet'), params))
+
+        def do_POST(self):
+            params = self._params()
+            panjang = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(panjang) or b'{}')
+            except json.JSONDecodeError as e:
+                self._kirim({'status': 400, 'message': f'JSON tidak valid: {e}'})
+                return
+            self._kirim(sheets.post(params.get('sheet'), params, payload))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def buat_server(sheets=None, host='127.0.0.1', port=0, latensi=0.0):
+    """
+    Membuat server stand-in; port=0 memilih port bebas (lihat server.server_address).
+    `latensi` (detik) ditambahkan ke setiap balasan untuk meniru Apps Script.
+    """
+    sheets = sheets or SheetsLokal()
+    server = ThreadingHTTPServer((host, port), buat_handler(sheets, latensi))
+    server.sheets = sheets
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stand-in lokal Apps Script untuk absensi.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latensi', type=float, default=0.0, help='jeda (detik) per permintaan')
+    args = parser.parse_args()
+
+    server = buat_server(host=args.host, port=args.port, latensi=args.latensi)
+    print(f"Apps Script lokal berjalan di http://{args.host}:{args.port}/exec")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
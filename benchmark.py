@@ -0,0 +1,254 @@
+"""
+Benchmark jalur panas absensi.py dengan data karyawan sintetis.
+
+Setiap skenario (jumlah karyawan x tahun data) dijalankan di proses terpisah. Prosesnya:
+1. Membuat sheet Karyawan dan Absensi Harian sintetis, termasuk koreksi (baris ganda) di hari yang sama.
+2. Menyajikan sheet itu lewat stand-in Apps Script lokal (apps_script_lokal.py) dengan latensi yang bisa diatur.
+3. Mengimpor absensi.py dalam mode bare Streamlit terhadap stand-in tersebut.
+4. Mengukur waktu dan puncak memori setiap jalur panas.
+
+Cara pakai:
+    python benchmark.py --karyawan 50 200 1000 --tahun 1 --latensi 0.2
+    python benchmark.py --karyawan 1000 --tahun 5 --output bench_output.txt
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import apps_script_lokal
+
+# Bobot status harian sintetis (kira-kira pola pabrik: mayoritas masuk, libur mingguan)
+BOBOT_STATUS = {
+    'masuk': 80,
+    'sakit': 3,
+    'izin': 3,
+    'alpha': 2,
+    '1/2 hari': 3,
+    'libur': 8,
+    'kosong': 1,
+}
+
+# Batas (detik) menunggu muat penuh mirror / outbox terkirim; lewat dari itu skenario dianggap gagal
+BATAS_TUNGGU = 300
+
+
+def buat_data_sintetis(jumlah_karyawan, tahun=1, rasio_tulis_ulang=0.05, sampai=None, seed=0):
+    """
+    Membuat (karyawan, absensi) dalam format baris sheet. Absensi berisi satu baris per
+    karyawan per hari selama `tahun` tahun sampai `sampai` (default hari ini). Sebagian
+    baris (`rasio_tulis_ulang`) ditulis ulang dengan status lain di hari yang sama,
+    seperti koreksi operator.
+    """
+    acak = random.Random(seed)
+    sampai = sampai or date.today()
+    mulai = sampai - timedelta(days=365 * tahun - 1)
+
+    karyawan = [{'ID_Karyawan': i, 'Nama_Karyawan': f'Karyawan {i:04d}'} for i in range(1, jumlah_karyawan + 1)]
+    status_list = list(BOBOT_STATUS)
+    bobot = list(BOBOT_STATUS.values())
+
+    def produksi(status):
+        if status == 'masuk':
+            return acak.randint(0, 100)
+        if status == '1/2 hari':
+            return acak.randint(0, 50)
+        return 0
+
+    absensi = []
+    hari = mulai
+    while hari <= sampai:
+        tanggal_json = apps_script_lokal.tanggal_ke_json(hari.strftime('%Y-%m-%d'))
+        status_hari = acak.choices(status_list, weights=bobot, k=jumlah_karyawan)
+        koreksi = []
+        for (k, status) in zip(karyawan, status_hari):
+            absensi.append({
+                'Tanggal': tanggal_json,
+                'ID_Karyawan': k['ID_Karyawan'],
+                'Status_Kehadiran': status,
+                'Produksi': produksi(status),
+            })
+            if acak.random() < rasio_tulis_ulang:
+                status_baru = acak.choice([s for s in status_list if s != status])
+                koreksi.append({
+                    'Tanggal': tanggal_json,
+                    'ID_Karyawan': k['ID_Karyawan'],
+                    'Status_Kehadiran': status_baru,
+                    'Produksi': produksi(status_baru),
+                })
+        # Koreksi ditulis setelah input awal hari itu
+        absensi.extend(koreksi)
+        hari += timedelta(days=1)
+    return karyawan, absensi
+
+
+def ukur(nama, fungsi, ulang=1):
+    """
+    Menjalankan `fungsi` `ulang` kali tanpa tracemalloc (waktu terbaik), lalu sekali dengan
+    tracemalloc untuk puncak alokasi Python. Mengembalikan dict hasil.
+    """
+    waktu = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        fungsi()
+        waktu.append(time.perf_counter() - mulai)
+
+    tracemalloc.start()
+    try:
+        fungsi()
+        _, puncak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'jalur': nama, 'detik': min(waktu), 'puncak_mb': puncak / 2**20}
+
+
+def tunggu(kondisi, pesan, batas=BATAS_TUNGGU):
+    """Menunggu sampai kondisi() benar; melempar TimeoutError(pesan) setelah `batas` detik."""
+    tenggat = time.monotonic() + batas
+    while not kondisi():
+        if time.monotonic() > tenggat:
+            raise TimeoutError(f"{pesan} dalam {batas} detik.")
+        time.sleep(0.01)
+
+
+def rss_maks_mb():
+    # ru_maxrss dalam KiB di Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def jalankan_skenario(jumlah_karyawan, tahun, rasio_tulis_ulang, latensi, ulang, per_baris):
+    """Menjalankan satu skenario di proses ini dan mengembalikan dict hasil (dipanggil dari proses anak)."""
+    karyawan, absensi = buat_data_sintetis(jumlah_karyawan, tahun, rasio_tulis_ulang)
+    jumlah_baris = len(absensi)
+
+    server = apps_script_lokal.buat_server(apps_script_lokal.SheetsLokal(karyawan, absensi), latensi=latensi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    del karyawan, absensi
+
+    folder = tempfile.mkdtemp(prefix='bench_absensi_')
+    os.environ['APPS_SCRIPT_URL'] = 'http://%s:%d/exec' % server.server_address
+    os.environ['ABSENSI_MIRROR_PATH'] = os.path.join(folder, 'mirror.sqlite3')
+
+    hasil = []
+    rss_awal = rss_maks_mb()
+    mulai = time.perf_counter()
+    import absensi  # start dingin: mirror kosong, tab pertama di-render dari GET bersaring
+    hasil.append({'jalur': 'start dingin (render pertama)', 'detik': time.perf_counter() - mulai,
+                  'puncak_mb': rss_maks_mb() - rss_awal})
+
+    # Seluruh sheet dimuat di thread latar; start dingin baru selesai setelah mirror termuat
+    cache = absensi.get_absensi_cache()
+    tunggu(lambda: cache.termuat, "Mirror tidak selesai dimuat penuh")
+    hasil.append({'jalur': 'start dingin (sampai mirror termuat)', 'detik': time.perf_counter() - mulai,
+                  'puncak_mb': rss_maks_mb() - rss_awal})
+
+    hari_ini = date.today()
+    awal_tahun = date(hari_ini.year, 1, 1)
+
+    def hitung_ulang(fungsi):
+        # Yang diukur perhitungannya, bukan hasil yang disimpan per sesi (lihat absensi.hasil_tab)
+        def jalankan():
+            absensi.st.session_state.pop('hasil_tab', None)
+            return fungsi()
+        return jalankan
+
+    hasil.append(ukur('sinkron delta (tanpa perubahan)', cache.sinkron, ulang))
+    hasil.append(ukur('rekap_bulanan', hitung_ulang(lambda: absensi.rekap_bulanan(hari_ini.year, hari_ini.month)), ulang))
+    hasil.append(ukur('rekap_bulanan (hasil tersimpan)', lambda: absensi.rekap_bulanan(hari_ini.year, hari_ini.month), ulang))
+    hasil.append(ukur('rekap_rentang per bulan (tahun berjalan)',
+                      hitung_ulang(lambda: absensi.rekap_rentang(awal_tahun, hari_ini, 'bulan')), ulang))
+    hasil.append(ukur('get_current_status', lambda: absensi.get_current_status(hari_ini), ulang))
+    hasil.append(ukur('tinjauan_harian',
+                      lambda: absensi.tinjauan_harian(cache.query_harian(hari_ini, hari_ini)), ulang))
+
+    rows = [{'id_karyawan': i, 'status': 'masuk', 'produksi': 1} for i in range(1, jumlah_karyawan + 1)]
+    hasil.append(ukur('simpan input cepat (batch)', lambda: absensi.kirim_absensi_batch(hari_ini, rows)))
+
+    def simpan_outbox():
+        absensi.antrekan_absensi(hari_ini, rows)
+        tunggu(lambda: absensi.get_outbox().entri().empty, "Outbox tidak terkirim habis")
+    hasil.append(ukur('simpan input cepat (outbox sampai terkirim)', simpan_outbox))
+    hasil.append(ukur('simpan input cepat (outbox, waktu operator)',
+                      lambda: absensi.get_outbox().antrekan(hari_ini, rows)))
+
+    if per_baris:
+        hasil.append(ukur('simpan input cepat (per baris, paralel)',
+                          lambda: absensi.input_absensi_konkuren(hari_ini, rows)))
+
+    server.shutdown()
+    return {
+        'karyawan': jumlah_karyawan,
+        'tahun': tahun,
+        'baris_absensi': jumlah_baris,
+        'latensi': latensi,
+        'rss_maks_mb': rss_maks_mb(),
+        'hasil': hasil,
+    }
+
+
+def format_laporan(skenario):
+    baris = [
+        f"== {skenario['karyawan']} karyawan x {skenario['tahun']} tahun "
+        f"({skenario['baris_absensi']:,} baris absensi, latensi {skenario['latensi']}s, "
+        f"RSS maks {skenario['rss_maks_mb']:.0f} MB) =="
+    ]
+    for h in skenario['hasil']:
+        baris.append(f"  {h['jalur']:<45} {h['detik'] * 1000:>10.1f} ms {h['puncak_mb']:>9.1f} MB")
+    return '\n'.join(baris)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark jalur panas absensi.py dengan data sintetis')
+    parser.add_argument('--karyawan', type=int, nargs='+', default=[50, 200, 1000], help='jumlah karyawan per skenario')
+    parser.add_argument('--tahun', type=int, nargs='+', default=[1], help='lama data absensi (tahun) per skenario')
+    parser.add_argument('--tulis-ulang', type=float, default=0.05, help='rasio koreksi di hari yang sama')
+    parser.add_argument('--latensi', type=float, default=0.2, help='jeda (detik) per permintaan ke stand-in')
+    parser.add_argument('--ulang', type=int, default=3, help='pengulangan untuk jalur baca (diambil yang tercepat)')
+    parser.add_argument('--per-baris', action='store_true', help='ukur juga unggah per baris (lambat dengan latensi)')
+    parser.add_argument('--output', help='tulis laporan juga ke file ini (mis. bench_output.txt)')
+    parser.add_argument('--skenario', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.skenario:
+        # Proses anak: jalankan satu skenario, kirim hasil sebagai JSON di baris terakhir stdout
+        p = json.loads(args.skenario)
+        try:
+            hasil = jalankan_skenario(p['karyawan'], p['tahun'], args.tulis_ulang, args.latensi, args.ulang, args.per_baris)
+        except TimeoutError as e:
+            sys.exit(str(e))    # dilaporkan proses induk sebagai skenario gagal
+        print(json.dumps(hasil))
+        return
+
+    laporan = []
+    for tahun in args.tahun:
+        for jumlah in args.karyawan:
+            perintah = [
+                sys.executable, os.path.abspath(__file__),
+                '--skenario', json.dumps({'karyawan': jumlah, 'tahun': tahun}),
+                '--tulis-ulang', str(args.tulis_ulang),
+                '--latensi', str(args.latensi),
+                '--ulang', str(args.ulang),
+            ] + (['--per-baris'] if args.per_baris else [])
+            proses = subprocess.run(perintah, capture_output=True, text=True)
+            if proses.returncode != 0:
+                print(f"Skenario {jumlah} karyawan x {tahun} tahun gagal:\n{proses.stderr}", file=sys.stderr)
+                continue
+            teks = format_laporan(json.loads(proses.stdout.strip().splitlines()[-1]))
+            print(teks, flush=True)
+            laporan.append(teks)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write('\n\n'.join(laporan) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Fixture bersama: stand-in Apps Script lokal (apps_script_lokal.py) di port bebas dan
+absensi_inti dengan mirror SQLite baru per tes. Singleton absensi_inti (lru_cache)
+dikosongkan sebelum dan sesudah setiap tes agar tidak ada state yang terbawa.
+"""
+import threading
+from datetime import date
+
+import pytest
+
+import absensi_inti
+import apps_script_lokal
+
+KARYAWAN = [
+    {'ID_Karyawan': 1, 'Nama_Karyawan': 'Andi'},
+    {'ID_Karyawan': 2, 'Nama_Karyawan': 'Budi'},
+    {'ID_Karyawan': 3, 'Nama_Karyawan': 'Budi'},
+    {'ID_Karyawan': 4, 'Nama_Karyawan': 'Citra'},
+]
+
+
+def baris_sheet(tanggal, id_karyawan, status, produksi=0):
+    """Satu baris Absensi Harian seperti yang dikirim Apps Script (`tanggal`: date atau 'YYYY-MM-DD')."""
+    return {
+        'Tanggal': apps_script_lokal.tanggal_ke_json(str(tanggal)),
+        'ID_Karyawan': id_karyawan,
+        'Status_Kehadiran': status,
+        'Produksi': produksi,
+    }
+
+
+def final_sheet(rows):
+    """{(tanggal, ID_Karyawan): (status, produksi)} dari baris sheet; baris terakhir yang menang."""
+    final = {}
+    for row in rows:
+        final[(apps_script_lokal.tanggal_wib(row['Tanggal']), row['ID_Karyawan'])] = (row['Status_Kehadiran'], row['Produksi'])
+    return final
+
+
+def final_cache(cache, dari=date(2000, 1, 1), sampai=date(2100, 12, 31)):
+    """Bentuk yang sama dengan final_sheet dari query_harian cache."""
+    df = cache.query_harian(dari, sampai)
+    return {(t, i): (s, p) for t, i, s, p in zip(
+        df['Tanggal'].dt.date, df['ID_Karyawan'], df['Status_Kehadiran'].astype(str), df['Produksi'])}
+
+
+def kosongkan_singleton():
+    # Kerja latar cache lama (timer rekonsiliasi, muat penuh) tidak boleh menembak ke tes berikutnya
+    if absensi_inti.get_absensi_cache.cache_info().currsize:
+        absensi_inti.get_absensi_cache().hentikan()
+    for objek in vars(absensi_inti).values():
+        if hasattr(objek, 'cache_clear'):
+            objek.cache_clear()
+
+
+@pytest.fixture
+def buat_stand_in():
+    """Pabrik stand-in: buat_stand_in(absensi=[...], latensi=0.0) -> server (server.sheets berisi data)."""
+    server_aktif = []
+
+    def buat(absensi=None, karyawan=KARYAWAN, latensi=0.0):
+        server = apps_script_lokal.buat_server(apps_script_lokal.SheetsLokal(karyawan, absensi), latensi=latensi)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        server_aktif.append(server)
+        return server
+
+    yield buat
+    for server in server_aktif:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def inti(monkeypatch, tmp_path):
+    """
+    absensi_inti dengan mirror di tmp_path. Pengirim outbox dan sinkron latar tidak bangun sendiri
+    selama tes, dan kerja latar cache (rekonsiliasi, muat penuh) dihentikan saat teardown.
+    """
+    kosongkan_singleton()
+    monkeypatch.setattr(absensi_inti, 'MIRROR_PATH', str(tmp_path / 'mirror.sqlite3'))
+    monkeypatch.setattr(absensi_inti, 'OUTBOX_INTERVAL', 3600)
+    monkeypatch.setattr(absensi_inti, 'SINKRON_INTERVAL', 3600)
+    yield absensi_inti
+    kosongkan_singleton()
+
+
+@pytest.fixture
+def hubungkan(inti, monkeypatch):
+    """hubungkan(server): mengarahkan klien Apps Script absensi_inti ke stand-in."""
+    def hubungkan(server):
+        monkeypatch.setattr(inti, 'APPS_SCRIPT_URL', 'http://%s:%d/exec' % server.server_address)
+        inti.get_apps_script_client.cache_clear()
+        return inti.get_apps_script_client()
+    return hubungkan
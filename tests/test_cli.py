@@ -0,0 +1,73 @@
+"""absensi_cli.main terhadap mirror lokal yang sudah disiapkan (tanpa jaringan saat membaca)."""
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import absensi_cli
+from conftest import baris_sheet, kosongkan_singleton
+
+ABSENSI = [
+    baris_sheet(date(2026, 2, 27), 1, 'masuk', 4),
+    baris_sheet(date(2026, 2, 27), 3, 'sakit'),
+    baris_sheet(date(2026, 3, 2), 1, 'masuk', 5),
+    baris_sheet(date(2026, 3, 2), 1, 'izin'),
+    baris_sheet(date(2026, 3, 3), 3, 'masuk', 6),
+]
+
+
+@pytest.fixture
+def mirror_siap(inti, buat_stand_in, hubungkan, monkeypatch):
+    """Mirror berisi karyawan dan absensi stand-in; setelah itu Apps Script tidak bisa dihubungi."""
+    hubungkan(buat_stand_in(ABSENSI))
+    assert absensi_cli.main(['sinkron']) == 0
+    kosongkan_singleton()
+    monkeypatch.setattr(inti, 'APPS_SCRIPT_URL', 'http://127.0.0.1:9/exec')
+    return inti
+
+
+def test_harian_ke_stdout(mirror_siap, capsys):
+    assert absensi_cli.main(['harian', '--dari', '2026-03-01', '--sampai', '2026-03-31']) == 0
+    df = pd.read_csv(io.StringIO(capsys.readouterr().out))
+    assert df.to_dict('records') == [
+        {'Tanggal': '2026-03-02', 'ID_Karyawan': 1, 'Nama_Karyawan': 'Andi', 'Status_Kehadiran': 'izin', 'Produksi': 0},
+        {'Tanggal': '2026-03-03', 'ID_Karyawan': 3, 'Nama_Karyawan': 'Budi', 'Status_Kehadiran': 'masuk', 'Produksi': 6},
+    ]
+
+    assert absensi_cli.main(['harian', '--dari', '2026-02-01', '--sampai', '2026-03-31', '--karyawan', '3']) == 0
+    df = pd.read_csv(io.StringIO(capsys.readouterr().out))
+    assert df[['Tanggal', 'Status_Kehadiran']].values.tolist() == [['2026-02-27', 'sakit'], ['2026-03-03', 'masuk']]
+
+
+def test_rekap_bulanan_satu_berkas_per_bulan(mirror_siap, tmp_path):
+    folder = tmp_path / 'rekap'
+    assert absensi_cli.main(['rekap-bulanan', '--dari', '2026-02', '--sampai', '2026-04', '--output', str(folder)]) == 0
+    assert sorted(p.name for p in folder.iterdir()) == [
+        'rekap_absensi_2026_02.csv', 'rekap_absensi_2026_03.csv', 'rekap_absensi_2026_04.csv']
+
+    maret = pd.read_csv(folder / 'rekap_absensi_2026_03.csv').set_index('ID_Karyawan')
+    assert maret.index.tolist() == [1, 2, 3, 4]
+    assert maret.loc[1, ['Total Produksi', 'masuk', 'izin']].tolist() == [0, 0, 1]
+    assert maret.loc[3, ['Total Produksi', 'masuk']].tolist() == [6, 1]
+    assert maret[['Total Produksi', 'sakit']].sum().tolist() == [6, 0]
+    april = pd.read_csv(folder / 'rekap_absensi_2026_04.csv')
+    assert len(april) == 4 and april['Total Produksi'].sum() == 0
+
+
+def test_mirror_kosong_keluar_dengan_kode_1(inti, capsys):
+    assert absensi_cli.main(['rekap', '--dari', '2026-01-01', '--sampai', '2026-03-31']) == 1
+    captured = capsys.readouterr()
+    assert captured.out == '' and 'belum berisi data' in captured.err
+
+
+@pytest.mark.parametrize('argumen', [
+    ['rekap', '--dari', '2026-03-01', '--sampai', '2026-02-01'],
+    ['harian', '--dari', '2026-03-01', '--sampai', '2026-02-28'],
+    ['rekap-bulanan', '--dari', '2026-03', '--sampai', '2026-02', '--output', 'tidak-dibuat'],
+])
+def test_sampai_sebelum_dari_ditolak(mirror_siap, capsys, tmp_path, monkeypatch, argumen):
+    monkeypatch.chdir(tmp_path)
+    assert absensi_cli.main(argumen) == 1
+    assert '--sampai tidak boleh sebelum --dari' in capsys.readouterr().err
+    assert not (tmp_path / 'tidak-dibuat').exists()
@@ -0,0 +1,40 @@
+"""tulis_ekspor: header/skema dari KOLOM_EKSPOR_*, bukan dari isi potongan pertama."""
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from absensi_inti import KOLOM_EKSPOR_HARIAN, KOLOM_EKSPOR_REKAP_BULANAN, tulis_ekspor
+
+
+def harian(tanggal, nama):
+    return pd.DataFrame({'Tanggal': [tanggal], 'ID_Karyawan': [9], 'Nama_Karyawan': [nama],
+                         'Status_Kehadiran': ['masuk'], 'Produksi': [4]})
+
+
+@pytest.mark.parametrize('potongan', [[], [pd.DataFrame()]])
+def test_xlsx_tanpa_data_berisi_header(potongan):
+    openpyxl = pytest.importorskip('openpyxl')
+    lembar = openpyxl.load_workbook(tulis_ekspor(iter(potongan), 'xlsx', KOLOM_EKSPOR_REKAP_BULANAN)).active
+    assert [list(b) for b in lembar.iter_rows(values_only=True)] == [list(KOLOM_EKSPOR_REKAP_BULANAN)]
+
+
+def test_csv_tanpa_data_berisi_header():
+    assert tulis_ekspor(iter([]), 'csv', KOLOM_EKSPOR_HARIAN).read().decode().strip() == ','.join(KOLOM_EKSPOR_HARIAN)
+
+
+def test_parquet_kolom_null_di_potongan_pertama():
+    pq = pytest.importorskip('pyarrow.parquet')
+    berkas = tulis_ekspor(iter([harian(date(2025, 1, 2), None), harian(date(2025, 2, 3), 'Andi')]), 'parquet', KOLOM_EKSPOR_HARIAN)
+    tabel = pq.read_table(io.BytesIO(berkas.read()))
+    assert tabel.column_names == list(KOLOM_EKSPOR_HARIAN)
+    assert str(tabel.schema.field('Nama_Karyawan').type) == 'string'
+    assert tabel.column('Nama_Karyawan').to_pylist() == [None, 'Andi']
+    assert tabel.column('Tanggal').to_pylist() == [date(2025, 1, 2), date(2025, 2, 3)]
+
+
+def test_parquet_tanpa_data_berisi_skema():
+    pq = pytest.importorskip('pyarrow.parquet')
+    tabel = pq.read_table(io.BytesIO(tulis_ekspor(iter([]), 'parquet', KOLOM_EKSPOR_HARIAN).read()))
+    assert tabel.num_rows == 0 and tabel.column_names == list(KOLOM_EKSPOR_HARIAN)
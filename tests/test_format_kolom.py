@@ -0,0 +1,91 @@
+"""GET Absensi Harian format kolom (gzip+base64) dan fallback ke JSON baris untuk deployment lama."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from apps_script_lokal import SHEET_ABSENSI
+from conftest import baris_sheet, final_cache
+
+ABSENSI = [
+    baris_sheet(date(2026, 3, 2), 1, 'masuk', 5),
+    baris_sheet(date(2026, 3, 2), 2, 'sakit'),
+    # Nilai mentah seperti yang diketik di Sheets: angka sebagai teks, status kapital
+    {**baris_sheet(date(2026, 3, 3), 3, 'masuk'), 'Produksi': '12', 'Status_Kehadiran': ' Masuk '},
+    {k: v for k, v in baris_sheet(date(2026, 3, 3), 4, '1/2 hari').items() if k != 'Produksi'},
+]
+
+
+@pytest.fixture
+def stand_in(inti, buat_stand_in, hubungkan):
+    """Pabrik stand_in(abaikan_format=False) -> (server, daftar (params, balasan mentah) GET Absensi Harian)."""
+    def buat(abaikan_format=False):
+        server = buat_stand_in(ABSENSI)
+        get_asli, balasan = server.sheets.get, []
+
+        def get(sheet, params):
+            if sheet == SHEET_ABSENSI and abaikan_format:
+                params = {k: v for k, v in params.items() if k != 'format'}
+            result = get_asli(sheet, params)
+            if sheet == SHEET_ABSENSI:
+                balasan.append((dict(params), result))
+            return result
+
+        server.sheets.get = get
+        hubungkan(server)
+        return server, balasan
+    return buat
+
+
+def test_format_kolom_didekode_tanpa_kehilangan_nilai(inti, stand_in):
+    _, balasan = stand_in()
+    result = inti.get_data_from_sheets(SHEET_ABSENSI, params=inti.params_absensi(), hasil_lengkap=True)
+
+    params, mentah = balasan[-1]
+    assert params['format'] == 'kolom' and mentah['format'] == inti.FORMAT_KOLOM and 'data' not in mentah
+    assert isinstance(result['data'], inti.BarisKolom)
+    assert list(result['data']) == ABSENSI
+
+
+def test_format_kolom_dan_baris_menghasilkan_frame_yang_sama(inti, stand_in):
+    stand_in()
+    kolom = inti.get_data_from_sheets(SHEET_ABSENSI, params=inti.params_absensi())
+    baris = inti.get_data_from_sheets(SHEET_ABSENSI)
+    assert isinstance(baris, list)
+
+    df_kolom, df_baris = inti.normalisasi_absensi(kolom), inti.normalisasi_absensi(baris)
+    pd.testing.assert_frame_equal(df_kolom, df_baris)
+    assert df_kolom.dtypes.astype(str).to_dict() == {
+        'Hari': 'int32', 'ID_Karyawan': 'int32', 'Status_Kehadiran': 'category', 'Produksi': 'int32'}
+    assert df_kolom['Status_Kehadiran'].astype(str).tolist() == ['masuk', 'sakit', 'masuk', '1/2 hari']
+    assert df_kolom['Produksi'].tolist() == [5, 0, 12, 0]
+
+
+def test_delta_format_kolom_membawa_watermark(inti, stand_in):
+    stand_in()
+    result = inti.get_data_from_sheets(SHEET_ABSENSI, params=inti.params_absensi(offset=2), hasil_lengkap=True)
+    assert (result['offset'], result['total'], result['anchor']) == (2, len(ABSENSI), ABSENSI[1])
+    assert list(result['data']) == ABSENSI[2:]
+
+
+@pytest.mark.parametrize('abaikan_format', [False, True], ids=['kolom', 'baris'])
+def test_sinkron_penuh_dan_delta(inti, stand_in, abaikan_format):
+    server, balasan = stand_in(abaikan_format)
+    cache = inti.get_absensi_cache()
+    assert cache.sinkron()
+    server.sheets.sheets[SHEET_ABSENSI].append(baris_sheet(date(2026, 3, 4), 1, 'izin'))
+    assert cache.sinkron()
+
+    assert all(('format' in mentah) != abaikan_format for _, mentah in balasan)
+    assert [p.get('offset') for p, _ in balasan] == [None, str(len(ABSENSI))]
+    assert cache.offset == len(ABSENSI) + 1
+    assert final_cache(cache) == {
+        (date(2026, 3, 2), 1): ('masuk', 5), (date(2026, 3, 2), 2): ('sakit', 0),
+        (date(2026, 3, 3), 3): ('masuk', 12), (date(2026, 3, 3), 4): ('1/2 hari', 0),
+        (date(2026, 3, 4), 1): ('izin', 0),
+    }
+
+
+def test_format_kolom_bisa_dimatikan(inti, monkeypatch):
+    monkeypatch.setattr(inti, 'FORMAT_KOLOM_AKTIF', False)
+    assert inti.params_absensi(offset=3) == {'offset': 3}
@@ -0,0 +1,43 @@
+"""Validasi impor massal terhadap master karyawan dengan nama ganda (Budi = ID 2 dan 3)."""
+import pandas as pd
+
+from absensi_inti import validasi_impor
+from conftest import KARYAWAN
+
+NAMA_PER_ID = {k['ID_Karyawan']: k['Nama_Karyawan'] for k in KARYAWAN}
+
+
+def validasi(*baris):
+    df = pd.DataFrame(
+        [dict(Tanggal='2025-03-03', Status_Kehadiran='masuk', Produksi='5', **b) for b in baris])
+    df['Baris'] = range(2, 2 + len(df))
+    return validasi_impor(df, NAMA_PER_ID)
+
+
+def test_id_karyawan_kedua_dengan_nama_sama_diterima():
+    df_valid, df_galat = validasi(
+        {'ID_Karyawan': '3', 'Nama_Karyawan': 'Budi'},
+        {'ID_Karyawan': '3', 'Nama_Karyawan': ''},
+        {'ID_Karyawan': '2', 'Nama_Karyawan': 'budi'},
+    )
+    assert df_galat.empty
+    assert df_valid['ID_Karyawan'].tolist() == [3, 3, 2]
+
+
+def test_nama_ganda_tanpa_id_ditandai_ambigu():
+    df_valid, df_galat = validasi(
+        {'ID_Karyawan': '', 'Nama_Karyawan': 'Budi'},
+        {'ID_Karyawan': '', 'Nama_Karyawan': 'Citra'},
+    )
+    assert df_valid['ID_Karyawan'].tolist() == [4]
+    assert df_galat.to_dict('records') == [{'Baris': 2, 'Alasan': 'Nama karyawan tidak unik (isi ID_Karyawan)'}]
+
+
+def test_id_tidak_dikenal_dan_nama_tidak_cocok():
+    _, df_galat = validasi(
+        {'ID_Karyawan': '9', 'Nama_Karyawan': ''},
+        {'ID_Karyawan': '3', 'Nama_Karyawan': 'Andi'},
+        {'ID_Karyawan': '', 'Nama_Karyawan': 'Dewi'},
+    )
+    assert df_galat['Alasan'].tolist() == [
+        'ID karyawan tidak dikenal', 'ID dan nama karyawan tidak cocok', 'Nama karyawan tidak dikenal']
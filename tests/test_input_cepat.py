@@ -0,0 +1,39 @@
+"""Payload simpan input cepat (absensi.py) untuk status Sheets di luar STATUS_ABSENSI."""
+import importlib
+import sys
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def absensi(buat_stand_in, hubungkan):
+    """Modul UI absensi.py (mode bare Streamlit) yang terhubung ke stand-in kosong."""
+    hubungkan(buat_stand_in())
+    sys.modules.pop('absensi', None)
+    modul = importlib.import_module('absensi')
+    yield modul
+    sys.modules.pop('absensi', None)
+
+
+def data_awal(absensi, status, produksi):
+    df = pd.DataFrame({'ID_Karyawan': [1, 2, 3], 'Nama_Karyawan': ['Andi', 'Budi', 'Budi'],
+                       'Status_Awal': status, 'Produksi_Awal': produksi})
+    grid = absensi.GridInputCepat(df['ID_Karyawan'], absensi.kode_status(df['Status_Awal']), df['Produksi_Awal'])
+    return df, grid
+
+
+def test_edit_produksi_mempertahankan_status_tidak_dikenal(absensi):
+    df, grid = data_awal(absensi, ['cuti', 'masuk', '__NEW_ENTRY__'], [0, 5, 0])
+    assert grid.kode[0] == absensi.KODE_STATUS_LAIN
+    grid.atur_produksi(1, 7)
+    assert absensi.perubahan_input_cepat(df, grid) == [
+        {'id_karyawan': 1, 'status': 'cuti', 'produksi': 7},
+        {'id_karyawan': 3, 'status': 'kosong', 'produksi': 0},
+    ]
+
+
+def test_status_tidak_dikenal_bisa_diganti(absensi):
+    df, grid = data_awal(absensi, ['cuti', 'masuk', 'masuk'], [0, 5, 5])
+    grid.atur_status(1, 'sakit')
+    assert absensi.perubahan_input_cepat(df, grid) == [{'id_karyawan': 1, 'status': 'sakit', 'produksi': 0}]
@@ -0,0 +1,80 @@
+"""Kompaksi log Absensi Harian lewat stand-in: periode tertutup diringkas, periode terbuka utuh."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from apps_script_lokal import SHEET_ABSENSI, SHEET_ARSIP, tanggal_wib
+from conftest import baris_sheet
+
+BATAS = date(2026, 1, 31)
+ABSENSI = [
+    # Periode tertutup (Januari): koreksi di hari yang sama, baris terakhir yang final
+    baris_sheet(date(2026, 1, 5), 1, 'masuk', 5),
+    baris_sheet(date(2026, 1, 5), 2, 'alpha'),
+    baris_sheet(date(2026, 1, 5), 1, 'izin'),
+    baris_sheet(date(2026, 1, 6), 3, 'masuk', 3),
+    baris_sheet(date(2026, 1, 5), 1, 'masuk', 8),
+    baris_sheet(date(2026, 1, 31), 4, 'sakit'),
+    # Periode terbuka (Februari): tidak boleh disentuh, termasuk koreksinya
+    baris_sheet(date(2026, 2, 1), 4, 'masuk', 2),
+    baris_sheet(date(2026, 2, 2), 2, 'masuk', 6),
+    baris_sheet(date(2026, 2, 2), 2, '1/2 hari', 3),
+    baris_sheet(date(2026, 1, 6), 3, 'libur'),
+]
+
+
+@pytest.fixture
+def termuat(inti, buat_stand_in, hubungkan):
+    """(cache yang sudah sinkron penuh, isi sheet stand-in)."""
+    server = buat_stand_in(ABSENSI)
+    hubungkan(server)
+    cache = inti.get_absensi_cache()
+    assert cache.sinkron() and cache.termuat
+    return cache, server.sheets.sheets
+
+
+def potret(cache):
+    """Data harian final dan rekap bulanan yang dilihat aplikasi."""
+    harian = cache.query_harian(date(2026, 1, 1), date(2026, 2, 28)).sort_values(['Tanggal', 'ID_Karyawan'], ignore_index=True)
+    rekap = [cache.rekap_bulan(2026, bulan).sort_index().sort_index(axis=1) for bulan in (1, 2)]
+    return harian, rekap
+
+
+def test_kompaksi_menyisakan_baris_final_per_periode_tertutup(inti, termuat):
+    cache, sheets = termuat
+    harian_awal, rekap_awal = potret(cache)
+
+    hasil = inti.kompaksi_absensi(BATAS)
+
+    tertutup = [r for r in ABSENSI if tanggal_wib(r['Tanggal']) <= BATAS]
+    final = {}
+    for row in tertutup:
+        final[(row['ID_Karyawan'], row['Tanggal'])] = row
+    sisa_tertutup = [r for r in sheets[SHEET_ABSENSI] if tanggal_wib(r['Tanggal']) <= BATAS]
+    assert sorted(map(str, sisa_tertutup)) == sorted(map(str, final.values()))
+    assert len(sheets[SHEET_ARSIP]) == len(tertutup) - len(final) == hasil['diarsipkan']
+    assert [r for r in sheets[SHEET_ABSENSI] if tanggal_wib(r['Tanggal']) > BATAS] == \
+        [r for r in ABSENSI if tanggal_wib(r['Tanggal']) > BATAS]
+    assert (hasil['sebelum'], hasil['sesudah']) == (len(ABSENSI), len(sheets[SHEET_ABSENSI]))
+
+    # Sheet yang sudah dibaca sama persis: cukup watermark yang digeser, hasil query tidak berubah
+    assert cache.offset == len(sheets[SHEET_ABSENSI])
+    harian, rekap = potret(cache)
+    pd.testing.assert_frame_equal(harian, harian_awal)
+    for df, df_awal in zip(rekap, rekap_awal):
+        pd.testing.assert_frame_equal(df, df_awal)
+
+
+def test_kompaksi_dengan_baris_belum_terbaca_memuat_ulang(inti, termuat, monkeypatch):
+    cache, sheets = termuat
+    # Baris yang masuk antara sinkron awal dan kompaksi: sinkron delta dilewati agar belum terbaca
+    sheets[SHEET_ABSENSI].append(baris_sheet(date(2026, 1, 6), 3, 'sakit'))
+    sinkron = cache.sinkron
+    monkeypatch.setattr(cache, 'sinkron', lambda penuh=False: sinkron(penuh) if penuh else True)
+
+    inti.kompaksi_absensi(BATAS)
+
+    assert cache.offset == len(sheets[SHEET_ABSENSI])
+    assert cache.mirror.final(3, date(2026, 1, 6)) == ('sakit', 0)
+    assert cache.rekap_bulan(2026, 1).loc[3, 'sakit'] == 1
@@ -0,0 +1,98 @@
+"""Penulisan absensi ke stand-in: satu simpan harus menghasilkan tepat satu baris, walau server lambat."""
+import time
+from datetime import date
+
+import pytest
+
+TANGGAL = date(2026, 3, 2)
+ROWS = [{'id_karyawan': 1, 'status': 'masuk', 'produksi': 5}, {'id_karyawan': 2, 'status': 'izin', 'produksi': 0}]
+
+
+def jumlah_baris(server):
+    return len(server.sheets.sheets['Absensi Harian'])
+
+
+@pytest.fixture
+def server_lambat(buat_stand_in, hubungkan):
+    """Stand-in yang membalas setelah 0.5 detik, dengan timeout baca klien 0.3 detik."""
+    server = buat_stand_in(latensi=0.5)
+    hubungkan(server).timeout = (5, 0.3)
+    return server
+
+
+def test_batch_satu_post_dengan_hasil_per_baris(inti, buat_stand_in, hubungkan):
+    server = buat_stand_in()
+    post_asli, permintaan = server.sheets.post, []
+    server.sheets.post = lambda sheet, params, payload: permintaan.append(params) or post_asli(sheet, params, payload)
+    hubungkan(server)
+    cache = inti.get_absensi_cache()
+    assert cache.sinkron()
+
+    hasil = inti.kirim_absensi_batch(TANGGAL, ROWS + [{'id_karyawan': 99, 'status': 'masuk', 'produksi': 1}])
+
+    assert [p.get('action') for p in permintaan] == ['batch']
+    assert [(h['id_karyawan'], h['ok']) for h in hasil] == [(1, True), (2, True), (99, False)]
+    assert 'tidak ditemukan' in hasil[2]['message']
+    assert jumlah_baris(server) == len(ROWS)
+    # Write-through: langsung terbaca dan bersambung dengan watermark tanpa sinkron ulang
+    df = cache.query_harian(TANGGAL, TANGGAL)
+    assert sorted(zip(df['ID_Karyawan'], df['Status_Kehadiran'].astype(str), df['Produksi'])) == [(1, 'masuk', 5), (2, 'izin', 0)]
+    assert cache.offset == len(ROWS) and cache.lokal == []
+
+
+def test_hentikan_membatalkan_rekonsiliasi(inti, buat_stand_in, hubungkan):
+    server = buat_stand_in()
+    get_asli, permintaan = server.sheets.get, []
+    server.sheets.get = lambda sheet, params: permintaan.append(params) or get_asli(sheet, params)
+    hubungkan(server)
+    cache = inti.get_absensi_cache()
+    assert cache.sinkron()
+    inti.kirim_absensi_batch(TANGGAL, ROWS)
+    timer = cache._timer
+    assert timer is not None
+
+    cache.hentikan()
+    timer.join(1)
+    assert not timer.is_alive() and cache._timer is None
+    # Setelah dihentikan tidak ada rekonsiliasi baru yang dijadwalkan
+    cache.jadwalkan_rekonsiliasi(jeda=0.01)
+    jumlah = len(permintaan)
+    time.sleep(0.1)
+    assert cache._timer is None and len(permintaan) == jumlah
+
+
+def test_batch_tidak_diulang_setelah_timeout_baca(inti, server_lambat):
+    with pytest.raises(inti.AppsScriptError) as e:
+        inti.kirim_absensi_batch(TANGGAL, ROWS)
+    assert e.value.sementara
+    time.sleep(0.6)
+    assert jumlah_baris(server_lambat) == len(ROWS)
+
+
+def test_post_satuan_tidak_diulang_setelah_timeout_baca(inti, server_lambat):
+    hasil = inti.input_absensi_konkuren(TANGGAL, ROWS)
+    assert [h['ok'] for h in hasil] == [False, False]
+    assert all(h['sementara'] for h in hasil)
+    time.sleep(0.6)
+    assert jumlah_baris(server_lambat) == len(ROWS)
+
+
+def test_outbox_kirim_ulang_memakai_kunci_yang_sama(inti, server_lambat):
+    outbox = inti.get_outbox()
+    outbox.antrekan(TANGGAL, ROWS)
+    pengirim = inti.mulai_pengirim_outbox()
+
+    # Percobaan pertama: baris tertulis di server, tetapi balasannya terlambat
+    assert not pengirim.kirim_sekali()
+    assert set(outbox.entri()['keadaan']) == {'pending'}
+    time.sleep(0.6)
+    assert jumlah_baris(server_lambat) == len(ROWS)
+
+    # Percobaan ulang (tanpa menunggu backoff) dengan server yang sempat membalas
+    inti.get_apps_script_client().timeout = (5, 5)
+    with outbox.lock, outbox.conn:
+        outbox.conn.execute('UPDATE outbox SET coba_lagi = 0')
+    assert pengirim.kirim_sekali()
+    assert outbox.entri().empty
+    assert jumlah_baris(server_lambat) == len(ROWS)
+    assert inti.get_absensi_cache().query_harian(TANGGAL, TANGGAL)['Status_Kehadiran'].astype(str).tolist() == ['masuk', 'izin']
@@ -0,0 +1,104 @@
+"""Rekap rentang (hitung_rekap_rentang/potongan_rekap) di batas periode, dan kesepakatannya dengan rekap bulanan."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from conftest import baris_sheet, final_sheet
+
+ABSENSI = [
+    baris_sheet(date(2025, 11, 28), 1, 'masuk', 4),
+    baris_sheet(date(2025, 12, 19), 1, 'masuk', 5),
+    baris_sheet(date(2025, 12, 20), 2, 'sakit'),
+    baris_sheet(date(2025, 12, 31), 1, 'masuk', 7),
+    baris_sheet(date(2026, 1, 1), 1, 'libur'),
+    baris_sheet(date(2026, 1, 14), 2, 'masuk', 3),
+    baris_sheet(date(2026, 1, 15), 2, 'izin'),
+    baris_sheet(date(2026, 1, 31), 4, '1/2 hari', 2),
+    baris_sheet(date(2026, 3, 10), 1, 'masuk', 6),
+    baris_sheet(date(2026, 3, 11), 1, 'alpha'),
+    baris_sheet(date(2026, 3, 31), 3, 'masuk', 8),
+    baris_sheet(date(2026, 4, 1), 3, 'masuk', 9),
+    baris_sheet(date(2026, 4, 5), 2, 'sakit'),
+    baris_sheet(date(2026, 4, 6), 2, 'masuk', 1),
+    # Koreksi hari yang sama: baris terakhir yang dihitung
+    baris_sheet(date(2026, 1, 14), 2, 'alpha'),
+]
+
+
+@pytest.fixture
+def rekap(inti, buat_stand_in, hubungkan):
+    """(cache tersinkron, master karyawan index ID_Karyawan, nama_per_id)."""
+    hubungkan(buat_stand_in(ABSENSI))
+    cache = inti.get_absensi_cache()
+    assert cache.sinkron()
+    _, df_k, nama_per_id, _ = inti.get_master_karyawan().snapshot()
+    return cache, df_k, nama_per_id
+
+
+def rekap_harapan(inti, dari, sampai, freq, nama_per_id):
+    """Rekap rentang yang dihitung langsung dari baris sheet final, hanya hari di [dari, sampai]."""
+    jumlah = {}
+    for (tanggal, id_karyawan), (status, produksi) in final_sheet(ABSENSI).items():
+        if dari <= tanggal <= sampai:
+            baris = jumlah.setdefault((str(pd.Period(tanggal, freq)), id_karyawan), dict.fromkeys(inti.STATUS_ABSENSI, 0))
+            baris[status] += 1
+            baris['Total Produksi'] = baris.get('Total Produksi', 0) + produksi
+    rows = []
+    for periode in pd.period_range(dari, sampai, freq=freq).astype(str):
+        for id_karyawan in sorted(nama_per_id):
+            baris = jumlah.get((periode, id_karyawan), {})
+            rows.append({'Periode': periode, 'ID_Karyawan': id_karyawan, 'Nama_Karyawan': nama_per_id[id_karyawan],
+                         'Total Produksi': baris.get('Total Produksi', 0),
+                         **{status: baris.get(status, 0) for status in inti.STATUS_ABSENSI}})
+    return pd.DataFrame(rows, columns=inti.KOLOM_REKAP_RENTANG).astype(
+        {k: 'int64' for k in inti.KOLOM_REKAP_RENTANG if k not in ('Periode', 'Nama_Karyawan')})
+
+
+@pytest.mark.parametrize('per, dari, sampai, periode', [
+    # Awal dan akhir di tengah bulan: hari di luar rentang tidak ikut walau sebulan
+    ('bulan', date(2026, 1, 15), date(2026, 3, 10), ['2026-01', '2026-02', '2026-03']),
+    # Melintasi batas tahun dan kuartal
+    ('kuartal', date(2025, 12, 20), date(2026, 4, 5), ['2025Q4', '2026Q1', '2026Q2']),
+    ('tahun', date(2025, 11, 29), date(2026, 1, 1), ['2025', '2026']),
+    ('bulan', date(2025, 12, 31), date(2025, 12, 31), ['2025-12']),
+])
+def test_rekap_rentang_di_batas_periode(inti, rekap, per, dari, sampai, periode):
+    cache, _, nama_per_id = rekap
+    freq = inti.PERIODE_REKAP[per][0]
+    ids = sorted(nama_per_id)
+    harapan = rekap_harapan(inti, dari, sampai, freq, nama_per_id)
+    assert harapan['Periode'].unique().tolist() == periode
+
+    utuh = inti.hitung_rekap_rentang(cache.query_harian(dari, sampai), dari, sampai, freq, ids, nama_per_id)
+    pd.testing.assert_frame_equal(utuh, harapan)
+
+    # Ekspor per potongan periode memberi hasil yang sama dengan satu kali hitung untuk seluruh rentang
+    potongan = list(inti.potongan_rekap(cache, ids, nama_per_id, dari, sampai, per))
+    assert len(potongan) == len(periode)
+    pd.testing.assert_frame_equal(pd.concat(potongan, ignore_index=True), harapan)
+
+
+@pytest.mark.parametrize('tahun, bulan', [(2025, 12), (2026, 1), (2026, 2), (2026, 3)])
+def test_rekap_rentang_sama_dengan_rekap_bulanan(inti, rekap, tahun, bulan):
+    cache, df_k, nama_per_id = rekap
+    awal = date(tahun, bulan, 1)
+    akhir = pd.Period(awal, 'M').end_time.date()
+
+    bulanan = inti.hitung_rekap_bulanan(cache, df_k, tahun, bulan)
+    rentang = inti.hitung_rekap_rentang(cache.query_harian(awal, akhir), awal, akhir, 'M', df_k.index, nama_per_id)
+
+    assert (rentang['Periode'] == f'{tahun}-{bulan:02d}').all()
+    # Nilai dan dtype (termasuk ID_Karyawan) sama, sehingga kedua skema ekspor menulis kolom yang sama
+    pd.testing.assert_frame_equal(rentang.drop(columns='Periode'), bulanan)
+    assert rentang['ID_Karyawan'].dtype == bulanan['ID_Karyawan'].dtype == inti.DTYPE_ID_REKAP
+
+
+def test_dtype_id_tidak_bergantung_pada_master(inti, rekap):
+    cache, df_k, nama_per_id = rekap
+    dari, sampai = date(2026, 2, 1), date(2026, 2, 28)
+    df_k32 = df_k.set_axis(df_k.index.astype('int32'))
+    for ids in (df_k32.index, []):
+        rentang = inti.hitung_rekap_rentang(cache.query_harian(dari, sampai), dari, sampai, 'M', ids, nama_per_id)
+        assert rentang['ID_Karyawan'].dtype == inti.DTYPE_ID_REKAP
+    assert inti.hitung_rekap_bulanan(cache, df_k32, 2026, 2)['ID_Karyawan'].dtype == inti.DTYPE_ID_REKAP
@@ -0,0 +1,134 @@
+"""Rollup rekap_bulanan yang dipelihara inkremental harus sama dengan hitung ulang penuh dari status final."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from apps_script_lokal import SHEET_ABSENSI
+from conftest import baris_sheet, final_sheet
+
+BULAN = [(2026, 1), (2026, 2), (2026, 3)]
+
+AWAL = [
+    baris_sheet(date(2026, 1, 15), 1, 'masuk', 4),
+    baris_sheet(date(2026, 1, 15), 2, 'masuk', 3),
+    baris_sheet(date(2026, 1, 20), 3, 'izin'),
+    baris_sheet(date(2026, 1, 31), 1, 'masuk', 5),
+    baris_sheet(date(2026, 1, 31), 2, 'sakit'),
+]
+
+# Koreksi hari yang sama: status berubah, hanya produksi berubah, dan dua koreksi satu kunci dalam satu delta
+KOREKSI = [
+    baris_sheet(date(2026, 1, 31), 1, 'sakit'),
+    baris_sheet(date(2026, 1, 15), 2, 'masuk', 7),
+    baris_sheet(date(2026, 1, 20), 3, 'alpha'),
+    baris_sheet(date(2026, 1, 20), 3, 'masuk', 2),
+]
+
+# Delta yang melintasi batas bulan, termasuk koreksi bulan lalu yang datang setelah baris bulan baru
+LINTAS_BULAN = [
+    baris_sheet(date(2026, 1, 31), 4, 'masuk', 6),
+    baris_sheet(date(2026, 2, 1), 1, 'masuk', 8),
+    baris_sheet(date(2026, 2, 1), 2, '1/2 hari', 1),
+    baris_sheet(date(2026, 1, 15), 2, 'libur'),
+    baris_sheet(date(2026, 2, 28), 3, 'masuk', 4),
+    baris_sheet(date(2026, 3, 1), 3, 'sakit'),
+    baris_sheet(date(2026, 2, 1), 1, 'izin'),
+]
+
+
+def rekap_penuh(final, tahun, bulan):
+    """{ID: {status: jumlah, 'Total Produksi': n}} dihitung ulang dari {(tanggal, ID): (status, produksi)}."""
+    rekap = {}
+    for (tanggal, id_karyawan), (status, produksi) in final.items():
+        if (tanggal.year, tanggal.month) == (tahun, bulan):
+            entri = rekap.setdefault(id_karyawan, {'Total Produksi': 0})
+            entri[status] = entri.get(status, 0) + 1
+            entri['Total Produksi'] += produksi
+    return bersihkan(rekap)
+
+
+def bersihkan(rekap):
+    """Nilai nol (sisa koreksi di rollup, atau kolom kosong setelah DataFrame) tidak dibandingkan."""
+    return {int(i): {k: int(v) for k, v in entri.items() if not pd.isna(v) and v != 0} for i, entri in rekap.items()}
+
+
+def rekap_cache(cache, tahun, bulan):
+    return {i: e for i, e in bersihkan(cache.rekap_bulan(tahun, bulan).to_dict(orient='index')).items() if e}
+
+
+@pytest.fixture
+def delta(inti, buat_stand_in, hubungkan, monkeypatch):
+    """
+    Cache yang dimuat penuh dari AWAL; sinkron(rows) menambah `rows` ke sheet lalu menjalankan
+    sinkron delta (dipastikan tidak memuat ulang seluruh sheet). Mengembalikan (cache, server, sinkron).
+    """
+    server = buat_stand_in(AWAL)
+    hubungkan(server)
+    cache = inti.get_absensi_cache()
+    assert cache.sinkron()
+    monkeypatch.setattr(cache.mirror, 'ganti_absensi', lambda rows: pytest.fail('sinkron delta memuat penuh'))
+
+    def sinkron(rows):
+        server.sheets.sheets[SHEET_ABSENSI].extend(rows)
+        assert cache.sinkron()
+        assert cache.offset == len(server.sheets.sheets[SHEET_ABSENSI])
+
+    return cache, server, sinkron
+
+
+def cocokkan(inti, cache, server, tmp_path, nama):
+    """Rollup cache sama dengan hitung ulang dari baris sheet, dan dengan mirror baru yang dibangun penuh."""
+    rows = list(server.sheets.sheets[SHEET_ABSENSI])
+    penuh = inti.MirrorLokal(str(tmp_path / f'{nama}.sqlite3'))
+    penuh.ganti_absensi(rows)
+    for tahun, bulan in BULAN:
+        harapan = rekap_penuh(final_sheet(rows), tahun, bulan)
+        assert rekap_cache(cache, tahun, bulan) == harapan, (tahun, bulan)
+        assert bersihkan(cache.mirror.rekap_bulan(tahun, bulan)) == bersihkan(penuh.rekap_bulan(tahun, bulan))
+    penuh.conn.close()
+
+
+def test_rollup_setelah_koreksi_hari_yang_sama(inti, delta, tmp_path):
+    cache, server, sinkron = delta
+    sinkron(KOREKSI)
+    cocokkan(inti, cache, server, tmp_path, 'koreksi')
+    assert rekap_cache(cache, 2026, 1)[3] == {'masuk': 1, 'Total Produksi': 2}
+
+
+def test_rollup_setelah_delta_lintas_bulan(inti, delta, tmp_path):
+    cache, server, sinkron = delta
+    sinkron(KOREKSI)
+    sinkron(LINTAS_BULAN)
+    cocokkan(inti, cache, server, tmp_path, 'lintas-bulan')
+    assert rekap_cache(cache, 2026, 2)[1] == {'izin': 1}
+    assert rekap_cache(cache, 2026, 3) == {3: {'sakit': 1}}
+
+
+def test_rollup_dengan_outbox_tertunda(inti, delta, tmp_path):
+    cache, server, sinkron = delta
+    sinkron(KOREKSI)
+    outbox = inti.get_outbox()
+    outbox.antrekan(date(2026, 1, 31), [{'id_karyawan': 1, 'status': 'masuk', 'produksi': 9},
+                                        {'id_karyawan': 4, 'status': 'sakit', 'produksi': 0}])
+    outbox.antrekan(date(2026, 2, 1), [{'id_karyawan': 2, 'status': 'masuk', 'produksi': 3}])
+    # Simpan ulang sebelum terkirim: entri pending lama untuk karyawan yang sama diganti
+    outbox.antrekan(date(2026, 1, 31), [{'id_karyawan': 1, 'status': 'izin', 'produksi': 0}])
+
+    # Entri outbox menimpa status final mirror di rekap, seperti di query_harian
+    tertunda = [baris_sheet(r['Tanggal'], r['ID_Karyawan'], r['Status_Kehadiran'], r['Produksi'])
+                for r in outbox.baris_tertunda()]
+    final = final_sheet(list(server.sheets.sheets[SHEET_ABSENSI]) + tertunda)
+    for tahun, bulan in BULAN:
+        assert rekap_cache(cache, tahun, bulan) == rekap_penuh(final, tahun, bulan), (tahun, bulan)
+    assert rekap_cache(cache, 2026, 1)[1] == {'masuk': 1, 'izin': 1, 'Total Produksi': 4}
+
+    # Setelah outbox terkirim dan tersinkron, rollup mirror sendiri memberi hasil yang sama
+    pengirim = inti.mulai_pengirim_outbox()
+    while pengirim.kirim_sekali():
+        pass
+    assert outbox.entri().empty
+    assert cache.sinkron()
+    for tahun, bulan in BULAN:
+        assert rekap_cache(cache, tahun, bulan) == rekap_penuh(final, tahun, bulan), (tahun, bulan)
+    cocokkan(inti, cache, server, tmp_path, 'outbox')
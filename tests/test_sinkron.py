@@ -0,0 +1,136 @@
+"""Sinkron delta Absensi Harian: watermark `offset`/`anchor` dan kapan harus memuat penuh."""
+from datetime import date
+
+import pytest
+
+from apps_script_lokal import SHEET_ABSENSI
+from conftest import baris_sheet, final_cache, final_sheet
+
+ABSENSI = [
+    baris_sheet(date(2026, 3, 2), 1, 'masuk', 5),
+    baris_sheet(date(2026, 3, 2), 2, 'sakit'),
+    baris_sheet(date(2026, 3, 3), 1, 'izin'),
+    baris_sheet(date(2026, 3, 3), 2, 'masuk', 6),
+]
+
+
+@pytest.fixture
+def tersinkron(inti, buat_stand_in, hubungkan):
+    """(cache yang sudah dimuat penuh, server, daftar parameter GET Absensi Harian setelah muat awal)."""
+    server = buat_stand_in(ABSENSI)
+    get_asli, permintaan = server.sheets.get, []
+
+    def get(sheet, params):
+        if sheet == SHEET_ABSENSI:
+            permintaan.append(dict(params))
+        return get_asli(sheet, params)
+
+    server.sheets.get = get
+    hubungkan(server)
+    cache = inti.get_absensi_cache()
+    assert cache.sinkron() and cache.offset == len(ABSENSI)
+    permintaan.clear()
+    return cache, server, permintaan
+
+
+def sheet(server):
+    return server.sheets.sheets[SHEET_ABSENSI]
+
+
+def muat_penuh(permintaan):
+    return any('offset' not in p for p in permintaan)
+
+
+def test_delta_hanya_mengambil_baris_baru(tersinkron):
+    cache, server, permintaan = tersinkron
+    sheet(server).extend([baris_sheet(date(2026, 3, 4), 1, 'masuk', 7), baris_sheet(date(2026, 3, 2), 2, 'izin')])
+
+    assert cache.sinkron()
+    assert [p.get('offset') for p in permintaan] == [str(len(ABSENSI))]
+    assert cache.offset == len(sheet(server))
+    assert final_cache(cache) == final_sheet(sheet(server))
+
+
+def test_anchor_tidak_cocok_memuat_penuh(tersinkron):
+    cache, server, permintaan = tersinkron
+    # Baris terakhir yang sudah diterapkan diedit langsung di Sheets
+    sheet(server)[-1] = baris_sheet(date(2026, 3, 3), 2, 'alpha')
+    sheet(server).append(baris_sheet(date(2026, 3, 4), 1, 'masuk', 7))
+
+    assert cache.sinkron()
+    assert muat_penuh(permintaan)
+    assert cache.offset == len(sheet(server))
+    assert final_cache(cache) == final_sheet(sheet(server))
+
+
+def test_total_kurang_dari_offset_memuat_penuh(tersinkron):
+    cache, server, permintaan = tersinkron
+    del sheet(server)[2:]
+
+    assert cache.sinkron()
+    assert muat_penuh(permintaan)
+    assert cache.offset == 2
+    assert final_cache(cache) == final_sheet(ABSENSI[:2])
+
+
+def test_offset_string_tetap_delta(tersinkron):
+    cache, server, permintaan = tersinkron
+    get = server.sheets.get
+
+    def get_string(sheet_name, params):
+        # Seperti Apps Script yang mengembalikan e.parameter.offset tanpa parseInt
+        result = get(sheet_name, params)
+        if 'offset' in result:
+            result['offset'], result['total'] = str(result['offset']), str(result['total'])
+        return result
+
+    server.sheets.get = get_string
+    sheet(server).append(baris_sheet(date(2026, 3, 4), 1, 'masuk', 7))
+
+    assert cache.sinkron()
+    assert not muat_penuh(permintaan)
+    assert cache.offset == len(sheet(server))
+    assert final_cache(cache) == final_sheet(sheet(server))
+
+
+def test_offset_balasan_lain_tidak_menimpa_mirror(tersinkron):
+    cache, server, permintaan = tersinkron
+    get = server.sheets.get
+
+    def get_salah(sheet_name, params):
+        # Balasan delta untuk watermark lain: datanya hanya potongan sheet
+        if 'offset' in params:
+            params = {**params, 'offset': '3'}
+        return get(sheet_name, params)
+
+    server.sheets.get = get_salah
+    sheet(server).append(baris_sheet(date(2026, 3, 4), 1, 'masuk', 7))
+
+    assert cache.sinkron()
+    assert muat_penuh(permintaan)
+    assert cache.offset == len(sheet(server))
+    assert final_cache(cache) == final_sheet(sheet(server))
+
+
+def test_versi_hanya_naik_jika_data_berubah(tersinkron):
+    cache, server, _ = tersinkron
+    stempel = cache.stempel()
+    assert cache.sinkron() and cache.sinkron()
+    assert cache.stempel() == stempel
+
+    sheet(server).append(baris_sheet(date(2026, 3, 4), 1, 'masuk', 7))
+    assert cache.sinkron()
+    assert cache.stempel() != stempel
+
+    # Baris lokal tanpa index yang kini tercakup mirror dibuang: isi bisa berubah, versi naik
+    stempel = cache.stempel()
+    baris = baris_sheet(date(2026, 3, 5), 2, 'izin')
+    cache.terapkan_tulis([(baris, None)])
+    sheet(server).append(baris)
+    stempel_tulis = cache.stempel()
+    assert stempel_tulis != stempel
+    assert cache.sinkron() and cache.lokal == []
+    stempel_sinkron = cache.stempel()
+    assert stempel_sinkron != stempel_tulis
+    assert cache.sinkron()
+    assert cache.stempel() == stempel_sinkron
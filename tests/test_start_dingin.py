@@ -0,0 +1,63 @@
+"""Start dingin (mirror kosong): query lewat GET bersaring, tulisan operator tetap terbaca."""
+from datetime import date
+
+import pytest
+
+from apps_script_lokal import FILTER_ABSENSI, SHEET_ABSENSI
+from conftest import baris_sheet
+
+ABSENSI = [
+    baris_sheet(date(2026, 2, 27), 1, 'masuk', 4),
+    baris_sheet(date(2026, 3, 2), 1, 'masuk', 5),
+    baris_sheet(date(2026, 3, 2), 2, 'sakit'),
+    baris_sheet(date(2026, 3, 3), 1, 'izin'),
+]
+
+
+@pytest.fixture
+def dingin(inti, buat_stand_in, hubungkan):
+    """(cache belum termuat, daftar parameter GET Absensi Harian yang diterima stand-in)."""
+    server = buat_stand_in(ABSENSI)
+    get_asli, permintaan = server.sheets.get, []
+
+    def get(sheet, params):
+        if sheet == SHEET_ABSENSI:
+            permintaan.append(dict(params))
+        return get_asli(sheet, params)
+
+    server.sheets.get = get
+    hubungkan(server)
+    cache = inti.get_absensi_cache()
+    assert not cache.termuat
+    return cache, permintaan
+
+
+def final(df):
+    return sorted(zip(df['Tanggal'].dt.date, df['ID_Karyawan'], df['Status_Kehadiran'].astype(str), df['Produksi']))
+
+
+def test_query_dingin_hanya_mengambil_rentang(dingin):
+    cache, permintaan = dingin
+    df = cache.query_harian(date(2026, 3, 2), date(2026, 3, 2))
+    assert final(df) == [(date(2026, 3, 2), 1, 'masuk', 5), (date(2026, 3, 2), 2, 'sakit', 0)]
+    assert permintaan and all(any(k in p for k in FILTER_ABSENSI) for p in permintaan)
+    assert not cache.termuat
+
+    rekap = cache.rekap_bulan(2026, 3)
+    assert rekap.loc[1, 'Total Produksi'] == 5 and rekap.loc[1, 'izin'] == 1 and rekap.loc[2, 'sakit'] == 1
+
+
+def test_tulis_saat_dingin_terbaca_sebelum_dan_sesudah_muat_penuh(inti, dingin):
+    cache, _ = dingin
+    tanggal = date(2026, 3, 2)
+    cache.query_harian(tanggal, tanggal)
+    hasil = inti.kirim_absensi_batch(tanggal, [{'id_karyawan': 2, 'status': 'masuk', 'produksi': 7}])
+    assert [h['ok'] for h in hasil] == [True]
+
+    # Tulisan sendiri langsung terbaca tanpa menunggu mirror, dan rekonsiliasi terjadwal
+    assert (tanggal, 2, 'masuk', 7) in final(cache.query_harian(tanggal, tanggal))
+    assert cache._timer is not None
+
+    assert cache.sinkron()
+    assert cache.termuat and cache.lokal == []
+    assert final(cache.query_harian(tanggal, tanggal)) == [(tanggal, 1, 'masuk', 5), (tanggal, 2, 'masuk', 7)]